@@ -1150,3 +1150,63 @@ def test_numpy_rw_write_zero_stride():
     ds = gdal.GetDriverByName("MEM").Create("", n, n, 2)
     ds.WriteArray(ar)
     assert numpy.all(ds.ReadAsArray() == ar)
+
+
+###############################################################################
+# Test Band.SamplePoints()
+
+
+def test_numpy_rw_sample_points(tmp_vsimem):
+
+    filename = str(tmp_vsimem / "test.tif")
+    ds = gdal.GetDriverByName("GTiff").Create(
+        filename,
+        50,
+        40,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ar = numpy.arange(50 * 40, dtype=numpy.uint16).reshape(40, 50) % 251
+    ds.GetRasterBand(1).WriteArray(ar)
+    ds.GetRasterBand(1).SetNoDataValue(255)
+    ds = None
+
+    ds = gdal.Open(filename)
+    band = ds.GetRasterBand(1)
+
+    rng = numpy.random.default_rng(0)
+    xs = rng.uniform(-5, 55, 1000)
+    ys = rng.uniform(-5, 45, 1000)
+    got = band.SamplePoints(xs, ys)
+    assert got.dtype == numpy.uint8
+    cols = numpy.floor(xs).astype(int)
+    rows = numpy.floor(ys).astype(int)
+    inside = (cols >= 0) & (cols < 50) & (rows >= 0) & (rows < 40)
+    expected = numpy.full(xs.shape, 255, dtype=numpy.uint8)
+    expected[inside] = ar[rows[inside], cols[inside]]
+    numpy.testing.assert_array_equal(got, expected)
+
+    # Shape of the coordinates is preserved
+    assert band.SamplePoints([[0.5, 1.5]], [[0.5, 0.5]]).tolist() == [[0, 1]]
+
+    with pytest.raises(ValueError):
+        band.SamplePoints([0.5, 1.5], [0.5])
+
+    # Interpolation goes through InterpolateAtPoint()
+    xs = [1.5, 10.2, 20, 60]
+    ys = [1.0, 30.7, 20, 0]
+    got = band.SamplePoints(xs, ys, gdal.GRIORA_Bilinear)
+    assert got.dtype == numpy.float64
+    for x, y, value in zip(xs[:3], ys[:3], got[:3]):
+        assert value == band.InterpolateAtPoint(x, y, gdal.GRIORA_Bilinear)
+    assert numpy.isnan(got[3])
+
+    with pytest.raises(ValueError, match="Unsupported resampling"):
+        band.SamplePoints(xs, ys, gdal.GRIORA_Average)
+
+    # Nodata value out of the range of the data type of the band
+    ds = gdal.GetDriverByName("MEM").Create("", 2, 2)
+    ds.GetRasterBand(1).Fill(7)
+    ds.GetRasterBand(1).SetNoDataValue(-9999)
+    got = ds.GetRasterBand(1).SamplePoints([0.5, -1], [0.5, 0.5])
+    assert got.dtype == numpy.uint8
+    assert got.tolist() == [7, 0]
@@ -763,6 +763,107 @@ def test_ogr_basic_feature_iterator():
     assert count == 10
 
 
+def test_ogr_basic_layer_iter_batches():
+    gdaltest.importorskip_gdal_array()
+    numpy = pytest.importorskip("numpy")
+
+    ds = ogr.GetDriverByName("MEM").CreateDataSource("")
+    lyr = ds.CreateLayer("test")
+    lyr.CreateField(ogr.FieldDefn("int", ogr.OFTInteger))
+    lyr.CreateField(ogr.FieldDefn("str", ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn("real", ogr.OFTReal))
+    lyr.CreateField(ogr.FieldDefn("strlist", ogr.OFTStringList))
+    for i in range(5):
+        f = ogr.Feature(lyr.GetLayerDefn())
+        if i != 1:
+            f["int"] = i
+        f["str"] = "é%d" % i
+        f["real"] = i + 0.5
+        f["strlist"] = ["a", "b%d" % i]
+        if i != 3:
+            f.SetGeometry(ogr.CreateGeometryFromWkt("POINT (%d 2)" % i))
+        lyr.CreateFeature(f)
+
+    expected = [
+        (
+            f.GetFID(),
+            f["int"],
+            f["str"],
+            f["real"],
+            f["strlist"],
+            f.GetGeometryRef().ExportToIsoWkb() if f.GetGeometryRef() else None,
+        )
+        for f in lyr
+    ]
+    assert expected[1][1] is None
+    assert expected[3][5] is None
+
+    batches = list(lyr.iter_batches())
+    assert batches == [expected]
+
+    batches = list(lyr.iter_batches(batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sum(batches, []) == expected
+
+    batches = list(
+        lyr.iter_batches(
+            fields=["REAL", "int"], geometry_format="wkt", include_fid=False
+        )
+    )
+    assert batches[0][0] == (0.5, 0, "POINT (0 2)")
+    assert batches[0][1] == (1.5, None, "POINT (1 2)")
+    assert batches[0][3] == (3.5, 3, None)
+
+    # Ignored fields are restored after the iteration
+    lyr.ResetReading()
+    f = lyr.GetNextFeature()
+    assert f["str"] == "é0"
+
+    lyr.SetIgnoredFields(["str", "OGR_GEOMETRY"])
+    batches = list(lyr.iter_batches(fields=["str"]))
+    assert batches == [[(x[0], x[2], x[5]) for x in expected]]
+    defn = lyr.GetLayerDefn()
+    assert [defn.GetFieldDefn(i).IsIgnored() for i in range(defn.GetFieldCount())] == [
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert defn.IsGeometryIgnored()
+    lyr.SetIgnoredFields([])
+
+    batches = list(lyr.iter_batches(fields=[], geometry_format="geometry"))
+    assert [x[0] for x in batches[0]] == [x[0] for x in expected]
+    assert batches[0][4][1].ExportToIsoWkt() == "POINT (4 2)"
+    assert batches[0][3][1] is None
+
+    lyr.SetAttributeFilter("real > 2")
+    batches = list(lyr.iter_batches(fields=["str"], geometry_format=None))
+    assert batches == [[(2, "é2"), (3, "é3"), (4, "é4")]]
+    lyr.SetAttributeFilter(None)
+
+    batches = list(lyr.iter_batches(fields=["str", "real"], output="numpy"))
+    assert len(batches) == 1
+    rec = batches[0]
+    assert rec.dtype.names == ("OGC_FID", "str", "real", "wkb_geometry")
+    assert rec["str"][4].decode("utf-8") == "é4"
+    assert numpy.array_equal(rec["real"], numpy.array([0.5, 1.5, 2.5, 3.5, 4.5]))
+    assert rec["wkb_geometry"][0] == expected[0][5]
+    assert rec["wkb_geometry"][3] is None
+
+    rec = next(lyr.iter_batches(fields=["int"], output="numpy"))
+    assert list(rec["int"].mask) == [False, True, False, False, False]
+
+    with pytest.raises(KeyError):
+        lyr.iter_batches(fields=["non_existing"])
+
+    with pytest.raises(ValueError):
+        lyr.iter_batches(geometry_format="invalid")
+
+    with pytest.raises(ValueError):
+        lyr.iter_batches(output="invalid")
+
+
 def test_ogr_basic_dataset_copy_layer_dst_srswkt():
 
     ds = ogr.GetDriverByName("MEM").CreateDataSource("")
@@ -837,3 +837,404 @@ def test_gdal2tiles_py_jpeg_1band_input(
             got_stats_14,
             got_stats_13,
         )
+
+
+def _assert_same_tiles(expected_dir, got_dir, ext="png"):
+
+    expected_tiles = sorted(
+        os.path.relpath(f, expected_dir)
+        for f in glob.glob(f"{expected_dir}/*/*/*.{ext}")
+    )
+    got_tiles = sorted(
+        os.path.relpath(f, got_dir) for f in glob.glob(f"{got_dir}/*/*/*.{ext}")
+    )
+    assert got_tiles == expected_tiles
+    assert expected_tiles
+
+    for tile in expected_tiles:
+        diff_found = compare_db(
+            gdal.Open(os.path.join(got_dir, tile)),
+            gdal.Open(os.path.join(expected_dir, tile)),
+        )
+        assert not diff_found, tile
+
+
+@pytest.mark.require_driver("PNG")
+@pytest.mark.parametrize("processes", (1, 2))
+def test_gdal2tiles_py_in_memory_overviews(script_path, tmp_path, processes):
+
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_dir = str(tmp_path / "out_in_memory_overviews")
+
+    base_args = f"-q --processes={processes} -z 0-3 "
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_dir_ref}",
+    )
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + "--in-memory-overviews "
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_dir}",
+    )
+
+    _assert_same_tiles(out_dir_ref, out_dir)
+
+
+@pytest.mark.require_driver("PNG")
+@pytest.mark.parametrize(
+    "output_format,extension,driver_name",
+    (("MBTiles", "mbtiles", "MBTiles"), ("GPKG", "gpkg", "GPKG")),
+)
+@pytest.mark.parametrize("processes", (1, 2))
+def test_gdal2tiles_py_sqlite_output(
+    script_path, tmp_path, output_format, extension, driver_name, processes
+):
+
+    import sqlite3
+
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_filename = str(tmp_path / f"out.{extension}")
+
+    base_args = f"-q --processes={processes} -z 0-2 "
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_dir_ref}",
+    )
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_filename}",
+    )
+
+    if gdal.GetDriverByName(driver_name):
+        ds = gdal.Open(out_filename)
+        assert ds.GetDriver().ShortName == driver_name
+        ds = None
+
+    table_name = "tiles" if output_format == "MBTiles" else "out"
+    conn = sqlite3.connect(out_filename)
+    rows = conn.execute(
+        f"SELECT zoom_level, tile_column, tile_row, tile_data FROM {table_name}"
+    ).fetchall()
+    conn.close()
+
+    ref_tiles = glob.glob(f"{out_dir_ref}/*/*/*.png")
+    assert len(rows) == len(ref_tiles)
+    for tz, tx, tile_row, tile_data in rows:
+        ty = tile_row if output_format == "MBTiles" else 2**tz - 1 - tile_row
+        gdal.FileFromMemBuffer("/vsimem/tile.png", tile_data)
+        try:
+            diff_found = compare_db(
+                gdal.Open("/vsimem/tile.png"),
+                gdal.Open(f"{out_dir_ref}/{tz}/{tx}/{ty}.png"),
+            )
+        finally:
+            gdal.Unlink("/vsimem/tile.png")
+        assert not diff_found, (tz, tx, ty)
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_pmtiles_output(script_path, tmp_path):
+
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_filename = str(tmp_path / "out.pmtiles")
+
+    base_args = "-q -z 0-2 "
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_dir_ref}",
+    )
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        base_args
+        + test_py_scripts.get_data_path("gdrivers")
+        + f"small_world.tif {out_filename}",
+    )
+
+    with open(out_filename, "rb") as f:
+        header = f.read(127)
+    assert header[0:8] == b"PMTiles\x03"
+    addressed_tiles = struct.unpack("<Q", header[72:80])[0]
+    assert addressed_tiles == len(glob.glob(f"{out_dir_ref}/*/*/*.png"))
+    min_zoom, max_zoom = struct.unpack("<BB", header[100:102])
+    assert (min_zoom, max_zoom) == (0, 2)
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_exclude_coverage_prescan(script_path, tmp_path):
+
+    src_filename = test_py_scripts.get_data_path("gdrivers") + "small_world.tif"
+
+    # Mosaic with holes, where the alpha band is reported as empty
+    part1 = str(tmp_path / "part1.tif")
+    part2 = str(tmp_path / "part2.tif")
+    gdal.Translate(part1, src_filename, srcWin=[0, 0, 100, 100])
+    gdal.Translate(part2, src_filename, srcWin=[250, 100, 150, 100])
+    mosaic_filename = str(tmp_path / "mosaic.vrt")
+    gdal.BuildVRT(mosaic_filename, [part1, part2], addAlpha=True)
+
+    out_dir_all = str(tmp_path / "out_all")
+    out_dir_exclude = str(tmp_path / "out_exclude")
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        f"-q -z 0-3 {mosaic_filename} {out_dir_all}",
+    )
+
+    _, err = test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        f"-v --exclude -z 0-3 {mosaic_filename} {out_dir_exclude}",
+        return_stderr=True,
+    )
+    assert "Excluding tile with no valid source pixel" in err
+
+    expected_tiles = []
+    for filename in glob.glob(f"{out_dir_all}/*/*/*.png"):
+        ds = gdal.Open(filename)
+        if max(ds.GetRasterBand(ds.RasterCount).ReadRaster()) > 0:
+            expected_tiles.append(os.path.relpath(filename, out_dir_all))
+
+    got_tiles = [
+        os.path.relpath(filename, out_dir_exclude)
+        for filename in glob.glob(f"{out_dir_exclude}/*/*/*.png")
+    ]
+    assert sorted(got_tiles) == sorted(expected_tiles)
+
+    for tile in got_tiles:
+        diff_found = compare_db(
+            gdal.Open(os.path.join(out_dir_exclude, tile)),
+            gdal.Open(os.path.join(out_dir_all, tile)),
+        )
+        assert not diff_found, tile
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_mbtiles_uniform_tiles_deduplicated(script_path, tmp_path):
+
+    import sqlite3
+
+    src_filename = test_py_scripts.get_data_path("gdrivers") + "small_world.tif"
+
+    # Raster with large fully transparent areas
+    part_filename = str(tmp_path / "part.tif")
+    gdal.Translate(part_filename, src_filename, srcWin=[0, 0, 100, 100])
+    mosaic_filename = str(tmp_path / "mosaic.vrt")
+    gdal.BuildVRT(
+        mosaic_filename,
+        [part_filename],
+        addAlpha=True,
+        outputBounds=[-180, -90, 180, 90],
+    )
+
+    out_filename = str(tmp_path / "out.mbtiles")
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        f"-q -z 0-3 {mosaic_filename} {out_filename}",
+    )
+
+    conn = sqlite3.connect(out_filename)
+    nb_tiles = conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+    nb_images = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    conn.close()
+    assert nb_tiles == 1 + 4 + 16 + 64
+    assert nb_images < nb_tiles
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_processes_same_tiles(script_path, tmp_path):
+
+    # Enough tiles at the max zoom level for the work to be split in several
+    # row segments per process
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_dir = str(tmp_path / "out_processes")
+
+    for processes, out_dir_tmp in ((1, out_dir_ref), (3, out_dir)):
+        test_py_scripts.run_py_script_as_external_script(
+            script_path,
+            "gdal2tiles",
+            f"-q --processes={processes} -z 2-5 "
+            + test_py_scripts.get_data_path("gdrivers")
+            + f"small_world.tif {out_dir_tmp}",
+        )
+
+    _assert_same_tiles(out_dir_ref, out_dir)
+    assert len(glob.glob(f"{out_dir}/5/*/*.png")) == 32 * 32
+
+
+@pytest.mark.require_driver("PNG")
+@pytest.mark.parametrize("in_memory_overviews", [False, True])
+def test_gdal2tiles_py_update(script_path, tmp_path, in_memory_overviews):
+
+    src_filename = str(tmp_path / "src.tif")
+    gdal.Translate(
+        src_filename, test_py_scripts.get_data_path("gdrivers") + "small_world.tif"
+    )
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_dir = str(tmp_path / "out")
+    options = "-q -z 0-3"
+    if in_memory_overviews:
+        options += " --in-memory-overviews"
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path, "gdal2tiles", f"{options} {src_filename} {out_dir}"
+    )
+    unchanged_tile = os.path.join(out_dir, "3", "7", "2.png")
+    mtime = os.stat(unchanged_tile).st_mtime_ns
+
+    # Change the source over (-90, 36, -72, 45)
+    with gdal.Open(src_filename, gdal.GA_Update) as ds:
+        ds.WriteRaster(100, 50, 20, 10, b"\xff" * (20 * 10 * 3))
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        f"{options} --update=-90,36,-72,45 {src_filename} {out_dir}",
+    )
+    test_py_scripts.run_py_script_as_external_script(
+        script_path, "gdal2tiles", f"{options} {src_filename} {out_dir_ref}"
+    )
+
+    _assert_same_tiles(out_dir_ref, out_dir)
+    assert os.stat(unchanged_tile).st_mtime_ns == mtime
+
+
+@pytest.mark.require_driver("PNG")
+@pytest.mark.parametrize(
+    "output_format,extension", (("MBTiles", "mbtiles"), ("GPKG", "gpkg"))
+)
+@pytest.mark.parametrize("processes", (1, 2))
+def test_gdal2tiles_py_update_sqlite_output(
+    script_path, tmp_path, output_format, extension, processes
+):
+
+    import sqlite3
+
+    src_filename = str(tmp_path / "src.tif")
+    gdal.Warp(
+        src_filename,
+        test_py_scripts.get_data_path("gdrivers") + "small_world.tif",
+        dstAlpha=True,
+    )
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_filename = str(tmp_path / f"out.{extension}")
+    options = f"-q -x --processes={processes} -z 0-3"
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path, "gdal2tiles", f"{options} {src_filename} {out_filename}"
+    )
+
+    # Make the source transparent over (0, 0, 45, 45): the base tiles it
+    # covers are deleted, and the overview tiles above them are rebuilt
+    with gdal.Open(src_filename, gdal.GA_Update) as ds:
+        ds.GetRasterBand(4).WriteRaster(200, 50, 50, 50, b"\x00" * (50 * 50))
+
+    test_py_scripts.run_py_script_as_external_script(
+        script_path,
+        "gdal2tiles",
+        f"{options} --update=0,0,45,45 {src_filename} {out_filename}",
+    )
+    test_py_scripts.run_py_script_as_external_script(
+        script_path, "gdal2tiles", f"{options} {src_filename} {out_dir_ref}"
+    )
+
+    assert not os.path.exists(out_filename + "-wal")
+
+    table_name = "tiles" if output_format == "MBTiles" else "out"
+    conn = sqlite3.connect(out_filename)
+    rows = conn.execute(
+        f"SELECT zoom_level, tile_column, tile_row, tile_data FROM {table_name}"
+    ).fetchall()
+    conn.close()
+
+    assert len(rows) == len(glob.glob(f"{out_dir_ref}/*/*/*.png"))
+    assert not os.path.exists(f"{out_dir_ref}/3/4/4.png")
+    for tz, tx, tile_row, tile_data in rows:
+        ty = tile_row if output_format == "MBTiles" else 2**tz - 1 - tile_row
+        gdal.FileFromMemBuffer("/vsimem/tile.png", tile_data)
+        try:
+            diff_found = compare_db(
+                gdal.Open("/vsimem/tile.png"),
+                gdal.Open(f"{out_dir_ref}/{tz}/{tx}/{ty}.png"),
+            )
+        finally:
+            gdal.Unlink("/vsimem/tile.png")
+        assert not diff_found, (tz, tx, ty)
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_threads_same_tiles(script_path, tmp_path):
+
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_dir = str(tmp_path / "out_threads")
+
+    for args, out_dir_tmp in (("--processes=1", out_dir_ref), ("--threads=3", out_dir)):
+        test_py_scripts.run_py_script_as_external_script(
+            script_path,
+            "gdal2tiles",
+            f"-q {args} -z 2-5 "
+            + test_py_scripts.get_data_path("gdrivers")
+            + f"small_world.tif {out_dir_tmp}",
+        )
+
+    _assert_same_tiles(out_dir_ref, out_dir)
+    assert len(glob.glob(f"{out_dir}/5/*/*.png")) == 32 * 32
+
+
+@pytest.mark.require_driver("PNG")
+def test_gdal2tiles_py_processes_mbtiles_overviews(script_path, tmp_path):
+
+    import sqlite3
+
+    # Overview tiles are generated while base tiles are still being written
+    # by the main process: check that they are built from committed tiles
+    out_dir_ref = str(tmp_path / "out_ref")
+    out_filename = str(tmp_path / "out.mbtiles")
+
+    for out in (out_dir_ref, out_filename):
+        test_py_scripts.run_py_script_as_external_script(
+            script_path,
+            "gdal2tiles",
+            "-q --processes=3 -z 2-5 "
+            + test_py_scripts.get_data_path("gdrivers")
+            + f"small_world.tif {out}",
+        )
+
+    conn = sqlite3.connect(out_filename)
+    rows = conn.execute(
+        "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles "
+        "WHERE zoom_level < 5"
+    ).fetchall()
+    conn.close()
+
+    assert len(rows) == len(glob.glob(f"{out_dir_ref}/[234]/*/*.png"))
+    for tz, tx, ty, tile_data in rows:
+        gdal.FileFromMemBuffer("/vsimem/tile.png", tile_data)
+        try:
+            diff_found = compare_db(
+                gdal.Open("/vsimem/tile.png"),
+                gdal.Open(f"{out_dir_ref}/{tz}/{tx}/{ty}.png"),
+            )
+        finally:
+            gdal.Unlink("/vsimem/tile.png")
+        assert not diff_found, (tz, tx, ty)
@@ -27,7 +27,7 @@ from itertools import product
 
 import numpy as np
 
-from osgeo import gdal
+from osgeo import gdal, ogr
 from osgeo.gdal_array import flip_code
 from osgeo_utils import gdal2xyz
 from osgeo_utils.auxiliary.raster_creation import create_flat_raster
@@ -198,3 +198,134 @@ def test_gdal2xyz_py_vsistdout(script_path, tmp_path):
     with gdal.Open(out_filename) as ds:
         assert ds.GetGeoTransform() == (440720.0, 60.0, 0.0, 3751320.0, 0.0, -60.0)
         assert ds.GetRasterBand(1).Checksum() == 4672
+
+
+###############################################################################
+# Test the output of blocks of lines, with -skip, -srcwin and nodata
+
+
+@pytest.mark.parametrize("max_block_pixels", [1, 10, 1000000])
+@pytest.mark.parametrize("skip", [1, 2, (3, 2)])
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_gdal2xyz_py_blocks(tmp_path, monkeypatch, max_block_pixels, skip, skip_nodata):
+
+    monkeypatch.setattr(gdal2xyz, "MAX_BLOCK_PIXELS", max_block_pixels)
+
+    ds = gdal.GetDriverByName("MEM").Create("", 7, 5, 2, gdal.GDT_Int16)
+    ds.SetGeoTransform([1000, 10, 0, 2000, 0, -5])
+    data = np.arange(2 * 5 * 7, dtype=np.int16).reshape(2, 5, 7) % 9
+    data[:, 2, 3] = 0
+    data[0, 1, 1] = 0
+    for i in range(2):
+        ds.GetRasterBand(i + 1).WriteArray(data[i])
+        ds.GetRasterBand(i + 1).SetNoDataValue(0)
+
+    srcwin = (1, 1, 6, 4)
+    x_skip, y_skip = skip if isinstance(skip, tuple) else (skip, skip)
+    expected = []
+    for y in range(1, 5, y_skip):
+        for x in range(1, 7, x_skip):
+            values = data[:, y, x]
+            if np.all(values == 0):
+                if skip_nodata:
+                    continue
+                values = np.array([-1, -2])
+            expected.append(
+                (1000 + (x + 0.5) * 10, 2000 - (y + 0.5) * 5, values[0], values[1])
+            )
+
+    out_xyz = str(tmp_path / "out.xyz")
+    gdal2xyz.gdal2xyz(
+        ds,
+        out_xyz,
+        srcwin=srcwin,
+        skip=skip,
+        band_nums=[1, 2],
+        skip_nodata=skip_nodata,
+        dst_nodata=[-1, -2],
+        progress_callback=None,
+    )
+    with open(out_xyz) as f:
+        assert f.read() == "".join("%.3f %.3f %g %g\n" % line for line in expected)
+
+    for pre_allocate_np_arrays in (True, False):
+        geo_x, geo_y, result, nodata = gdal2xyz.gdal2xyz(
+            ds,
+            None,
+            srcwin=srcwin,
+            skip=skip,
+            band_nums=[1, 2],
+            skip_nodata=skip_nodata,
+            dst_nodata=[-1, -2],
+            return_np_arrays=True,
+            pre_allocate_np_arrays=pre_allocate_np_arrays,
+            progress_callback=None,
+        )
+        assert geo_x.tolist() == [line[0] for line in expected]
+        assert geo_y.tolist() == [line[1] for line in expected]
+        assert result.tolist() == [
+            [line[2] for line in expected],
+            [line[3] for line in expected],
+        ]
+        assert nodata is None if skip_nodata else nodata.tolist() == [-1, -2]
+
+
+###############################################################################
+# Test writing the points into a vector layer
+
+
+@pytest.mark.require_driver("GPKG")
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_gdal2xyz_py_vector_output(script_path, tmp_path, skip_nodata):
+    pytest.importorskip("pyarrow")
+
+    src_filename = test_py_scripts.get_data_path("gcore") + "rgbsmall.tif"
+    out_gpkg = str(tmp_path / "out.gpkg")
+
+    arguments = "-of GPKG -nln pts -allbands -srcwin 5 3 20 30"
+    arguments += " -srcnodata 0 0 0 -dstnodata 1 2 3"
+    if skip_nodata:
+        arguments += " -skipnodata"
+    arguments += f" {src_filename} {out_gpkg}"
+    _, err = test_py_scripts.run_py_script(
+        script_path, "gdal2xyz", arguments, return_stderr=True
+    )
+    assert "ERROR" not in err
+
+    geo_x, geo_y, data, _ = gdal2xyz.gdal2xyz(
+        src_filename,
+        srcwin=(5, 3, 20, 30),
+        skip=1,
+        src_nodata=0,
+        dst_nodata=[1, 2, 3],
+        skip_nodata=skip_nodata,
+        return_np_arrays=True,
+        progress_callback=None,
+    )
+
+    with gdal.OpenEx(out_gpkg, gdal.OF_VECTOR) as ds, gdal.Open(src_filename) as src_ds:
+        lyr = ds.GetLayerByName("pts")
+        assert lyr.GetGeomType() == ogr.wkbPoint
+        assert lyr.GetSpatialRef().IsSame(src_ds.GetSpatialRef())
+        assert [
+            lyr.GetLayerDefn().GetFieldDefn(i).GetName()
+            for i in range(lyr.GetLayerDefn().GetFieldCount())
+        ] == ["band_1", "band_2", "band_3"]
+        assert lyr.GetFeatureCount() == len(geo_x)
+        for i, f in enumerate(lyr):
+            assert f.GetGeometryRef().GetX() == geo_x[i]
+            assert f.GetGeometryRef().GetY() == geo_y[i]
+            assert [f["band_1"], f["band_2"], f["band_3"]] == data[:, i].tolist()
+
+    # existing vector dataset
+    ds = gdal.GetDriverByName("MEM").Create("", 0, 0, 0, gdal.GDT_Unknown)
+    gdal2xyz.gdal2xyz(
+        src_filename,
+        ds,
+        band_nums=[2],
+        skip_nodata=skip_nodata,
+        progress_callback=None,
+    )
+    lyr = ds.GetLayerByName("points")
+    assert lyr.GetFeatureCount() == 50 * 50
+    assert lyr.GetLayerDefn().GetFieldDefn(0).GetName() == "band_2"
@@ -844,3 +844,143 @@ def test_gdal_calc_py_hidenodata(tmp_vsimem):
     out_arr = out_ds.GetRasterBand(1).ReadAsMaskedArray()
     assert not np.any(out_arr.mask)
     np.testing.assert_array_equal(out_arr, data + 1)
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_gdal_calc_py_threads(tmp_vsimem, threads):
+
+    input_a = tmp_vsimem / "a.tif"
+    input_b = tmp_vsimem / "b.tif"
+    data_a = np.arange(100 * 70, dtype=np.int16).reshape(70, 100) % 251
+    data_b = np.arange(100 * 70, dtype=np.int16).reshape(70, 100) % 13
+
+    for filename, data in ((input_a, data_a), (input_b, data_b)):
+        with gdal.GetDriverByName("GTiff").Create(
+            filename,
+            100,
+            70,
+            1,
+            gdal.GDT_Int16,
+            ["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+        ) as ds:
+            ds.GetRasterBand(1).WriteArray(data)
+            ds.GetRasterBand(1).SetNoDataValue(0)
+
+    # Inputs that cannot be reopened are read one thread at a time
+    mem_b = gdal.Translate("", input_b, format="MEM")
+
+    for b in (input_b, mem_b):
+        out_ds = gdal_calc.Calc(
+            A=input_a,
+            B=b,
+            calc="A * 2 - B",
+            format="MEM",
+            type="Int32",
+            NoDataValue=-1,
+            quiet=True,
+            threads=threads,
+        )
+        expected = np.where(
+            (data_a == 0) | (data_b == 0), -1, data_a.astype(np.int32) * 2 - data_b
+        )
+        np.testing.assert_array_equal(out_ds.GetRasterBand(1).ReadAsArray(), expected)
+
+
+@pytest.mark.parametrize(
+    "raster_size,block_sizes,max_pixels,expected",
+    [
+        # striped file: multi-row strips
+        ((10000, 8000), [(10000, 1)], 1 << 20, (10000, 104)),
+        # tiled files: aligned on the tiles of both, by rows of tiles
+        ((10000, 8000), [(256, 256), (512, 512)], 1 << 20, (2048, 512)),
+        # aligning on a striped output would make too large chunks
+        ((10000, 8000), [(256, 256), (10000, 1)], 1 << 20, (4096, 256)),
+        ((100, 80), [(16, 16)], 1 << 20, (100, 80)),
+        ((10000, 8000), [(256, 256)], 1000, (256, 256)),
+    ],
+)
+def test_gdal_calc_py_plan_chunk_size(raster_size, block_sizes, max_pixels, expected):
+
+    assert gdal_calc.plan_chunk_size(raster_size, block_sizes, max_pixels) == expected
+
+
+def test_gdal_calc_py_mixed_block_layouts(tmp_vsimem, monkeypatch):
+
+    input_a = tmp_vsimem / "a.tif"
+    input_b = tmp_vsimem / "b.tif"
+    data = np.arange(200 * 150, dtype=np.uint16).reshape(150, 200)
+
+    with gdal.GetDriverByName("GTiff").Create(
+        input_a, 200, 150, 1, gdal.GDT_UInt16, ["BLOCKYSIZE=1"]
+    ) as ds:
+        ds.GetRasterBand(1).WriteArray(data)
+    with gdal.GetDriverByName("GTiff").Create(
+        input_b,
+        200,
+        150,
+        1,
+        gdal.GDT_UInt16,
+        ["TILED=YES", "BLOCKXSIZE=32", "BLOCKYSIZE=48"],
+    ) as ds:
+        ds.GetRasterBand(1).WriteArray(data[::-1])
+
+    # Small chunks, to get several of them
+    monkeypatch.setattr(gdal_calc, "ChunkMaxBytes", 200 * 10 * 4)
+
+    out_ds = gdal_calc.Calc(
+        A=input_a,
+        B=input_b,
+        calc="A.astype(uint32) + B",
+        format="MEM",
+        type="UInt32",
+        hideNoData=True,
+        quiet=True,
+    )
+    np.testing.assert_array_equal(
+        out_ds.GetRasterBand(1).ReadAsArray(), data.astype(np.uint32) + data[::-1]
+    )
+
+
+@pytest.mark.parametrize("engine", ["numpy", "numexpr"])
+def test_gdal_calc_py_engine(tmp_vsimem, engine):
+
+    if engine == "numexpr":
+        pytest.importorskip("numexpr")
+
+    input_a = tmp_vsimem / "a.tif"
+    input_b = tmp_vsimem / "b.tif"
+    data_a = np.arange(60, dtype=np.float32).reshape(6, 10)
+    data_b = np.arange(60, dtype=np.float32).reshape(6, 10)[::-1]
+
+    for filename, data in ((input_a, data_a), (input_b, data_b)):
+        with gdal.GetDriverByName("GTiff").Create(
+            filename, 10, 6, 1, gdal.GDT_Float32
+        ) as ds:
+            ds.GetRasterBand(1).WriteArray(data)
+            ds.GetRasterBand(1).SetNoDataValue(3)
+
+    out_ds = gdal_calc.Calc(
+        A=input_a,
+        B=input_b,
+        calc="(A - B) / (A + B + 1)",
+        format="MEM",
+        NoDataValue=-9999,
+        engine=engine,
+        quiet=True,
+    )
+    expected = np.where(
+        (data_a == 3) | (data_b == 3), -9999, (data_a - data_b) / (data_a + data_b + 1)
+    )
+    np.testing.assert_allclose(out_ds.GetRasterBand(1).ReadAsArray(), expected)
+
+
+def test_gdal_calc_py_engine_errors(tmp_vsimem):
+
+    input = tmp_vsimem / "in.tif"
+    gdal.GetDriverByName("GTiff").Create(input, 3, 3, 1).Close()
+
+    with pytest.raises(Exception, match="Unknown evaluation engine"):
+        gdal_calc.Calc(A=input, calc="A", format="MEM", engine="foo", quiet=True)
+
+    with pytest.raises(SyntaxError):
+        gdal_calc.Calc(A=input, calc="A +", format="MEM", quiet=True)
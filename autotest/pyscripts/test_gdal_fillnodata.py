@@ -161,3 +161,70 @@ def test_gdal_fillnodata_nearest(script_path, tmp_path):
     ds = gdal.Open(result_tif)
     assert struct.unpack("B" * 9, ds.GetRasterBand(1).ReadRaster()) == expected_data
     ds = None
+
+
+###############################################################################
+# Test the copy of a tiled source into the output file, with -o
+
+
+def test_gdal_fillnodata_tiled_copy(script_path, tmp_path):
+
+    input_tif = str(tmp_path / "test_gdal_fillnodata_tiled_in.tif")
+    inplace_tif = str(tmp_path / "test_gdal_fillnodata_tiled_inplace.tif")
+    result_tif = str(tmp_path / "test_gdal_fillnodata_tiled.tif")
+
+    ds = gdal.GetDriverByName("GTiff").Create(
+        input_tif,
+        100,
+        70,
+        1,
+        gdal.GDT_UInt16,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ds.GetRasterBand(1).SetNoDataValue(0)
+    input_data = [
+        0 if (x // 7 + y // 5) % 4 == 0 else 1 + x + 100 * y
+        for y in range(70)
+        for x in range(100)
+    ]
+    ds.GetRasterBand(1).WriteRaster(
+        0, 0, 100, 70, struct.pack("H" * len(input_data), *input_data)
+    )
+    ds = None
+
+    # Reference filled in place, which does not go through the copy of the
+    # source band
+    with gdal.Translate(inplace_tif, input_tif) as ds:
+        band = ds.GetRasterBand(1)
+        assert (
+            gdal.FillNodata(band, band.GetMaskBand(), 100, 0, ["TEMP_FILE_DRIVER=MEM"])
+            == gdal.CE_None
+        )
+
+    from osgeo_utils import gdal_fillnodata
+
+    assert (
+        gdal_fillnodata.main(
+            [
+                gdal_fillnodata.__file__,
+                "-o",
+                "TEMP_FILE_DRIVER=MEM",
+                "-q",
+                input_tif,
+                result_tif,
+            ]
+        )
+        == 0
+    )
+
+    ds = gdal.Open(result_tif)
+    assert ds.GetRasterBand(1).DataType == gdal.GDT_UInt16
+    assert ds.GetRasterBand(1).GetNoDataValue() == 0
+    result = ds.GetRasterBand(1).ReadRaster()
+    ds = None
+    with gdal.Open(inplace_tif) as ds:
+        assert result == ds.GetRasterBand(1).ReadRaster()
+
+    values = struct.unpack("H" * len(input_data), result)
+    assert 0 not in values
+    assert all(v == i for v, i in zip(values, input_data) if i != 0)
@@ -0,0 +1,70 @@
+#!/usr/bin/env pytest
+# -*- coding: utf-8 -*-
+###############################################################################
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  gdal_lut.py testing
+#
+###############################################################################
+# Copyright (c) 2026, GDAL contributors
+#
+# SPDX-License-Identifier: MIT
+###############################################################################
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import test_py_scripts
+
+from osgeo import gdal
+
+pytestmark = pytest.mark.skipif(
+    test_py_scripts.get_py_script("gdal_lut") is None,
+    reason="gdal_lut.py not available",
+)
+
+
+@pytest.fixture()
+def script_path():
+    return test_py_scripts.get_py_script("gdal_lut")
+
+
+###############################################################################
+# Test gdal_lut.py on a tiled input
+
+
+def test_gdal_lut_tiled(script_path, tmp_path):
+
+    src_filename = str(tmp_path / "in.tif")
+    dst_filename = str(tmp_path / "out.tif")
+    lut_filename = str(tmp_path / "lut.txt")
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, (70, 90)).astype(np.uint8)
+    ds = gdal.GetDriverByName("GTiff").Create(
+        src_filename,
+        90,
+        70,
+        1,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ds.GetRasterBand(1).WriteArray(data)
+    ds = None
+
+    lut = [0, 5, 11, 12, 12, 13] + [255 - i for i in range(6, 100)]
+    with open(lut_filename, "w") as f:
+        f.write("\n".join(str(x) for x in lut) + "\n")
+
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_lut",
+        f"{src_filename} {dst_filename} -lutfile {lut_filename}",
+    )
+
+    # Values beyond the LUT are left unaltered
+    lookup = np.arange(256)
+    lookup[: len(lut)] = lut
+
+    ds = gdal.Open(dst_filename)
+    assert ds.GetRasterBand(1).DataType == gdal.GDT_Byte
+    np.testing.assert_array_equal(ds.GetRasterBand(1).ReadAsArray(), lookup[data])
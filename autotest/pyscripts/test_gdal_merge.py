@@ -260,3 +260,153 @@ def test_gdal_merge_5(script_path, tmp_path):
         assert ds.GetRasterBand(2).Checksum() == cs, "Wrong checksum"
         assert ds.GetRasterBand(3).Checksum() == 0, "Wrong checksum"
         assert ds.GetRasterBand(4).Checksum() == cs, "Wrong checksum"
+
+
+###############################################################################
+# Test that compositing by chunks smaller than the output gives the same result
+# as compositing the whole output at once
+
+
+@pytest.mark.parametrize("options", ["", "-n 0", "-init 200", "-separate"])
+def test_gdal_merge_chunks(tmp_path, sample_tifs, monkeypatch, options):
+    np = pytest.importorskip("numpy")
+    gdal_merge = pytest.importorskip("osgeo_utils.gdal_merge", exc_type=ImportError)
+    gdaltest.importorskip_gdal_array()
+
+    # Source with a different resolution, overlapping the 4 tiles
+    coarse_tif = str(tmp_path / "coarse.tif")
+    with gdal.GetDriverByName("GTiff").Create(coarse_tif, 5, 3, 1) as ds:
+        ds.SetGeoTransform([2.35, 0.25, 0, 48.65, 0, -0.25])
+        ds.GetRasterBand(1).WriteArray(
+            np.arange(14, -1, -1, dtype=np.uint8).reshape(3, 5)
+        )
+
+    inputs = list(sample_tifs) + [coarse_tif]
+    args = options.split() + ["-co", "TILED=YES", "-co", "BLOCKXSIZE=16"]
+    args += ["-co", "BLOCKYSIZE=16"] + inputs
+
+    whole_tif = str(tmp_path / "whole.tif")
+    assert not gdal_merge.main(["", "-q", "-o", whole_tif] + args)
+
+    monkeypatch.setattr(gdal_merge, "ChunkMaxBytes", 1)
+    chunks_tif = str(tmp_path / "chunks.tif")
+    assert not gdal_merge.main(["", "-q", "-o", chunks_tif] + args)
+
+    with gdal.Open(whole_tif) as ds, gdal.Open(chunks_tif) as ds_chunks:
+        assert ds.RasterXSize == 20 and ds.RasterYSize == 20
+        assert ds.GetRasterBand(1).GetBlockSize() == [16, 16]
+        np.testing.assert_array_equal(ds_chunks.ReadAsArray(), ds.ReadAsArray())
+        if "-separate" not in options:
+            # The coarse source is on top of the 4 tiles, except where it
+            # is nodata
+            band = ds.GetRasterBand(1)
+            assert band.ReadAsArray(4, 4, 1, 1)[0][0] == 14
+            expected = 63 if "-n 0" in options else 0
+            assert band.ReadAsArray(15, 9, 1, 1)[0][0] == expected
+
+
+###############################################################################
+# Test -threads and -processes
+
+
+@pytest.mark.parametrize("option", ["-threads 3", "-processes 2"])
+def test_gdal_merge_workers(script_path, tmp_path, sample_tifs, option):
+
+    options = "-n 63 -co TILED=YES -co BLOCKXSIZE=16 -co BLOCKYSIZE=16"
+
+    ref_tif = str(tmp_path / "ref.tif")
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_merge",
+        f"{options} -o {ref_tif} {' '.join(sample_tifs)}",
+    )
+
+    output_tif = str(tmp_path / "out.tif")
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_merge",
+        f"{option} {options} -o {output_tif} {' '.join(sample_tifs)}",
+    )
+
+    with gdal.Open(ref_tif) as ref_ds, gdal.Open(output_tif) as ds:
+        assert ds.GetRasterBand(1).Checksum() == ref_ds.GetRasterBand(1).Checksum()
+        assert ds.GetRasterBand(1).ComputeRasterMinMax() == (0, 255)
+
+
+def test_gdal_merge_workers_errors(script_path, tmp_path, sample_tifs):
+
+    output_tif = str(tmp_path / "out.tif")
+    for option, err in [
+        ("-threads 0", "Invalid value for -threads"),
+        ("-threads 2 -processes 2", "cannot be used together"),
+    ]:
+        ret = test_py_scripts.run_py_script(
+            script_path,
+            "gdal_merge",
+            f"{option} -o {output_tif} {sample_tifs[0]}",
+        )
+        assert err in ret
+        assert not os.path.exists(output_tif)
+
+
+###############################################################################
+# Test producing a VRT mosaic, which must read like the mosaic copied into a
+# GeoTIFF file
+
+
+@pytest.mark.parametrize("options", ["", "-n 63", "-separate", "-ps 0.03 0.03 -tap"])
+def test_gdal_merge_vrt(script_path, tmp_path, sample_tifs, options):
+
+    # Source with a mask, overlapping the 4 tiles
+    masked_tif = str(tmp_path / "masked.tif")
+    with gdal.GetDriverByName("GTiff").Create(masked_tif, 10, 10, 1) as ds:
+        ds.SetGeoTransform([2.5, 0.1, 0, 48.5, 0, -0.1])
+        ds.GetRasterBand(1).Fill(200)
+        ds.CreateMaskBand(gdal.GMF_PER_DATASET)
+        ds.GetRasterBand(1).GetMaskBand().WriteRaster(0, 0, 5, 10, b"\xff" * 50)
+    inputs = " ".join(list(sample_tifs) + [masked_tif])
+
+    output_tif = str(tmp_path / "out.tif")
+    test_py_scripts.run_py_script(
+        script_path, "gdal_merge", f"{options} -o {output_tif} {inputs}"
+    )
+
+    output_vrt = str(tmp_path / "out.vrt")
+    test_py_scripts.run_py_script(
+        script_path, "gdal_merge", f"{options} -o {output_vrt} {inputs}"
+    )
+
+    with gdal.Open(output_tif) as ds, gdal.Open(output_vrt) as vrt_ds:
+        assert vrt_ds.GetDriver().ShortName == "VRT"
+        assert vrt_ds.GetGeoTransform() == pytest.approx(ds.GetGeoTransform())
+        assert vrt_ds.RasterCount == ds.RasterCount
+        for i in range(ds.RasterCount):
+            assert (
+                vrt_ds.GetRasterBand(i + 1).Checksum()
+                == ds.GetRasterBand(i + 1).Checksum()
+            )
+
+    # The VRT can be materialized with gdal_merge
+    materialized_tif = str(tmp_path / "materialized.tif")
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_merge",
+        f"-threads 2 {'-separate' if '-separate' in options else ''} "
+        f"-o {materialized_tif} {output_vrt}",
+    )
+    with gdal.Open(output_tif) as ds, gdal.Open(materialized_tif) as ds_mat:
+        for i in range(ds.RasterCount):
+            assert (
+                ds_mat.GetRasterBand(i + 1).Checksum()
+                == ds.GetRasterBand(i + 1).Checksum()
+            )
+
+
+def test_gdal_merge_vrt_init(script_path, tmp_path, sample_tifs):
+
+    output_vrt = str(tmp_path / "out.vrt")
+    ret = test_py_scripts.run_py_script(
+        script_path, "gdal_merge", f"-init 255 -o {output_vrt} {sample_tifs[0]}"
+    )
+    assert "-init is not supported with a VRT output file" in ret
+    assert not os.path.exists(output_vrt)
@@ -185,6 +185,139 @@ def test_gdal_retile_non_contigous(script_path, tmp_path):
     assert os.path.exists(f"{out_dir}/1/in1_1_2.tif")
 
 
+###############################################################################
+# Test gdal_retile.py with more input tiles than the size of the pool of
+# open source tiles
+
+
+def test_gdal_retile_many_tiles(script_path, tmp_path):
+    drv = gdal.GetDriverByName("GTiff")
+
+    in_tifs = []
+    for i in range(5):
+        for j in range(4):
+            in_tif = str(tmp_path / f"in_{i}_{j}.tif")
+            with drv.Create(in_tif, 10, 10, 1) as ds:
+                ds.SetGeoTransform([i * 10, 1, 0, 40 - j * 10, 0, -1])
+                ds.GetRasterBand(1).Fill(i * 4 + j + 1)
+            in_tifs.append(in_tif)
+
+    out_dir = tmp_path / "outretile_many_tiles"
+    out_dir.mkdir()
+
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_retile",
+        f"--config GDAL_MAX_DATASET_POOL_SIZE 2 -levels 1 -ps 15 15 -targetDir {out_dir} "
+        + " ".join(in_tifs),
+    )
+
+    assert len(glob.glob(f"{out_dir}/*.tif")) == 12
+
+    with gdal.BuildVRT("", in_tifs) as src_ds, gdal.BuildVRT(
+        "", glob.glob(f"{out_dir}/*.tif")
+    ) as out_ds:
+        assert out_ds.RasterXSize == 50
+        assert out_ds.RasterYSize == 40
+        assert out_ds.GetGeoTransform() == src_ds.GetGeoTransform()
+        assert out_ds.ReadRaster() == src_ds.ReadRaster()
+
+    assert len(glob.glob(f"{out_dir}/1/*.tif")) == 4
+
+
+###############################################################################
+# Test that the VRT returned by mosaic_info.getDataSet() does not share its
+# sources, so that they are reused from the pool of datasets of the VRT driver
+# across output tiles
+
+
+def test_gdal_retile_mosaic_info_get_dataset(tmp_path):
+
+    from osgeo_utils import gdal_retile
+
+    drv = gdal.GetDriverByName("GTiff")
+
+    tile_index = gdal_retile.createTileIndex(
+        False, "TileIndex", "location", None, "Memory"
+    )
+    for i in range(2):
+        in_tif = str(tmp_path / f"in_{i}.tif")
+        with drv.Create(in_tif, 10, 10, 1) as ds:
+            ds.SetGeoTransform([i * 10, 1, 0, 10, 0, -1])
+            ds.GetRasterBand(1).Fill(i + 1)
+        points = gdal_retile.AffineTransformDecorator(
+            [i * 10, 1, 0, 10, 0, -1]
+        ).pointsFor(10, 10)
+        gdal_retile.addFeature("location", tile_index, in_tif, points[0], points[1])
+
+    minfo = gdal_retile.mosaic_info(str(tmp_path / "in_0.tif"), tile_index)
+    assert minfo.getDataSet(20, 0, 30, 10) is None
+
+    ds = minfo.getDataSet(5, 0, 15, 10)
+    assert ds.RasterXSize == 10
+    assert ds.RasterYSize == 10
+    assert ds.GetGeoTransform() == (5, 1, 0, 10, 0, -1)
+    assert ds.GetMetadata("xml:VRT")[0].count('<SourceFilename shared="0"') == 2
+    assert ds.ReadRaster() == (b"\x01" * 5 + b"\x02" * 5) * 10
+
+
+###############################################################################
+# Test gdal_retile.py -threads
+
+
+@pytest.mark.parametrize("threads", ["1", "4", "ALL_CPUS"])
+def test_gdal_retile_threads(script_path, tmp_path, threads):
+    drv = gdal.GetDriverByName("GTiff")
+
+    in_tifs = []
+    for i in range(3):
+        for j in range(3):
+            if i == 1 and j == 1:
+                continue
+            in_tif = str(tmp_path / f"in_{i}_{j}.tif")
+            with drv.Create(in_tif, 40, 40, 1) as ds:
+                ds.SetGeoTransform([i * 40, 1, 0, 120 - j * 40, 0, -1])
+                ds.GetRasterBand(1).Fill(i * 3 + j + 1)
+            in_tifs.append(in_tif)
+
+    results = []
+    for options in ["", f"-threads {threads}"]:
+        out_dir = tmp_path / f"out{len(results)}"
+        out_dir.mkdir()
+        test_py_scripts.run_py_script(
+            script_path,
+            "gdal_retile",
+            f"{options} -levels 3 -ps 16 16 -csv index.csv -targetDir {out_dir} "
+            + " ".join(in_tifs),
+        )
+        result = []
+        for level in ["", "1/", "2/", "3/"]:
+            with open(f"{out_dir}/{level}index.csv") as f:
+                index = f.read()
+            result.append(index)
+            for line in index.splitlines():
+                tilename = line.split(";")[0]
+                with gdal.Open(f"{out_dir}/{level}{tilename}") as ds:
+                    result.append((ds.GetGeoTransform(), ds.ReadRaster()))
+        results.append(result)
+
+    assert results[1] == results[0]
+    # the tile in the hole of the input is skipped
+    assert os.path.exists(tmp_path / "out0" / "in_0_0_3_3.tif")
+    assert not os.path.exists(tmp_path / "out0" / "in_0_0_4_4.tif")
+
+
+def test_gdal_retile_threads_invalid(script_path, tmp_path):
+
+    _, err = test_py_scripts.run_py_script(
+        script_path,
+        "gdal_retile",
+        f"-threads 0 -targetDir {tmp_path} in.tif",
+        return_stderr=True,
+    )
+    assert "Invalid value for -threads: 0" in err
+
+
 ###############################################################################
 # Test gdal_retile.py with input images of different pixel sizes
 
@@ -32,6 +32,7 @@ from osgeo_utils.auxiliary import array_util, base, color_table, raster_creation
 from osgeo_utils.auxiliary.color_palette import ColorPalette
 from osgeo_utils.auxiliary.color_table import get_color_table
 from osgeo_utils.auxiliary.extent_util import Extent
+from osgeo_utils.auxiliary.rtree import RTree
 
 
 def test_utils_py_0():
@@ -300,3 +301,84 @@ def test_utils_util_GetOutputDriverFor():
     assert util.GetOutputDriverFor("foo.img") == "HFA"
     assert util.GetOutputDriverFor("foo.nc") == "netCDF"
     assert util.GetOutputDriverFor("foo.geojson", is_raster=False) == "GeoJSON"
+
+
+def test_utils_rtree():
+    """test rtree.RTree against a brute force search"""
+
+    assert RTree().query(0, 1, 0, 1) == []
+
+    envelopes = []
+    for i in range(40):
+        for j in range(25):
+            x = i * 10 + (j % 3)
+            y = j * 7 - (i % 5)
+            envelopes.append((x, x + 1 + (i * j) % 13, y, y + 1 + (i + j) % 11))
+    tree = RTree(((env, "item%d" % k) for k, env in enumerate(envelopes)), 4)
+    assert len(tree) == len(envelopes)
+
+    for min_x, max_x, min_y, max_y in [
+        (0, 0, 0, 0),
+        (-10, -1, -10, -1),
+        (15, 37, 20, 42),
+        (100, 101, 100, 101),
+        (-1000, 1000, -1000, 1000),
+        (399, 399, 10, 300),
+    ]:
+        expected = [
+            k
+            for k, env in enumerate(envelopes)
+            if env[0] <= max_x
+            and env[1] >= min_x
+            and env[2] <= max_y
+            and env[3] >= min_y
+        ]
+        assert tree.query_indices(min_x, max_x, min_y, max_y) == expected
+        assert tree.query(min_x, max_x, min_y, max_y) == [
+            "item%d" % k for k in expected
+        ]
+
+    with pytest.raises(ValueError):
+        RTree(node_capacity=1)
+
+
+@pytest.mark.parametrize("threads", [None, 3])
+@pytest.mark.parametrize("halo", [0, 2])
+def test_utils_block_util(threads, halo):
+    """test block_util.map_blocks() with a neighbourhood sum"""
+    np = pytest.importorskip("numpy")
+    from osgeo_utils.auxiliary import block_util
+
+    src_ds = gdal.GetDriverByName("MEM").Create("", 53, 41, 1, gdal.GDT_Int32)
+    ar = np.arange(53 * 41, dtype=np.int32).reshape(41, 53)
+    src_ds.GetRasterBand(1).WriteArray(ar)
+    dst_ds = gdal.GetDriverByName("MEM").Create("", 53, 41, 1, gdal.GDT_Int32)
+
+    windows = list(block_util.block_windows(src_ds.GetRasterBand(1), window_pixels=200))
+    assert sum(w.xsize * w.ysize for w in windows) == 53 * 41
+    # the single-line blocks of MEM datasets are grouped
+    assert len(windows) < 41
+
+    def neighbourhood_sum(window, data):
+        assert data.shape == (window.ysize + 2 * halo, window.xsize + 2 * halo)
+        out = np.zeros((window.ysize, window.xsize), dtype=np.int32)
+        for i in range(2 * halo + 1):
+            for j in range(2 * halo + 1):
+                out += data[i : i + window.ysize, j : j + window.xsize]
+        return out
+
+    progress = []
+    block_util.map_blocks(
+        neighbourhood_sum,
+        src_ds.GetRasterBand(1),
+        dst_ds.GetRasterBand(1),
+        halo=halo,
+        threads=threads,
+        window_pixels=200,
+        callback=progress.append,
+    )
+    assert progress[0] == 0 and progress[-1] == 1
+
+    padded = np.pad(ar, halo, mode="edge")
+    expected = neighbourhood_sum(block_util.Window(0, 0, 53, 41), padded)
+    assert np.array_equal(dst_ds.GetRasterBand(1).ReadAsArray(), expected)
@@ -354,3 +354,154 @@ def test_gdalcompare_float32_only_nodata(tmp_vsimem):
         )
         == 2
     )
+
+
+###############################################################################
+
+
+def test_gdalcompare_tolerance(tmp_vsimem, captured_print, source_filename):
+
+    golden_filename = source_filename
+    filename = str(tmp_vsimem / "new.tif")
+    gdal.Translate(filename, golden_filename)
+    with gdal.Open(filename, gdal.GA_Update) as ds:
+        ds.GetRasterBand(1).WriteRaster(0, 0, 1, 1, b"\x00")
+    with gdal.Open(golden_filename) as ds:
+        max_diff = ds.GetRasterBand(1).ReadRaster(0, 0, 1, 1)[0]
+
+    assert (
+        gdalcompare.find_diff(golden_filename, filename, options=["SKIP_BINARY"]) == 1
+    )
+    assert (
+        gdalcompare.find_diff(
+            golden_filename,
+            filename,
+            options=["SKIP_BINARY", "TOLERANCE=%d" % max_diff],
+        )
+        == 0
+    )
+    assert (
+        gdalcompare.find_diff(
+            golden_filename,
+            filename,
+            options=["SKIP_BINARY", "TOLERANCE=%d" % (max_diff - 1)],
+        )
+        == 1
+    )
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize("num_threads", ["1", "4", "ALL_CPUS"])
+def test_gdalcompare_blocks(tmp_vsimem, num_threads):
+
+    golden_filename = str(tmp_vsimem / "golden.tif")
+    ds = gdal.GetDriverByName("GTiff").Create(
+        golden_filename,
+        200,
+        150,
+        1,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ds.GetRasterBand(1).Fill(10)
+    ds.Close()
+
+    filename = str(tmp_vsimem / "new.tif")
+    gdal.Translate(filename, golden_filename)
+    with gdal.Open(filename, gdal.GA_Update) as ds:
+        # differences in the first and last blocks
+        ds.GetRasterBand(1).WriteRaster(0, 0, 2, 1, b"\x0c\x0b")
+        ds.GetRasterBand(1).WriteRaster(199, 149, 1, 1, b"\x00")
+
+    messages = []
+    ori_print = gdalcompare.my_print
+    gdalcompare.my_print = messages.append
+    try:
+        assert (
+            gdalcompare.find_diff(
+                golden_filename,
+                filename,
+                options=["SKIP_BINARY", "NUM_THREADS=" + num_threads],
+            )
+            == 1
+        )
+        assert "  Pixels Differing: 3" in messages
+        assert "  Maximum Pixel Difference: 10.0" in messages
+
+        messages.clear()
+        saved_window_pixels = gdalcompare.WINDOW_PIXELS
+        gdalcompare.WINDOW_PIXELS = 16 * 16
+        try:
+            assert (
+                gdalcompare.find_diff(
+                    golden_filename,
+                    filename,
+                    options=["SKIP_BINARY", "FAIL_FAST", "NUM_THREADS=" + num_threads],
+                )
+                == 1
+            )
+        finally:
+            gdalcompare.WINDOW_PIXELS = saved_window_pixels
+        assert "  Pixels Differing: 2" in messages
+        assert "  Maximum Pixel Difference: 2.0" in messages
+    finally:
+        gdalcompare.my_print = ori_print
+
+
+###############################################################################
+# Test fallback to gdal.Open() when a thread-safe opening fails, without
+# exceptions
+
+
+def test_gdalcompare_thread_safe_open_failure(tmp_vsimem, monkeypatch):
+
+    golden_filename = str(tmp_vsimem / "golden.tif")
+    filename = str(tmp_vsimem / "new.tif")
+    ds = gdal.GetDriverByName("GTiff").Create(golden_filename, 10, 10)
+    ds.Close()
+    ds = gdal.GetDriverByName("GTiff").Create(filename, 10, 10)
+    ds.GetRasterBand(1).Fill(1)
+    ds.Close()
+
+    ori_openex = gdal.OpenEx
+
+    def openex(filename, flags, *args, **kwargs):
+        if flags & gdal.OF_THREAD_SAFE:
+            return None
+        return ori_openex(filename, flags, *args, **kwargs)
+
+    monkeypatch.setattr(gdal, "OpenEx", openex)
+
+    with gdal.ExceptionMgr(useExceptions=False):
+        assert (
+            gdalcompare.find_diff(
+                golden_filename, filename, options=["SKIP_BINARY", "NUM_THREADS=2"]
+            )
+            == 1
+        )
+
+
+###############################################################################
+
+
+def test_gdalcompare_fail_fast_bands(tmp_vsimem, captured_print):
+
+    golden_filename = str(tmp_vsimem / "golden.tif")
+    filename = str(tmp_vsimem / "new.tif")
+    ds = gdal.GetDriverByName("GTiff").Create(golden_filename, 10, 10, 2)
+    ds.Close()
+    ds = gdal.GetDriverByName("GTiff").Create(filename, 10, 10, 2)
+    ds.GetRasterBand(1).Fill(1)
+    ds.GetRasterBand(2).Fill(1)
+    ds.Close()
+
+    assert (
+        gdalcompare.find_diff(golden_filename, filename, options=["SKIP_BINARY"]) == 2
+    )
+    assert (
+        gdalcompare.find_diff(
+            golden_filename, filename, options=["SKIP_BINARY", "FAIL_FAST"]
+        )
+        == 1
+    )
@@ -201,3 +201,19 @@ def test_gdallocationinfo_py_7(tmp_path):
                 outputs = list(zip(x, y, pixels, lines, *results))
                 print(f"ovr: {ovr_idx}, srs: {srs}, x/y/pixel/line/result: {outputs}")
             assert_allclose(expected, actual, rtol=1e-4, atol=1e-3)
+
+
+def test_gdallocationinfo_py_resample_alg_raster_io():
+    # Resampling algorithms not handled by Band.SamplePoints() use RasterIO()
+    x = np.array([0.5, 3.5, 19.5])
+    y = np.array([0.5, 10.5, 19.5])
+    _, _, nearest = gdallocationinfo.gdallocationinfo(
+        filename_or_ds="../gcore/data/byte.tif", x=x.copy(), y=y.copy()
+    )
+    _, _, average = gdallocationinfo.gdallocationinfo(
+        filename_or_ds="../gcore/data/byte.tif",
+        x=x.copy(),
+        y=y.copy(),
+        resample_alg=gdal.GRIORA_Average,
+    )
+    assert average.tolist() == nearest.tolist()
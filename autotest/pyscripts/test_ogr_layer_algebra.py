@@ -453,3 +453,105 @@ def test_ogr_layer_algebra_erase(script_path, tmp_path):
     featureCount = layer.GetFeatureCount()
 
     assert featureCount == 2
+
+
+###############################################################################
+
+# Test that -index and -threads give the same output as the OGRLayer methods
+
+
+@pytest.mark.parametrize("operation", ["Union", "Intersection", "Clip", "Erase"])
+def test_ogr_layer_algebra_index(script_path, tmp_path, operation):
+
+    input_path = str(tmp_path / "input_layer.shp")
+    method_path = str(tmp_path / "method_layer.shp")
+
+    input_ds = ogr.GetDriverByName("ESRI Shapefile").CreateDataSource(input_path)
+    method_ds = ogr.GetDriverByName("ESRI Shapefile").CreateDataSource(method_path)
+
+    A = input_ds.CreateLayer("poly")
+    A.CreateField(ogr.FieldDefn("a", ogr.OFTInteger))
+    A.CreateField(ogr.FieldDefn("common", ogr.OFTString))
+    B = method_ds.CreateLayer("poly")
+    B.CreateField(ogr.FieldDefn("b", ogr.OFTInteger))
+    B.CreateField(ogr.FieldDefn("common", ogr.OFTString))
+
+    for i in range(5):
+        for j in range(5):
+            feat = ogr.Feature(A.GetLayerDefn())
+            feat["a"] = i * 5 + j
+            feat["common"] = "input"
+            x, y = i * 3, j * 3
+            feat.SetGeometryDirectly(
+                ogr.CreateGeometryFromWkt(
+                    f"POLYGON(({x} {y},{x} {y + 2},{x + 2} {y + 2},{x + 2} {y},{x} {y}))"
+                )
+            )
+            A.CreateFeature(feat)
+
+    for i in range(4):
+        feat = ogr.Feature(B.GetLayerDefn())
+        feat["b"] = i
+        feat["common"] = "method"
+        x, y = 1 + i * 3.5, 0.5 + i * 3
+        feat.SetGeometryDirectly(
+            ogr.CreateGeometryFromWkt(
+                f"POLYGON(({x} {y},{x} {y + 4},{x + 4} {y + 4},{x + 4} {y},{x} {y}))"
+            )
+        )
+        B.CreateFeature(feat)
+    # A method feature far from the input features
+    feat = ogr.Feature(B.GetLayerDefn())
+    feat["b"] = 100
+    feat.SetGeometryDirectly(
+        ogr.CreateGeometryFromWkt("POLYGON((100 100,100 101,101 101,101 100,100 100))")
+    )
+    B.CreateFeature(feat)
+
+    input_ds = None
+    method_ds = None
+
+    outputs = []
+    for i, extra in enumerate(("", "-index", "-threads 3")):
+        output_path = str(tmp_path / f"output_layer{i}.shp")
+        test_py_scripts.run_py_script(
+            script_path,
+            "ogr_layer_algebra",
+            f"{operation} -input_ds {input_path} -output_ds {output_path} -method_ds {method_path} {extra}",
+        )
+        outputs.append(ogr.Open(output_path))
+
+    def field_names(lyr):
+        defn = lyr.GetLayerDefn()
+        return [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())]
+
+    lyr_ref = outputs[0].GetLayer(0)
+    assert lyr_ref.GetFeatureCount() > 0
+
+    for output in outputs[1:]:
+        lyr = output.GetLayer(0)
+        assert field_names(lyr) == field_names(lyr_ref)
+        assert lyr.GetFeatureCount() == lyr_ref.GetFeatureCount()
+
+        lyr_ref.ResetReading()
+        for f_ref, f in zip(lyr_ref, lyr):
+            assert f.GetFID() == f_ref.GetFID()
+            for i in range(f.GetFieldCount()):
+                assert f.GetField(i) == f_ref.GetField(i)
+            ogrtest.check_feature_geometry(f, f_ref.GetGeometryRef())
+
+
+###############################################################################
+
+# Test invalid -threads value
+
+
+def test_ogr_layer_algebra_invalid_threads(script_path, tmp_path):
+
+    _, err = test_py_scripts.run_py_script(
+        script_path,
+        "ogr_layer_algebra",
+        f"Intersection -input_ds in.shp -output_ds {tmp_path}/out.shp -method_ds method.shp -threads 0",
+        return_stderr=True,
+    )
+    assert "Invalid value for -threads: 0" in err
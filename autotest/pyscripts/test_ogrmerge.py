@@ -11,6 +11,7 @@
 # SPDX-License-Identifier: MIT
 ###############################################################################
 
+import os
 import sys
 
 import gdaltest
@@ -654,3 +655,188 @@ def test_ogrmerge_gpkg_curve_geom_in_generic_layer(script_path, tmp_path):
     ds = None
 
     _validate_check(out_gpkg)
+
+
+###############################################################################
+# Test GPKG optimization with -bulk
+
+
+@pytest.mark.require_driver("GPKG")
+@pytest.mark.parametrize(
+    "threads,dst_has_spatial_index,has_progress",
+    [(None, True, False), (3, True, True), (3, False, False)],
+)
+def test_ogrmerge_gpkg_bulk(
+    script_path, tmp_path, threads, dst_has_spatial_index, has_progress
+):
+
+    # More sources than attached at once by -bulk
+    in_gpkgs = []
+    for i in range(10):
+        in_gpkg = str(tmp_path / f"in{i}.gpkg")
+        gdal.VectorTranslate(
+            in_gpkg,
+            test_py_scripts.get_data_path("ogr") + "poly.shp",
+            layerCreationOptions=[] if i % 2 else ["SPATIAL_INDEX=NO"],
+            where=f"EAS_ID > {160 + i}",
+        )
+        in_gpkgs.append(in_gpkg)
+    in_gpkg = str(tmp_path / "in_non_spatial.gpkg")
+    gdal.VectorTranslate(in_gpkg, test_py_scripts.get_data_path("ogr") + "idlink.dbf")
+    in_gpkgs.append(in_gpkg)
+    out_gpkg = str(tmp_path / "out.gpkg")
+
+    ogrmerge_opts = f"-f GPKG -o {out_gpkg} -bulk " + " ".join(in_gpkgs)
+    if threads:
+        ogrmerge_opts += f" -threads {threads}"
+    if not dst_has_spatial_index:
+        ogrmerge_opts += " -lco SPATIAL_INDEX=NO"
+    if has_progress:
+        ogrmerge_opts += " -progress"
+    _, err = test_py_scripts.run_py_script(
+        script_path, "ogrmerge", ogrmerge_opts, return_stderr=True
+    )
+    assert "WARNING" not in err
+
+    _validate_check(out_gpkg)
+
+    ds = ogr.Open(out_gpkg)
+    assert ds.GetLayerCount() == len(in_gpkgs)
+    for i, in_gpkg in enumerate(in_gpkgs):
+        src_ds = ogr.Open(in_gpkg)
+        src_lyr = src_ds.GetLayer(0)
+        lyr = ds.GetLayer(i)
+        assert (
+            lyr.GetName() == os.path.basename(in_gpkg)[0:-5] + "_" + src_lyr.GetName()
+        )
+        assert lyr.GetFeatureCount() == src_lyr.GetFeatureCount()
+        assert [f.ExportToJson() for f in lyr] == [f.ExportToJson() for f in src_lyr]
+
+        if src_lyr.GetGeomType() == ogr.wkbNone:
+            continue
+        assert lyr.GetExtent() == src_lyr.GetExtent()
+        with ds.ExecuteSQL(
+            "SELECT HasSpatialIndex('%s', 'geom')" % lyr.GetName()
+        ) as sql_lyr:
+            assert sql_lyr.GetNextFeature().GetField(0) == dst_has_spatial_index
+        # Without a spatial index, GetFeatureCount() counts the features by
+        # envelope, so compare the features selected by the filter
+        lyr.SetSpatialFilterRect(479750, 4764000, 480500, 4765000)
+        src_lyr.SetSpatialFilterRect(479750, 4764000, 480500, 4765000)
+        assert [f.GetFID() for f in lyr] == [f.GetFID() for f in src_lyr]
+    ds = None
+
+
+###############################################################################
+# Test -single -arrow
+
+
+@pytest.mark.require_driver("GPKG")
+@pytest.mark.parametrize("threads", [None, 2])
+def test_ogrmerge_single_arrow(script_path, tmp_path, threads):
+    pytest.importorskip("pyarrow")
+
+    json1 = str(tmp_path / "one.json")
+    json2 = str(tmp_path / "two.json")
+    out_gpkg = str(tmp_path / "out.gpkg")
+
+    with open(json1, "wb") as f:
+        f.write(
+            b"""{ "type": "FeatureCollection", "features": [
+            { "type": "Feature", "properties": {"val": 1, "name": "a"}, "geometry": {"type": "Point", "coordinates": [1, 2]} },
+            { "type": "Feature", "properties": {"val": 2, "name": "b"}, "geometry": {"type": "Point", "coordinates": [3, 4]} } ]}"""
+        )
+    with open(json2, "wb") as f:
+        f.write(
+            b"""{ "type": "FeatureCollection", "features": [
+            { "type": "Feature", "properties": {"VAL": 3.5, "other": "c"}, "geometry": {"type": "Point", "coordinates": [5, 6]} } ]}"""
+        )
+
+    args = f"-single -arrow -o {out_gpkg} {json1} {json2} -src_layer_field_name src"
+    if threads:
+        args += f" -threads {threads}"
+    _, err = test_py_scripts.run_py_script(
+        script_path, "ogrmerge", args, return_stderr=True
+    )
+    assert "WARNING" not in err
+
+    ds = ogr.Open(out_gpkg)
+    lyr = ds.GetLayer(0)
+    assert lyr.GetName() == "merged"
+    assert lyr.GetGeomType() == ogr.wkbPoint
+    defn = lyr.GetLayerDefn()
+    assert [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())] == [
+        "src",
+        "val",
+        "name",
+        "other",
+    ]
+    assert defn.GetFieldDefn(1).GetType() == ogr.OFTReal
+    assert lyr.GetFeatureCount() == 3
+    assert [(f["src"], f["val"], f["name"], f["other"]) for f in lyr] == [
+        ("one", 1, "a", None),
+        ("one", 2, "b", None),
+        ("two", 3.5, None, "c"),
+    ]
+    lyr.ResetReading()
+    assert [f.GetGeometryRef().ExportToWkt() for f in lyr] == [
+        "POINT (1 2)",
+        "POINT (3 4)",
+        "POINT (5 6)",
+    ]
+    ds = None
+
+
+###############################################################################
+# Test -single -arrow -threads with more sources than threads
+
+
+@pytest.mark.require_driver("GPKG")
+def test_ogrmerge_single_arrow_threads_order(script_path, tmp_path):
+    pytest.importorskip("pyarrow")
+
+    src_ds = ogr.Open(test_py_scripts.get_data_path("ogr") + "poly.shp")
+    src_lyr = src_ds.GetLayer(0)
+    sources = []
+    for i in range(7):
+        filename = str(tmp_path / f"src{i}.gpkg")
+        gdal.VectorTranslate(filename, src_ds, where=f"EAS_ID > {160 + i}")
+        sources.append(filename)
+    expected = []
+    for i in range(7):
+        src_lyr.SetAttributeFilter(f"EAS_ID > {160 + i}")
+        expected += [f["EAS_ID"] for f in src_lyr]
+
+    out_gpkg = str(tmp_path / "out.gpkg")
+    test_py_scripts.run_py_script(
+        script_path,
+        "ogrmerge",
+        f"-single -arrow -threads 2 -o {out_gpkg} " + " ".join(sources),
+    )
+
+    ds = ogr.Open(out_gpkg)
+    assert [f["EAS_ID"] for f in ds.GetLayer(0)] == expected
+
+
+###############################################################################
+# Test -single -arrow with options it does not support
+
+
+def test_ogrmerge_single_arrow_ignored(script_path, tmp_path):
+    pytest.importorskip("pyarrow")
+
+    out_vrt = str(tmp_path / "out.vrt")
+
+    _, err = test_py_scripts.run_py_script(
+        script_path,
+        "ogrmerge",
+        f"-single -arrow -f VRT -o {out_vrt} "
+        + test_py_scripts.get_data_path("ogr")
+        + "poly.shp",
+        return_stderr=True,
+    )
+    assert "-arrow is incompatible with VRT output" in err
+
+    ds = ogr.Open(out_vrt)
+    assert ds.GetLayer(0).GetFeatureCount() == 10
+    ds = None
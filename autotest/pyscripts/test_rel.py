@@ -0,0 +1,86 @@
+#!/usr/bin/env pytest
+# -*- coding: utf-8 -*-
+###############################################################################
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  rel.py testing
+#
+###############################################################################
+# Copyright (c) 2026, GDAL contributors
+#
+# SPDX-License-Identifier: MIT
+###############################################################################
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import test_py_scripts
+
+from osgeo import gdal
+
+pytestmark = pytest.mark.skipif(
+    test_py_scripts.get_py_script("rel") is None,
+    reason="rel.py not available",
+)
+
+
+@pytest.fixture()
+def script_path():
+    return test_py_scripts.get_py_script("rel")
+
+
+###############################################################################
+# Test rel.py on a tiled input, against a NumPy computation on the whole raster
+
+
+def test_rel_tiled(script_path, tmp_path):
+
+    src_filename = str(tmp_path / "dem.tif")
+    dst_filename = str(tmp_path / "rel.tif")
+
+    rng = np.random.default_rng(0)
+    dem = rng.integers(-1000, 1000, (130, 150)).astype(np.int16)
+    ds = gdal.GetDriverByName("GTiff").Create(
+        src_filename,
+        150,
+        130,
+        1,
+        gdal.GDT_Int16,
+        options=["TILED=YES", "BLOCKXSIZE=32", "BLOCKYSIZE=32"],
+    )
+    ds.SetGeoTransform([0, 10, 0, 0, 0, -20])
+    ds.GetRasterBand(1).WriteArray(dem)
+    ds = None
+
+    test_py_scripts.run_py_script(
+        script_path,
+        "rel",
+        f"-lsrcaz 315 -lsrcel 45 -elstep 2 {src_filename} {dst_filename}",
+    )
+
+    lsrcaz = 315 / 180.0 * math.pi
+    lsrcel = 45 / 180.0 * math.pi
+    lx = -math.sin(lsrcaz) * math.cos(lsrcel)
+    ly = math.cos(lsrcaz) * math.cos(lsrcel)
+    lz = math.sin(lsrcel)
+    lxyz = math.sqrt(lx**2 + ly**2 + lz**2)
+    dx = 2 * 10.0
+    dy = 2 * 20.0
+
+    elevation = dem.astype(np.float64)
+    dzx = (elevation[1:-1, :-2] - elevation[1:-1, 2:]) * 2.0
+    dzy = (elevation[:-2, 1:-1] - elevation[2:, 1:-1]) * 2.0
+    nx = -dy * dzx
+    ny = dx * dzy
+    nz = dx * dy
+    nxyz = nx * nx + ny * ny + nz * nz
+    nlxyz = nx * lx + ny * ly + nz * lz
+    cosine = np.clip(255.0 * (nlxyz / (lxyz * np.sqrt(nxyz))), 0.0, 255.0)
+    expected = np.zeros(dem.shape, dtype=np.uint8)
+    expected[1:-1, 1:-1] = cosine.astype(np.uint8)
+
+    ds = gdal.Open(dst_filename)
+    assert ds.GetGeoTransform() == (0, 10, 0, 0, 0, -20)
+    np.testing.assert_array_equal(ds.GetRasterBand(1).ReadAsArray(), expected)
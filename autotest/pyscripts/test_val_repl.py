@@ -0,0 +1,64 @@
+#!/usr/bin/env pytest
+# -*- coding: utf-8 -*-
+###############################################################################
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  val_repl.py testing
+#
+###############################################################################
+# Copyright (c) 2026, GDAL contributors
+#
+# SPDX-License-Identifier: MIT
+###############################################################################
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import test_py_scripts
+
+from osgeo import gdal
+
+pytestmark = pytest.mark.skipif(
+    test_py_scripts.get_py_script("val_repl") is None,
+    reason="val_repl.py not available",
+)
+
+
+@pytest.fixture()
+def script_path():
+    return test_py_scripts.get_py_script("val_repl")
+
+
+###############################################################################
+# Test val_repl.py on a tiled input with several bands
+
+
+def test_val_repl_tiled(script_path, tmp_path):
+
+    src_filename = str(tmp_path / "in.tif")
+    dst_filename = str(tmp_path / "out.tif")
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 100, (2, 70, 90)).astype(np.int16)
+    data[rng.random(data.shape) < 0.2] = -9999
+    ds = gdal.GetDriverByName("GTiff").Create(
+        src_filename,
+        90,
+        70,
+        2,
+        gdal.GDT_Int16,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ds.SetGeoTransform([2, 1, 0, 49, 0, -1])
+    ds.WriteArray(data)
+    ds = None
+
+    test_py_scripts.run_py_script(
+        script_path,
+        "val_repl",
+        f"-innd -9999 -outnd -1 -ot Int16 {src_filename} {dst_filename}",
+    )
+
+    ds = gdal.Open(dst_filename)
+    assert ds.GetGeoTransform() == (2, 1, 0, 49, 0, -1)
+    np.testing.assert_array_equal(ds.ReadAsArray(), np.where(data == -9999, -1, data))
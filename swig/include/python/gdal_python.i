@@ -1320,6 +1320,130 @@ void wrapper_VSIGetMemFileBuffer(const char *utf8_path, GByte **out, vsi_l_offse
                xSize = min(blockXSize, self.XSize - xOff)
                yield Window(xOff, yOff, xSize, ySize)
 
+  def SamplePoints(self, xs, ys, resampling=gdalconst.GRIORA_NearestNeighbour):
+       """Return the values of this ``Band`` at a series of points.
+
+       Points are sorted by block, so that each block containing points is
+       read once, whatever the order of the points.
+
+       Parameters
+       ----------
+       xs : array_like
+           Pixel coordinates of the points, ``0`` being the left edge of
+           the raster and ``0.5`` the center of the first column.
+       ys : array_like
+           Line coordinates of the points, with the same shape as ``xs``.
+       resampling : int, default = :py:const:`gdal.GRIORA_NearestNeighbour`
+           Resampling algorithm: :py:const:`gdal.GRIORA_NearestNeighbour`,
+           :py:const:`gdal.GRIORA_Bilinear`, :py:const:`gdal.GRIORA_Cubic` or
+           :py:const:`gdal.GRIORA_CubicSpline`. Only nearest neighbour
+           sampling is batched by block. The other algorithms make one
+           :py:meth:`InterpolateAtPoint` call per point, in block order so
+           that the blocks it reads stay in cache.
+
+       Returns
+       -------
+       np.ndarray
+           Array with the shape of ``xs``. With nearest neighbour
+           sampling, its data type is the one of the band, and points
+           outside the raster get the nodata value, or 0 if there is none
+           or the data type cannot represent it. Otherwise its
+           data type is float64 (complex128 for complex bands), and points
+           whose value cannot be interpolated get NaN.
+
+       Examples
+       --------
+       >>> import numpy as np
+       >>> ds = gdal.GetDriverByName("MEM").Create("", 4, 4, eType=gdal.GDT_Float32)
+       >>> ds.WriteArray(np.arange(16).reshape(4, 4))
+       0
+       >>> band = ds.GetRasterBand(1)
+       >>> band.SamplePoints([0.5, 3.2], [0.5, 2.9])
+       array([ 0., 11.], dtype=float32)
+       >>> band.SamplePoints([1.5], [1.0], resampling=gdal.GRIORA_Bilinear)
+       array([3.])
+       """
+       import numpy
+       from osgeo import gdal_array
+
+       if resampling not in (gdalconst.GRIORA_NearestNeighbour,
+                             gdalconst.GRIORA_Bilinear,
+                             gdalconst.GRIORA_Cubic,
+                             gdalconst.GRIORA_CubicSpline):
+           raise ValueError("Unsupported resampling for SamplePoints(): %s" % resampling)
+
+       xs = numpy.asarray(xs, dtype=numpy.float64)
+       ys = numpy.asarray(ys, dtype=numpy.float64)
+       if xs.shape != ys.shape:
+           raise ValueError("xs and ys should have the same shape")
+       shape = xs.shape
+       xs = xs.ravel()
+       ys = ys.ravel()
+
+       nearest = resampling == gdalconst.GRIORA_NearestNeighbour
+       if nearest:
+           dtype = gdal_array.GDALTypeCodeToNumericTypeCode(self.DataType)
+           nodata = self.GetNoDataValue()
+           # Nodata values that the data type of the band cannot represent
+           # (e.g. -9999 for a Byte band) are replaced by 0
+           if nodata is None:
+               nodata = 0
+           elif numpy.issubdtype(dtype, numpy.integer):
+               info = numpy.iinfo(dtype)
+               if not (info.min <= nodata <= info.max and nodata == numpy.floor(nodata)):
+                   nodata = 0
+           elif numpy.issubdtype(dtype, numpy.floating):
+               if numpy.isfinite(nodata) and abs(nodata) > float(numpy.finfo(dtype).max):
+                   nodata = 0
+           result = numpy.full(xs.shape, nodata, dtype=dtype)
+       else:
+           from . import gdal
+           result = numpy.full(xs.shape, numpy.nan,
+                               dtype=numpy.complex128 if gdal.DataTypeIsComplex(self.DataType) else numpy.float64)
+
+       # Same rounding as the nearest neighbour resampling of RasterIO()
+       EPS = 1e-10
+       cols = numpy.floor(xs + EPS)
+       rows = numpy.floor(ys + EPS)
+       if nearest:
+           inside = (cols >= 0) & (cols < self.XSize) & (rows >= 0) & (rows < self.YSize)
+       else:
+           inside = (xs >= 0) & (xs <= self.XSize) & (ys >= 0) & (ys <= self.YSize)
+       indices = numpy.flatnonzero(inside)
+       if len(indices) == 0:
+           return result.reshape(shape)
+       cols = numpy.minimum(cols[indices].astype(numpy.int64), self.XSize - 1)
+       rows = numpy.minimum(rows[indices].astype(numpy.int64), self.YSize - 1)
+
+       blockXSize, blockYSize = self.GetBlockSize()
+       nBlocksX = (self.XSize + blockXSize - 1) // blockXSize
+       block_ids = (rows // blockYSize) * nBlocksX + cols // blockXSize
+       order = numpy.argsort(block_ids, kind="stable")
+
+       if not nearest:
+           # The blocks used for interpolation are cached by the band
+           for idx in indices[order]:
+               value = self.InterpolateAtPoint(float(xs[idx]), float(ys[idx]), resampling)
+               if value is not None:
+                   result[idx] = value
+           return result.reshape(shape)
+
+       block_ids = block_ids[order]
+       starts = numpy.flatnonzero(numpy.diff(block_ids, prepend=-1))
+       ends = numpy.append(starts[1:], len(block_ids))
+       for start, end in zip(starts, ends):
+           block_id = int(block_ids[start])
+           xOff = (block_id % nBlocksX) * blockXSize
+           yOff = (block_id // nBlocksX) * blockYSize
+           block = self.ReadAsArray(xOff, yOff,
+                                    min(blockXSize, self.XSize - xOff),
+                                    min(blockYSize, self.YSize - yOff))
+           if block is None:
+               raise RuntimeError(GetLastErrorMsg())
+           selected = order[start:end]
+           result[indices[selected]] = block[rows[selected] - yOff, cols[selected] - xOff]
+       return result.reshape(shape)
+
 
 %}
 
@@ -395,6 +395,199 @@ def _WarnIfUserHasNotSpecifiedIfUsingExceptions():
         return Stream(stream, use_masked_arrays)
 
 
+    def iter_batches(self, batch_size=65536, fields=None, geometry_format="wkb",
+                     include_fid=True, output="tuples"):
+        """Return an iterator over the features of the layer, by batches.
+
+           Batches are read with the ArrowStream of the layer, and converted
+           to NumPy arrays in C (see GetArrowStreamAsNumPy()), which avoids
+           creating a Feature object and calling GetField() for each feature.
+           This requires NumPy, but not PyArrow.
+
+           The attribute and spatial filters of the layer are honoured.
+           The reading of the layer is reset when the iteration starts.
+           Only one batch iteration (or ArrowStream) can be active at a time
+           on a layer. Only the requested columns are read: the ignored
+           fields of the layer (see SetIgnoredFields()) are changed during
+           the iteration, and restored to their previous state when it ends.
+
+           Parameters
+           ----------
+           batch_size : int, optional
+               Maximum number of features of a batch. Defaults to 65536.
+
+           fields : list of str, optional
+               Names of the attribute fields to return, in that order.
+               Defaults to all the fields of the layer.
+
+           geometry_format : str or None, optional
+               Format of the values of the geometry fields: ``"wkb"`` (bytes,
+               ISO WKB), ``"wkt"`` (str, ISO WKT) or ``"geometry"``
+               (:py:class:`Geometry` objects). If None, geometries are not
+               read. Defaults to ``"wkb"``.
+
+           include_fid : bool, optional
+               Whether to return the FID. Defaults to True.
+
+           output : str, optional
+               ``"tuples"`` to return each batch as a list of tuples
+               ``(fid, field_1, ..., field_n, geometry_1, ..., geometry_m)``,
+               with Python values (None for null values).
+               ``"numpy"`` to return each batch as a NumPy record array with
+               the same columns, named after the FID, fields and geometry
+               fields, with the value types of GetArrowStreamAsNumPy(). When a
+               batch has null attribute values, it is a masked record array
+               (numpy.ma.mrecords.MaskedRecords). Geometry columns are object
+               arrays, with None for null geometries.
+               Defaults to ``"tuples"``.
+
+           Returns
+           -------
+           iterator
+               An iterator over the batches.
+        """
+
+        import numpy as np
+
+        if geometry_format not in ("wkb", "wkt", "geometry", None):
+            raise ValueError("Invalid geometry_format: %s" % geometry_format)
+        if output not in ("tuples", "numpy"):
+            raise ValueError("Invalid output: %s" % output)
+        if batch_size <= 0:
+            raise ValueError("Invalid batch_size: %s" % batch_size)
+
+        defn = self.GetLayerDefn()
+        all_fields = [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())]
+        if fields is None:
+            fields = all_fields
+        else:
+            selected = []
+            for name in fields:
+                idx = defn.GetFieldIndex(name)
+                if idx < 0:
+                    raise KeyError("Illegal field requested in iter_batches(): %s" % name)
+                selected.append(all_fields[idx])
+            fields = selected
+
+        geom_fields = []
+        if geometry_format is not None:
+            for i in range(defn.GetGeomFieldCount()):
+                # Default geometry column name of OGRLayer::GetArrowStream()
+                geom_fields.append(defn.GetGeomFieldDefn(i).GetName() or "wkb_geometry")
+
+        ignored = [name for name in all_fields if name not in fields]
+        if geometry_format is None and defn.GetGeomFieldCount():
+            ignored.append("OGR_GEOMETRY")
+            for i in range(1, defn.GetGeomFieldCount()):
+                ignored.append(defn.GetGeomFieldDefn(i).GetName())
+
+        # The FID is always requested, as the batches would have no column
+        # otherwise.
+        fid_name = self.GetFIDColumn() or "OGC_FID"
+        options = ["INCLUDE_FID=YES",
+                   "MAX_FEATURES_IN_BATCH=%d" % batch_size,
+                   "GEOMETRY_ENCODING=WKB"]
+
+        def to_python(value):
+            if isinstance(value, np.ndarray):
+                if value.dtype.kind == "S":
+                    return [v.decode("utf-8") for v in value.tolist()]
+                return value.tolist()
+            return value
+
+        def column_as_list(values):
+            mask = None
+            if isinstance(values, np.ma.MaskedArray):
+                mask = np.ma.getmaskarray(values)
+                values = values.data
+            if values.dtype.kind == "S":
+                values = [v.decode("utf-8") for v in values.tolist()]
+            elif values.dtype.kind == "O":
+                values = [to_python(v) for v in values]
+            else:
+                if values.dtype.kind == "M" and values.dtype != np.dtype("datetime64[D]"):
+                    # tolist() returns integers for nanosecond datetimes
+                    values = values.astype("datetime64[us]")
+                values = values.tolist()
+            if mask is not None and mask.any():
+                values = [None if m else v for v, m in zip(values, mask.tolist())]
+            return values
+
+        def geometry_column_as_list(values):
+            values = column_as_list(values)
+            if geometry_format == "wkb":
+                return values
+            geoms = [None if v is None else CreateGeometryFromWkb(v) for v in values]
+            if geometry_format == "wkt":
+                return [None if g is None else g.ExportToIsoWkt() for g in geoms]
+            return geoms
+
+        def as_object_array(values):
+            # Filled element by element, as NumPy would iterate over
+            # the parts of Geometry objects
+            array = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                array[i] = value
+            return array
+
+        def convert(batch):
+            names = []
+            columns = []
+            if include_fid:
+                names.append(fid_name)
+                columns.append(batch[fid_name])
+            for name in fields:
+                names.append(name)
+                columns.append(batch[name])
+
+            if output == "tuples":
+                columns = [column_as_list(c) for c in columns]
+                columns += [geometry_column_as_list(batch[name]) for name in geom_fields]
+                if not columns:
+                    return [()] * len(batch[fid_name])
+                return list(zip(*columns))
+
+            for name in geom_fields:
+                names.append(name)
+                columns.append(as_object_array(geometry_column_as_list(batch[name])))
+            if any(isinstance(c, np.ma.MaskedArray) for c in columns):
+                import numpy.ma.mrecords
+                return numpy.ma.mrecords.fromarrays(columns, names=names)
+            return np.rec.fromarrays(columns, names=names)
+
+        def get_ignored_fields():
+            names = [name for i, name in enumerate(all_fields)
+                     if defn.GetFieldDefn(i).IsIgnored()]
+            for i in range(defn.GetGeomFieldCount()):
+                if defn.GetGeomFieldDefn(i).IsIgnored():
+                    names.append(defn.GetGeomFieldDefn(i).GetName()
+                                 if i > 0 else "OGR_GEOMETRY")
+            if defn.IsStyleIgnored():
+                names.append("OGR_STYLE")
+            return names
+
+        def generate():
+            previous_ignored = get_ignored_fields()
+            # The style is not part of the batches, so its state is kept
+            requested_ignored = ignored + [name for name in previous_ignored
+                                           if name == "OGR_STYLE"]
+            changed = sorted(requested_ignored) != sorted(previous_ignored)
+            if changed:
+                if self.SetIgnoredFields(requested_ignored) != OGRERR_NONE:
+                    raise Exception("SetIgnoredFields() failed")
+            try:
+                # The ArrowStream starts from the current read cursor
+                self.ResetReading()
+                with self.GetArrowStreamAsNumPy(options) as stream:
+                    for batch in stream:
+                        yield convert(batch)
+            finally:
+                if changed:
+                    self.SetIgnoredFields(previous_ignored)
+
+        return generate()
+
+
     def IsPyArrowSchemaSupported(self, pa_schema, options=[]):
         """Returns whether the passed pyarrow Schema is supported by the layer, as a tuple (success: bool, errorMsg: str).
 
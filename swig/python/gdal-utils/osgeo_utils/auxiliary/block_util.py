@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************************************
+#
+#  Project:  GDAL utils.auxiliary
+#  Purpose:  block-by-block processing of raster bands with numpy
+#
+# ******************************************************************************
+#  Copyright (c) 2026, GDAL contributors
+#
+# SPDX-License-Identifier: MIT
+# ******************************************************************************
+import collections
+import concurrent.futures
+from typing import Callable, Iterator, NamedTuple, Optional, Sequence, Union
+
+from osgeo import gdal
+from osgeo_utils.auxiliary.progress import ProgressCallback
+
+# Approximate number of pixels of a window, when the native blocks are smaller
+WINDOW_PIXELS = 256 * 1024
+
+BandOrBands = Union[gdal.Band, Sequence[gdal.Band]]
+
+
+class Window(NamedTuple):
+    xoff: int
+    yoff: int
+    xsize: int
+    ysize: int
+
+
+def block_windows(
+    band: gdal.Band, window_pixels: int = WINDOW_PIXELS
+) -> Iterator[Window]:
+    """
+    Iterate over the windows of a band, from left to right, then from top to bottom.
+
+    Windows are made of whole blocks of the band. Neighbouring blocks are
+    grouped, first along a row of blocks, then along the columns, up to
+    about window_pixels pixels, so that bands with small blocks or single-line
+    strips are not processed with too many small requests.
+    """
+    block_xsize, block_ysize = band.GetBlockSize()
+    block_xsize = min(block_xsize, band.XSize)
+    block_ysize = min(block_ysize, band.YSize)
+    win_xsize = min(
+        band.XSize, block_xsize * max(1, window_pixels // (block_xsize * block_ysize))
+    )
+    win_ysize = min(
+        band.YSize, block_ysize * max(1, window_pixels // (win_xsize * block_ysize))
+    )
+    for yoff in range(0, band.YSize, win_ysize):
+        for xoff in range(0, band.XSize, win_xsize):
+            yield Window(
+                xoff,
+                yoff,
+                min(win_xsize, band.XSize - xoff),
+                min(win_ysize, band.YSize - yoff),
+            )
+
+
+def read_window(
+    band: gdal.Band, window: Window, halo: int = 0, buf_type: Optional[int] = None
+):
+    """
+    Read a window of a band, extended by halo pixels on each side.
+
+    Pixels of the halo beyond the edges of the raster replicate the
+    nearest edge pixel, so that the returned array always has the shape
+    (window.ysize + 2 * halo, window.xsize + 2 * halo).
+    """
+    import numpy as np
+
+    xoff = max(0, window.xoff - halo)
+    yoff = max(0, window.yoff - halo)
+    xend = min(band.XSize, window.xoff + window.xsize + halo)
+    yend = min(band.YSize, window.yoff + window.ysize + halo)
+    data = band.ReadAsArray(xoff, yoff, xend - xoff, yend - yoff, buf_type=buf_type)
+    if data is None:
+        raise Exception(f"Cannot read window {tuple(window)} of band")
+    pad = (
+        (yoff - (window.yoff - halo), window.yoff + window.ysize + halo - yend),
+        (xoff - (window.xoff - halo), window.xoff + window.xsize + halo - xend),
+    )
+    if any(pad[0]) or any(pad[1]):
+        data = np.pad(data, pad, mode="edge")
+    return data
+
+
+def _advise_read(bands: Sequence[gdal.Band], windows: Sequence[Window], halo: int):
+    """Announce to the drivers the region covered by a row of windows."""
+    first, last = windows[0], windows[-1]
+    for band in bands:
+        xoff = max(0, first.xoff - halo)
+        yoff = max(0, first.yoff - halo)
+        xend = min(band.XSize, last.xoff + last.xsize + halo)
+        yend = min(band.YSize, last.yoff + last.ysize + halo)
+        band.AdviseRead(xoff, yoff, xend - xoff, yend - yoff)
+
+
+def map_blocks(
+    func: Callable,
+    src_bands: BandOrBands,
+    dst_bands: BandOrBands,
+    halo: int = 0,
+    buf_type: Optional[int] = None,
+    threads: Optional[int] = None,
+    advise_read: bool = True,
+    window_pixels: int = WINDOW_PIXELS,
+    callback: ProgressCallback = None,
+) -> None:
+    """
+    Apply a function to the source bands block by block, and write the results
+    to the destination bands.
+
+    func is called as func(window, array_1, ..., array_n), with one array per
+    source band, extended by halo pixels on each side (see read_window()).
+    It returns the array of the window for the destination band, or a
+    sequence of arrays when dst_bands is a sequence.
+
+    Windows follow the blocks of the first source band (see block_windows()).
+    Each row of windows is announced to the drivers with AdviseRead() before
+    being read. Reading and writing happen in the calling thread. With
+    threads > 1, func runs in a thread pool, on a bounded number of windows
+    read ahead, and results are written in order. NumPy releases the GIL
+    in most of its operations, so that such functions actually run
+    concurrently.
+
+    With halo > 0, the destination bands should not be the source bands, as
+    the halo of a window may have been written already.
+
+    callback -- optional progress callback, called with the completed fraction.
+    """
+    if isinstance(src_bands, gdal.Band):
+        src_bands = [src_bands]
+    single_dst = isinstance(dst_bands, gdal.Band)
+    if single_dst:
+        dst_bands = [dst_bands]
+
+    windows = list(block_windows(src_bands[0], window_pixels=window_pixels))
+    rows = collections.OrderedDict()
+    for window in windows:
+        rows.setdefault(window.yoff, []).append(window)
+
+    def read(window):
+        if advise_read and window.xoff == 0:
+            _advise_read(src_bands, rows[window.yoff], halo)
+        return [read_window(band, window, halo, buf_type) for band in src_bands]
+
+    def write(window, result):
+        if single_dst:
+            result = [result]
+        for band, data in zip(dst_bands, result):
+            band.WriteArray(data, window.xoff, window.yoff)
+
+    if callback is not None:
+        callback(0.0)
+    done_pixels = 0
+    total_pixels = src_bands[0].XSize * src_bands[0].YSize
+
+    def progress(window):
+        nonlocal done_pixels
+        done_pixels += window.xsize * window.ysize
+        if callback is not None:
+            callback(done_pixels / total_pixels)
+
+    if threads is None or threads <= 1:
+        for window in windows:
+            write(window, func(window, *read(window)))
+            progress(window)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = collections.deque()
+        for window in windows:
+            pending.append((window, executor.submit(func, window, *read(window))))
+            if len(pending) >= 2 * threads:
+                window, future = pending.popleft()
+                write(window, future.result())
+                progress(window)
+        while pending:
+            window, future = pending.popleft()
+            write(window, future.result())
+            progress(window)
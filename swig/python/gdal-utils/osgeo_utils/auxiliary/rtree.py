@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************************************
+#
+#  Project:  GDAL
+#  Purpose:  static R-tree of rectangles, for spatial lookups in Python
+#
+# ******************************************************************************
+#  Copyright (c) 2026, GDAL contributors
+#
+# SPDX-License-Identifier: MIT
+# ******************************************************************************
+import math
+from typing import Any, Iterable, List, Sequence, Tuple
+
+# (min_x, max_x, min_y, max_y), as returned by ogr.Geometry.GetEnvelope()
+Envelope = Sequence[float]
+
+
+class RTree:
+    """
+    A static R-tree of items with a rectangular envelope.
+
+    The tree is bulk loaded with the Sort-Tile-Recursive algorithm, and
+    cannot be modified afterwards. Queries return the items in the order
+    they were given, so that the tree can replace a spatially filtered
+    traversal of an OGR layer.
+    """
+
+    def __init__(
+        self, items: Iterable[Tuple[Envelope, Any]] = (), node_capacity: int = 16
+    ):
+        """
+        items -- (envelope, item) pairs, envelope being a
+        (min_x, max_x, min_y, max_y) tuple.
+
+        node_capacity -- maximum number of children of a node.
+        """
+        if node_capacity < 2:
+            raise ValueError("node_capacity must be at least 2")
+        self.node_capacity = node_capacity
+        self.items = []
+        # Nodes are (envelope, is_leaf, children) tuples. The entries of the
+        # items are leaves whose children is the index of the item.
+        nodes = []
+        for idx, (envelope, item) in enumerate(items):
+            self.items.append(item)
+            nodes.append((tuple(envelope), True, idx))
+        self.root = None
+        while nodes:
+            if len(nodes) == 1 and not nodes[0][1]:
+                self.root = nodes[0]
+                break
+            nodes = self._pack(nodes)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _pack(self, nodes):
+        """Group nodes by node_capacity, in tiles of neighbouring nodes."""
+
+        def center_x(node):
+            return node[0][0] + node[0][1]
+
+        def center_y(node):
+            return node[0][2] + node[0][3]
+
+        capacity = self.node_capacity
+        node_count = math.ceil(len(nodes) / capacity)
+        slice_count = math.ceil(math.sqrt(node_count))
+        slice_size = slice_count * capacity
+
+        parents = []
+        nodes = sorted(nodes, key=center_x)
+        for slice_start in range(0, len(nodes), slice_size):
+            vertical_slice = sorted(
+                nodes[slice_start : slice_start + slice_size], key=center_y
+            )
+            for start in range(0, len(vertical_slice), capacity):
+                children = vertical_slice[start : start + capacity]
+                envelope = (
+                    min(child[0][0] for child in children),
+                    max(child[0][1] for child in children),
+                    min(child[0][2] for child in children),
+                    max(child[0][3] for child in children),
+                )
+                parents.append((envelope, False, children))
+        return parents
+
+    def query_indices(
+        self, min_x: float, max_x: float, min_y: float, max_y: float
+    ) -> List[int]:
+        """
+        Return the indices, in increasing order, of the items whose envelope
+        intersects or touches the given rectangle.
+        """
+        result = []
+        if self.root is None:
+            return result
+        stack = [self.root]
+        while stack:
+            envelope, is_leaf, children = stack.pop()
+            if (
+                envelope[0] > max_x
+                or envelope[1] < min_x
+                or envelope[2] > max_y
+                or envelope[3] < min_y
+            ):
+                continue
+            if is_leaf:
+                result.append(children)
+            else:
+                stack.extend(children)
+        result.sort()
+        return result
+
+    def query(self, min_x: float, max_x: float, min_y: float, max_y: float) -> list:
+        """
+        Return the items whose envelope intersects or touches the given
+        rectangle, in the order they were given.
+        """
+        return [
+            self.items[idx] for idx in self.query_indices(min_x, max_x, min_y, max_y)
+        ]
@@ -19,20 +19,28 @@
 # SPDX-License-Identifier: MIT
 # ******************************************************************************
 
+import collections
 import contextlib
 import glob
+import gzip
+import hashlib
 import json
 import logging
 import math
 import optparse
 import os
+import queue
 import shutil
+import sqlite3
 import stat
+import struct
 import sys
 import tempfile
 import threading
+import urllib.request
+from abc import ABC, abstractmethod
 from functools import partial
-from typing import Any, Dict, List, NoReturn, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, NoReturn, Optional, Tuple
 from uuid import uuid4
 from xml.etree import ElementTree
 
@@ -40,6 +48,10 @@ from osgeo import gdal, osr
 from osgeo_utils.auxiliary.util import enable_gdal_exceptions
 
 Options = Any
+# (tz, tx, ty, encoded tile content), with ty in the TMS numbering
+EncodedTile = Tuple[int, int, int, bytes]
+# (tz, ty, tx_min, tx_max): row segment of tiles, with ty in the TMS numbering
+TileRange = Tuple[int, int, int, int]
 
 __version__ = gdal.__version__
 
@@ -59,6 +71,7 @@ resampling_list = (
     "q3",
 )
 webviewer_list = ("all", "google", "openlayers", "leaflet", "mapml", "none")
+output_format_list = ("directory", "MBTiles", "GPKG", "PMTiles")
 
 logger = logging.getLogger("gdal2tiles")
 
@@ -1280,30 +1293,540 @@ def _get_creation_options(options):
     return copts
 
 
+def geo_query(ds, ulx, uly, lrx, lry, querysize=0):
+    """
+    For given dataset and query in cartographic coordinates returns parameters for ReadRaster()
+    in raster coordinates and x/y shifts (for border tiles). If the querysize is not given, the
+    extent is returned in the native resolution of dataset ds.
+    """
+    geotran = ds.GetGeoTransform()
+    rx = int((ulx - geotran[0]) / geotran[1] + 0.001)
+    ry = int((uly - geotran[3]) / geotran[5] + 0.001)
+    rxsize = max(1, int((lrx - ulx) / geotran[1] + 0.5))
+    rysize = max(1, int((lry - uly) / geotran[5] + 0.5))
+
+    if not querysize:
+        wxsize, wysize = rxsize, rysize
+    else:
+        wxsize, wysize = querysize, querysize
+
+    # Coordinates should not go out of the bounds of the raster
+    wx = 0
+    if rx < 0:
+        rxshift = abs(rx)
+        wx = int(wxsize * (float(rxshift) / rxsize))
+        wxsize = wxsize - wx
+        rxsize = rxsize - int(rxsize * (float(rxshift) / rxsize))
+        rx = 0
+    if rx + rxsize > ds.RasterXSize:
+        wxsize = int(wxsize * (float(ds.RasterXSize - rx) / rxsize))
+        rxsize = ds.RasterXSize - rx
+
+    wy = 0
+    if ry < 0:
+        ryshift = abs(ry)
+        wy = int(wysize * (float(ryshift) / rysize))
+        wysize = wysize - wy
+        rysize = rysize - int(rysize * (float(ryshift) / rysize))
+        ry = 0
+    if ry + rysize > ds.RasterYSize:
+        wysize = int(wysize * (float(ds.RasterYSize - ry) / rysize))
+        rysize = ds.RasterYSize - ry
+
+    return (rx, ry, rxsize, rysize), (wx, wy, wxsize, wysize)
+
+
+def get_tile_range_width(
+    tile_job_info: "TileJobInfo", tz: int, nb_processes: int
+) -> int:
+    """Maximum width of the row segments of tiles at zoom level tz
+
+    This is a power of two, small enough for all processes to get work.
+    """
+
+    count = count_tiles(tile_job_info, tz)
+    width = 1
+    while width < 128 and width * 2 <= count // nb_processes:
+        width *= 2
+    return width
+
+
+def iter_tile_ranges(
+    tile_job_info: "TileJobInfo", tz: int, width: int
+) -> Iterator[TileRange]:
+    """Generate the row segments of tiles at zoom level tz, from top to bottom
+
+    Segments are aligned on multiples of width, so that the segment of a
+    tile can be computed from its position.
+    """
+
+    tminx, tminy, tmaxx, tmaxy = get_tile_tminmax(tile_job_info, tz)
+    for ty in range(tmaxy, tminy - 1, -1):
+        for tx in range(tminx - tminx % width, tmaxx + 1, width):
+            yield (tz, ty, max(tx, tminx), min(tx + width - 1, tmaxx))
+
+
+class TileScheduler:
+    """Dependency-driven ordering of the tile jobs
+
+    Jobs are row segments of tiles (see iter_tile_ranges()). The jobs of the
+    top base level (base tiles, or roots of in-memory subtrees) are taken
+    from a generator, and an overview job becomes ready as soon as the jobs
+    of all the row segments under it are done. Overview levels are thus
+    generated while base tiles are still being rendered, without barrier
+    between zoom levels, and only the overview jobs whose children are
+    partially done are tracked.
+    """
+
+    def __init__(
+        self,
+        tile_job_info: "TileJobInfo",
+        top_base_tz: int,
+        base_jobs: Iterator[TileRange],
+        widths: Dict[int, int],
+    ) -> None:
+        self.tile_job_info = tile_job_info
+        self.top_base_tz = top_base_tz
+        self.base_jobs = base_jobs
+        self.widths = widths
+        # Overview jobs whose underlying tiles are all generated
+        self.ready_jobs: Deque[TileRange] = collections.deque()
+        # Overview jobs whose underlying tiles are generated but not
+        # committed yet, for outputs written by the main process
+        self.uncommitted_jobs: List[TileRange] = []
+        # Number of underlying jobs not done yet, per (tz, ty, segment index)
+        self.nb_pending_children: Dict[Tuple[int, int, int], int] = {}
+
+    def next_job(self) -> Optional[TileRange]:
+        """Return the next job to run, or None if none is ready"""
+
+        if self.ready_jobs:
+            return self.ready_jobs.popleft()
+        return next(self.base_jobs, None)
+
+    def has_uncommitted_jobs(self) -> bool:
+        return len(self.uncommitted_jobs) != 0
+
+    def tiles_committed(self) -> None:
+        """Notify that all the tiles returned so far are readable by the workers"""
+
+        self.ready_jobs.extend(self.uncommitted_jobs)
+        self.uncommitted_jobs = []
+
+    def _count_children(self, tz: int, ty: int, index: int) -> int:
+        """Number of jobs at tz + 1 under the segment index of row ty at tz"""
+
+        width = self.widths[tz]
+        tminx, _, tmaxx, _ = get_tile_tminmax(self.tile_job_info, tz)
+        ctminx, ctminy, ctmaxx, ctmaxy = get_tile_tminmax(self.tile_job_info, tz + 1)
+        cx0 = max(2 * max(index * width, tminx), ctminx)
+        cx1 = min(2 * min((index + 1) * width - 1, tmaxx) + 1, ctmaxx)
+        child_width = self.widths[tz + 1]
+        nb_rows = len([cty for cty in (2 * ty, 2 * ty + 1) if ctminy <= cty <= ctmaxy])
+        return nb_rows * (cx1 // child_width - cx0 // child_width + 1)
+
+    def job_done(self, tile_range: TileRange) -> None:
+        """Notify that the tiles of a job are generated (but maybe not committed)"""
+
+        ctz, cty, ctx_min, ctx_max = tile_range
+        tz = ctz - 1
+        if tz < self.tile_job_info.tminz:
+            return
+        ty = cty >> 1
+        width = self.widths[tz]
+        tminx, _, tmaxx, _ = get_tile_tminmax(self.tile_job_info, tz)
+        for index in range((ctx_min >> 1) // width, (ctx_max >> 1) // width + 1):
+            key = (tz, ty, index)
+            nb_pending = self.nb_pending_children.get(key)
+            if nb_pending is None:
+                nb_pending = self._count_children(tz, ty, index)
+            nb_pending -= 1
+            if nb_pending:
+                self.nb_pending_children[key] = nb_pending
+                continue
+            self.nb_pending_children.pop(key, None)
+            self.uncommitted_jobs.append(
+                (
+                    tz,
+                    ty,
+                    max(index * width, tminx),
+                    min((index + 1) * width - 1, tmaxx),
+                )
+            )
+
+
+def create_tiles(
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    top_base_tz: int,
+    tile_range: TileRange,
+) -> List[EncodedTile]:
+    """Run a job of the TileScheduler
+
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    tz, ty, tx_min, tx_max = tile_range
+    if tz < top_base_tz:
+        return create_overview_tiles(tile_job_info, tmsMap, tile_range)
+    if tz == tile_job_info.tmaxz:
+        return create_base_tiles(tile_job_info, tmsMap, tile_range)
+    encoded_tiles: List[EncodedTile] = []
+    for tx in range(tx_min, tx_max + 1):
+        encoded_tiles += create_subtree_tiles(tile_job_info, tmsMap, tz, (tx, ty))
+    return encoded_tiles
+
+
+def _submit_job(pool, func: Callable, item: Any, done: "queue.Queue") -> None:
+    """Submit func(item) to a multiprocessing.Pool or a concurrent.futures.Executor
+    (MPI), and put (item, success, result or exception) in done when completed"""
+
+    if hasattr(pool, "apply_async"):
+        pool.apply_async(
+            func,
+            (item,),
+            callback=lambda res: done.put((item, True, res)),
+            error_callback=lambda exc: done.put((item, False, exc)),
+        )
+    else:
+        future = pool.submit(func, item)
+        future.add_done_callback(
+            lambda f: done.put(
+                (item, f.exception() is None, f.exception() or f.result())
+            )
+        )
+
+
+def run_tile_jobs(
+    pool,
+    nb_processes: int,
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    top_base_tz: int,
+    base_jobs: Iterator[TileRange],
+    tile_output: "DirectoryTileOutput",
+    progress_bar: Optional["ProgressBar"],
+) -> None:
+    """Generate all the tiles, from the jobs of the top base level, in the
+    current process if pool is None"""
+
+    widths = {
+        tz: get_tile_range_width(tile_job_info, tz, nb_processes)
+        for tz in range(tile_job_info.tminz, top_base_tz + 1)
+    }
+    if top_base_tz != tile_job_info.tmaxz:
+        # One in-memory subtree per job
+        widths[top_base_tz] = 1
+    scheduler = TileScheduler(tile_job_info, top_base_tz, base_jobs, widths)
+    func = partial(
+        create_tiles, tile_job_info, tmsMap if pool is None else None, top_base_tz
+    )
+
+    def job_completed(tile_range, encoded_tiles):
+        tile_output.write_encoded_tiles(encoded_tiles)
+        scheduler.job_done(tile_range)
+        if progress_bar:
+            progress_bar.log_progress(tile_range[3] - tile_range[2] + 1)
+
+    if pool is None:
+        while True:
+            tile_range = scheduler.next_job()
+            if tile_range is None:
+                break
+            job_completed(tile_range, func(tile_range))
+            # The tiles written by the current process are readable by it
+            scheduler.tiles_committed()
+        assert not scheduler.nb_pending_children
+        return
+
+    # Bound the number of jobs submitted but not completed, so that they
+    # are generated as the work progresses
+    max_pending = 4 * nb_processes
+    done: "queue.Queue[Tuple[TileRange, bool, Any]]" = queue.Queue()
+    nb_running = 0
+    while True:
+        while nb_running < max_pending:
+            tile_range = scheduler.next_job()
+            if (
+                tile_range is None
+                and nb_running < nb_processes
+                and scheduler.has_uncommitted_jobs()
+            ):
+                # Do not let the workers starve
+                tile_output.flush()
+                scheduler.tiles_committed()
+                tile_range = scheduler.next_job()
+            if tile_range is None:
+                break
+            _submit_job(pool, func, tile_range, done)
+            nb_running += 1
+
+        if nb_running == 0:
+            break
+
+        tile_range, ok, res = done.get()
+        nb_running -= 1
+        if not ok:
+            raise res
+        job_completed(tile_range, res)
+        if not tile_output.pending_tiles:
+            scheduler.tiles_committed()
+
+    assert not scheduler.nb_pending_children
+
+
+# Source datasets shared by the threads, in --threads mode
+shared_src_datasets: Dict[str, gdal.Dataset] = {}
+shared_src_datasets_lock = threading.Lock()
+
+
+def _get_shared_src_ds(src_file: str) -> Optional[gdal.Dataset]:
+    """Return a thread-safe dataset shared by all threads, or None if the
+    source cannot be opened in thread-safe mode"""
+
+    with shared_src_datasets_lock:
+        if src_file not in shared_src_datasets:
+            ds = None
+            if hasattr(gdal, "OF_THREAD_SAFE"):
+                with gdal.quiet_errors():
+                    try:
+                        ds = gdal.OpenEx(src_file, gdal.OF_RASTER | gdal.OF_THREAD_SAFE)
+                    except RuntimeError:
+                        ds = None
+            shared_src_datasets[src_file] = ds
+        return shared_src_datasets[src_file]
+
+
+def close_shared_src_datasets() -> None:
+    with shared_src_datasets_lock:
+        shared_src_datasets.clear()
+
+
+def _get_cached_src_ds(tile_job_info: "TileJobInfo") -> gdal.Dataset:
+    if getattr(tile_job_info.options, "nb_threads", None):
+        ds = _get_shared_src_ds(tile_job_info.src_file)
+        if ds is not None:
+            return ds
+
+    # Fallback to a dataset per thread
+    cached_ds = getattr(threadLocal, "cached_ds", None)
+    if cached_ds and cached_ds.GetDescription() == tile_job_info.src_file:
+        return cached_ds
+    ds = gdal.Open(tile_job_info.src_file, gdal.GA_ReadOnly)
+    threadLocal.cached_ds = ds
+    return ds
+
+
+def _get_source_coverage(tile_job_info: "TileJobInfo") -> "SourceCoverage":
+    cached_coverage = getattr(threadLocal, "cached_coverage", None)
+    if cached_coverage is None or cached_coverage[0] != tile_job_info.src_file:
+        coverage = SourceCoverage(
+            _get_cached_src_ds(tile_job_info),
+            gdal.Open(tile_job_info.input_file, gdal.GA_ReadOnly),
+            tile_job_info.options,
+        )
+        cached_coverage = threadLocal.cached_coverage = (
+            tile_job_info.src_file,
+            coverage,
+        )
+    return cached_coverage[1]
+
+
+def get_base_tile_detail(
+    tile_job_info: "TileJobInfo", tmsMap: dict, tx: int, ty: int
+) -> Optional["TileDetail"]:
+    """Compute what must be read from the source for the base tile (tx, ty),
+    with ty in the TMS numbering.
+
+    None is returned if the tile must be skipped.
+    """
+
+    options = tile_job_info.options
+    tz = tile_job_info.tmaxz
+    tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[tz]
+    tile_output = open_tile_output(tile_job_info, tmsMap)
+    ds = _get_cached_src_ds(tile_job_info)
+    querysize = tile_job_info.querysize
+
+    ytile = GDAL2Tiles.getYTile(ty, tz, options, tmsMap)
+    if options.verbose:
+        logger.debug(tile_output.tile_filename(tz, tx, ty))
+
+    if options.resume and tile_output.has_tile(tz, tx, ty):
+        if options.verbose:
+            logger.debug("Tile generation skipped because of --resume")
+        return None
+
+    if options.profile == "mercator":
+        # Tile bounds in EPSG:3857
+        b = GlobalMercator(tile_size=tile_job_info.tile_size).TileBounds(tx, ty, tz)
+    elif options.profile == "geodetic":
+        b = GlobalGeodetic(
+            options.tmscompatible, tile_size=tile_job_info.tile_size
+        ).TileBounds(tx, ty, tz)
+    elif options.profile != "raster":
+        b = tmsMap[options.profile].TileBounds(tx, ty, tz, tile_job_info.tile_size)
+
+    # Don't scale up by nearest neighbour, better change the querysize
+    # to the native resolution (and return smaller query tile) for scaling
+
+    if options.profile != "raster":
+        rb, wb = geo_query(ds, b[0], b[3], b[2], b[1])
+
+        # Pixel size in the raster covering query geo extent
+        nativesize = wb[0] + wb[2]
+        if options.verbose:
+            logger.debug(f"\tNative Extent (querysize {nativesize}): {rb}, {wb}")
+
+        # Tile bounds in raster coordinates for ReadRaster query
+        rb, wb = geo_query(ds, b[0], b[3], b[2], b[1], querysize=querysize)
+
+        rx, ry, rxsize, rysize = rb
+        wx, wy, wxsize, wysize = wb
+
+    else:  # 'raster' profile:
+
+        tsize = int(
+            tile_job_info.tsize[tz]
+        )  # tile_size in raster coordinates for actual zoom
+        xsize = ds.RasterXSize  # size of the raster in pixels
+        ysize = ds.RasterYSize
+        querysize = tile_job_info.tile_size
+
+        rx = tx * tsize
+        rxsize = 0
+        if tx == tmaxx:
+            rxsize = xsize % tsize
+        if rxsize == 0:
+            rxsize = tsize
+
+        ry = ty * tsize
+        rysize = 0
+        if ty == tmaxy:
+            rysize = ysize % tsize
+        if rysize == 0:
+            rysize = tsize
+
+        wx, wy = 0, 0
+        wxsize = int(rxsize / float(tsize) * tile_job_info.tile_size)
+        wysize = int(rysize / float(tsize) * tile_job_info.tile_size)
+
+        if not options.xyz:
+            ry = ysize - (ty * tsize) - rysize
+            if wysize != tile_job_info.tile_size:
+                wy = tile_job_info.tile_size - wysize
+
+    if rxsize == 0 or rysize == 0 or wxsize == 0 or wysize == 0:
+        if options.verbose:
+            logger.debug("\tExcluding tile with no pixel coverage")
+        return None
+
+    # Cheap detection of the tiles that would be found fully transparent
+    if tile_job_info.exclude_transparent and _get_source_coverage(
+        tile_job_info
+    ).is_empty(rx, ry, rxsize, rysize):
+        if options.verbose:
+            logger.debug("\tExcluding tile with no valid source pixel")
+        return None
+
+    # Read the source raster if anything is going inside the tile as per the computed
+    # geo_query
+    return TileDetail(
+        tx=tx,
+        ty_tms=ty,
+        ty=ytile,
+        tz=tz,
+        rx=rx,
+        ry=ry,
+        rxsize=rxsize,
+        rysize=rysize,
+        wx=wx,
+        wy=wy,
+        wxsize=wxsize,
+        wysize=wysize,
+        querysize=querysize,
+    )
+
+
+def _delete_stale_tile(
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    tz: int,
+    tx: int,
+    ty: int,
+    encoded_tiles: List[EncodedTile],
+) -> None:
+    """In update mode, remove the previous version of a tile that is not
+    generated anymore"""
+
+    if tile_job_info.update_extent is None:
+        return
+    encoded_tile = open_tile_output(tile_job_info, tmsMap).delete_tile(tz, tx, ty)
+    if encoded_tile:
+        encoded_tiles.append(encoded_tile)
+
+
+def create_base_tiles(
+    tile_job_info: "TileJobInfo", tmsMap: dict, tile_range: TileRange
+) -> List[EncodedTile]:
+    """Generate the base tiles of a row segment
+
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    if tmsMap is None:
+        _, tmsMap = get_profile_list_and_tmsMap()
+
+    tz, ty, tx_min, tx_max = tile_range
+    encoded_tiles: List[EncodedTile] = []
+    for tx in range(tx_min, tx_max + 1):
+        tile_detail = get_base_tile_detail(tile_job_info, tmsMap, tx, ty)
+        if (
+            tile_detail is None
+            or _create_base_tile(tile_job_info, tmsMap, tile_detail, encoded_tiles)
+            is None
+        ):
+            _delete_stale_tile(tile_job_info, tmsMap, tz, tx, ty, encoded_tiles)
+    return encoded_tiles
+
+
 def create_base_tile(
     tile_job_info: "TileJobInfo", tmsMap: dict, tile_detail: "TileDetail"
-) -> None:
+) -> List[EncodedTile]:
+    """Generate a base tile
+
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    encoded_tiles: List[EncodedTile] = []
+    _create_base_tile(tile_job_info, tmsMap, tile_detail, encoded_tiles)
+    return encoded_tiles
+
+
+def _create_base_tile(
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    tile_detail: "TileDetail",
+    encoded_tiles: List[EncodedTile],
+) -> Optional[gdal.Dataset]:
+    """Generate a base tile, and return it as a MEM dataset (with an alpha band)
+
+    None is returned if the tile has been skipped.
+    """
 
     if tmsMap is None:
         _, tmsMap = get_profile_list_and_tmsMap()
 
     dataBandsCount = tile_job_info.nb_data_bands
     output = tile_job_info.output_file_path
-    tileext = tile_job_info.tile_extension
     tile_size = tile_job_info.tile_size
     options = tile_job_info.options
 
     tilebands = dataBandsCount + 1
 
-    cached_ds = getattr(threadLocal, "cached_ds", None)
-    if cached_ds and cached_ds.GetDescription() == tile_job_info.src_file:
-        ds = cached_ds
-    else:
-        ds = gdal.Open(tile_job_info.src_file, gdal.GA_ReadOnly)
-        threadLocal.cached_ds = ds
+    ds = _get_cached_src_ds(tile_job_info)
 
     mem_drv = gdal.GetDriverByName("MEM")
-    out_drv = gdal.GetDriverByName(tile_job_info.tile_driver)
     alphaband = ds.GetRasterBand(1).GetMaskBand()
 
     tx = tile_detail.tx
@@ -1319,8 +1842,10 @@ def create_base_tile(
     wysize = tile_detail.wysize
     querysize = tile_detail.querysize
 
+    tile_output = open_tile_output(tile_job_info, tmsMap)
+
     # Tile dataset in memory
-    tilefilename = os.path.join(output, str(tz), str(tx), "%s.%s" % (ty, tileext))
+    tilefilename = tile_output.tile_filename(tz, tx, tile_detail.ty_tms)
     dstile = mem_drv.Create("", tile_size, tile_size, tilebands)
     dstile.GetRasterBand(tilebands).SetColorInterpretation(gdal.GCI_AlphaBand)
 
@@ -1341,7 +1866,7 @@ def create_base_tile(
         if tile_job_info.exclude_transparent and len(alpha) == alpha.count(
             "\x00".encode("ascii")
         ):
-            return
+            return None
 
         data = ds.ReadRaster(
             rx,
@@ -1353,9 +1878,22 @@ def create_base_tile(
             band_list=list(range(1, dataBandsCount + 1)),
         )
 
+    uniform_value = None
+    if data:
+        full_coverage = (
+            wx == 0 and wy == 0 and wxsize == querysize and wysize == querysize
+        )
+        uniform_value = _get_uniform_tile_value(
+            data, alpha, dataBandsCount, full_coverage
+        )
+
     # The tile in memory is a transparent file by default. Write pixel values into it if
     # any
-    if data:
+    if uniform_value is not None:
+        # No need to resample a tile whose pixels all have the same value
+        for i, value in enumerate(uniform_value):
+            dstile.GetRasterBand(i + 1).Fill(value)
+    elif data:
         if tile_size == querysize:
             # Use the ReadRaster result directly in tiles ('nearest neighbour' query)
             dstile.WriteRaster(
@@ -1395,20 +1933,17 @@ def create_base_tile(
 
     del data
 
-    # Write a copy of tile to png/jpg
-    out_drv.CreateCopy(
-        tilefilename,
-        dstile if tile_job_info.tile_driver != "JPEG" else remove_alpha_band(dstile),
-        strict=0,
-        options=_get_creation_options(options),
-    )
-
-    # Remove useless side car file
-    aux_xml = tilefilename + ".aux.xml"
-    if gdal.VSIStatL(aux_xml) is not None:
-        gdal.Unlink(aux_xml)
-
-    del dstile
+    if uniform_value is not None:
+        encoded_tile = tile_output.write_tile_data(
+            tz,
+            tx,
+            tile_detail.ty_tms,
+            _encode_uniform_tile(dstile, uniform_value, tile_job_info),
+        )
+    else:
+        encoded_tile = tile_output.write_tile(tz, tx, tile_detail.ty_tms, dstile)
+    if encoded_tile:
+        encoded_tiles.append(encoded_tile)
 
     # Create a KML file for this tile.
     if tile_job_info.kml:
@@ -1435,6 +1970,87 @@ def create_base_tile(
                         ).encode("utf-8")
                     )
 
+    return dstile
+
+
+def _get_uniform_tile_value(
+    data: bytes, alpha: bytes, nb_data_bands: int, full_coverage: bool
+) -> Optional[bytes]:
+    """Return the value of each band (alpha band included) of a base tile whose
+    pixels all have the same value, or None if the tile is not uniform.
+
+    data is the band-sequential buffer of the data bands read from the source,
+    and alpha the one of the mask band.
+    """
+
+    if alpha.count(alpha[0]) != len(alpha):
+        return None
+    band_size = len(data) // nb_data_bands
+    value = bytes(data[i * band_size] for i in range(nb_data_bands)) + bytes(alpha[:1])
+    for i in range(nb_data_bands):
+        if data.count(value[i], i * band_size, (i + 1) * band_size) != band_size:
+            return None
+    # The part of the tile not covered by the source is transparent black
+    if not full_coverage and value.count(0) != len(value):
+        return None
+    return value
+
+
+def _encode_uniform_tile(
+    dstile: gdal.Dataset, uniform_value: bytes, tile_job_info: "TileJobInfo"
+) -> bytes:
+    """Encode a uniform tile, reusing the encoding of a previous tile with the
+    same value"""
+
+    encoded_uniform_tiles = getattr(threadLocal, "encoded_uniform_tiles", None)
+    if encoded_uniform_tiles is None:
+        encoded_uniform_tiles = threadLocal.encoded_uniform_tiles = {}
+    key = (tile_job_info.tile_driver, tile_job_info.tile_size, uniform_value)
+    data = encoded_uniform_tiles.get(key)
+    if data is None:
+        data = encode_tile(
+            dstile,
+            tile_job_info.tile_extension,
+            tile_job_info.tile_driver,
+            tile_job_info.options,
+        )
+        encoded_uniform_tiles[key] = data
+    return data
+
+
+def encode_tile(
+    dstile: gdal.Dataset, tile_extension: str, tile_driver: str, options: Options
+) -> bytes:
+    """Encode the in-memory tile dataset and return the content of the tile file"""
+
+    tmp_filename = "/vsimem/gdal2tiles/%s.%s" % (uuid4(), tile_extension)
+    write_tile(dstile, tmp_filename, tile_driver, options)
+    try:
+        return _read_vsi_file(tmp_filename)
+    finally:
+        gdal.Unlink(tmp_filename)
+
+
+def write_tile(
+    dstile: gdal.Dataset, tilefilename: str, tile_driver: str, options: Options
+) -> None:
+    """Encode the in-memory tile dataset into the tile file"""
+
+    out_drv = gdal.GetDriverByName(tile_driver)
+
+    # Write a copy of tile to png/jpg
+    out_drv.CreateCopy(
+        tilefilename,
+        dstile if tile_driver != "JPEG" else remove_alpha_band(dstile),
+        strict=0,
+        options=_get_creation_options(options),
+    )
+
+    # Remove useless side car file
+    aux_xml = tilefilename + ".aux.xml"
+    if gdal.VSIStatL(aux_xml) is not None:
+        gdal.Unlink(aux_xml)
+
 
 def remove_alpha_band(src_ds):
     if (
@@ -1475,8 +2091,108 @@ def create_overview_tile(
     tile_job_info: "TileJobInfo",
     options: Options,
     tmsMap: dict,
-):
-    """Generating an overview tile from no more than 4 underlying tiles(base tiles)"""
+) -> List[EncodedTile]:
+    """Generating an overview tile from no more than 4 underlying tiles(base tiles)
+
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    encoded_tiles: List[EncodedTile] = []
+    _create_overview_tile(
+        base_tz,
+        base_tiles,
+        output_folder,
+        tile_job_info,
+        options,
+        tmsMap,
+        encoded_tiles=encoded_tiles,
+    )
+    return encoded_tiles
+
+
+def _open_overview_child_tile(
+    base_tz: int,
+    base_tx: int,
+    base_ty: int,
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+) -> Optional[gdal.Dataset]:
+    """Open an already written tile, and return it with an alpha band"""
+
+    mem_driver = gdal.GetDriverByName("MEM")
+    tilebands = tile_job_info.nb_data_bands + 1
+
+    dsquerytile = open_tile_output(tile_job_info, tmsMap).open_tile(
+        base_tz, base_tx, base_ty
+    )
+    if dsquerytile is None:
+        return None
+
+    if (
+        tile_job_info.tile_driver == "JPEG"
+        and dsquerytile.RasterCount == 3
+        and tilebands == 2
+    ):
+        # Input is RGB with R=G=B. Add An alpha band
+        tmp_ds = mem_driver.Create(
+            "", dsquerytile.RasterXSize, dsquerytile.RasterYSize, 2
+        )
+        tmp_ds.GetRasterBand(1).WriteRaster(
+            0,
+            0,
+            tile_job_info.tile_size,
+            tile_job_info.tile_size,
+            dsquerytile.GetRasterBand(1).ReadRaster(),
+        )
+        mask = bytearray([255] * (tile_job_info.tile_size * tile_job_info.tile_size))
+        tmp_ds.GetRasterBand(2).WriteRaster(
+            0,
+            0,
+            tile_job_info.tile_size,
+            tile_job_info.tile_size,
+            mask,
+        )
+        tmp_ds.GetRasterBand(2).SetColorInterpretation(gdal.GCI_AlphaBand)
+        dsquerytile = tmp_ds
+    elif dsquerytile.RasterCount == tilebands - 1:
+        # assume that the alpha band is missing and add it
+        tmp_ds = mem_driver.CreateCopy("", dsquerytile, 0)
+        tmp_ds.AddBand()
+        mask = bytearray([255] * (tile_job_info.tile_size * tile_job_info.tile_size))
+        tmp_ds.WriteRaster(
+            0,
+            0,
+            tile_job_info.tile_size,
+            tile_job_info.tile_size,
+            mask,
+            band_list=[tilebands],
+        )
+        dsquerytile = tmp_ds
+    elif dsquerytile.RasterCount != tilebands:
+        raise Exception(
+            "Unexpected number of bands in base tile. Got %d, expected %d"
+            % (dsquerytile.RasterCount, tilebands)
+        )
+
+    return dsquerytile
+
+
+def _create_overview_tile(
+    base_tz: int,
+    base_tiles: List[Tuple[int, int]],
+    output_folder: str,
+    tile_job_info: "TileJobInfo",
+    options: Options,
+    tmsMap: dict,
+    in_memory_tiles: Optional[Dict[Tuple[int, int], gdal.Dataset]] = None,
+    encoded_tiles: Optional[List[EncodedTile]] = None,
+) -> Optional[gdal.Dataset]:
+    """Generate an overview tile, and return it as a MEM dataset (with an alpha band)
+
+    Underlying tiles found in in_memory_tiles are used as they are, the other
+    ones are read back from the output.
+    None is returned if the tile has been skipped.
+    """
 
     if tmsMap is None:
         _, tmsMap = get_profile_list_and_tmsMap()
@@ -1486,22 +2202,16 @@ def create_overview_tile(
     overview_ty = base_tiles[0][1] >> 1
     overview_ty_real = GDAL2Tiles.getYTile(overview_ty, overview_tz, options, tmsMap)
 
-    tilefilename = os.path.join(
-        output_folder,
-        str(overview_tz),
-        str(overview_tx),
-        "%s.%s" % (overview_ty_real, tile_job_info.tile_extension),
-    )
+    tile_output = open_tile_output(tile_job_info, tmsMap)
+    tilefilename = tile_output.tile_filename(overview_tz, overview_tx, overview_ty)
     if options.verbose:
         logger.debug(tilefilename)
-    if options.resume and isfile(tilefilename):
+    if options.resume and tile_output.has_tile(overview_tz, overview_tx, overview_ty):
         if options.verbose:
             logger.debug("Tile generation skipped because of --resume")
-        return
+        return None
 
     mem_driver = gdal.GetDriverByName("MEM")
-    tile_driver = tile_job_info.tile_driver
-    out_driver = gdal.GetDriverByName(tile_driver)
 
     tilebands = tile_job_info.nb_data_bands + 1
 
@@ -1520,19 +2230,20 @@ def create_overview_tile(
     for base_tile in base_tiles:
         base_tx = base_tile[0]
         base_ty = base_tile[1]
-        base_ty_real = GDAL2Tiles.getYTile(base_ty, base_tz, options, tmsMap)
 
-        base_tile_path = os.path.join(
-            output_folder,
-            str(base_tz),
-            str(base_tx),
-            "%s.%s" % (base_ty_real, tile_job_info.tile_extension),
-        )
-        if not isfile(base_tile_path):
+        dsquerytile = None
+        if in_memory_tiles is not None:
+            dsquerytile = in_memory_tiles.get((base_tx, base_ty))
+            if dsquerytile is not None and tile_job_info.tile_driver == "JPEG":
+                # Mimic what reading back the JPEG tile would give
+                dsquerytile.GetRasterBand(tilebands).Fill(255)
+        if dsquerytile is None:
+            dsquerytile = _open_overview_child_tile(
+                base_tz, base_tx, base_ty, tile_job_info, tmsMap
+            )
+        if dsquerytile is None:
             continue
 
-        dsquerytile = gdal.Open(base_tile_path, gdal.GA_ReadOnly)
-
         if base_tx % 2 == 0:
             tileposx = 0
         else:
@@ -1549,56 +2260,6 @@ def create_overview_tile(
             else:
                 tileposy = 0
 
-        if (
-            tile_job_info.tile_driver == "JPEG"
-            and dsquerytile.RasterCount == 3
-            and tilebands == 2
-        ):
-            # Input is RGB with R=G=B. Add An alpha band
-            tmp_ds = mem_driver.Create(
-                "", dsquerytile.RasterXSize, dsquerytile.RasterYSize, 2
-            )
-            tmp_ds.GetRasterBand(1).WriteRaster(
-                0,
-                0,
-                tile_job_info.tile_size,
-                tile_job_info.tile_size,
-                dsquerytile.GetRasterBand(1).ReadRaster(),
-            )
-            mask = bytearray(
-                [255] * (tile_job_info.tile_size * tile_job_info.tile_size)
-            )
-            tmp_ds.GetRasterBand(2).WriteRaster(
-                0,
-                0,
-                tile_job_info.tile_size,
-                tile_job_info.tile_size,
-                mask,
-            )
-            tmp_ds.GetRasterBand(2).SetColorInterpretation(gdal.GCI_AlphaBand)
-            dsquerytile = tmp_ds
-        elif dsquerytile.RasterCount == tilebands - 1:
-            # assume that the alpha band is missing and add it
-            tmp_ds = mem_driver.CreateCopy("", dsquerytile, 0)
-            tmp_ds.AddBand()
-            mask = bytearray(
-                [255] * (tile_job_info.tile_size * tile_job_info.tile_size)
-            )
-            tmp_ds.WriteRaster(
-                0,
-                0,
-                tile_job_info.tile_size,
-                tile_job_info.tile_size,
-                mask,
-                band_list=[tilebands],
-            )
-            dsquerytile = tmp_ds
-        elif dsquerytile.RasterCount != tilebands:
-            raise Exception(
-                "Unexpected number of bands in base tile. Got %d, expected %d"
-                % (dsquerytile.RasterCount, tilebands)
-            )
-
         base_data = dsquerytile.ReadRaster(
             0, 0, tile_job_info.tile_size, tile_job_info.tile_size
         )
@@ -1615,21 +2276,14 @@ def create_overview_tile(
         usable_base_tiles.append(base_tile)
 
     if not usable_base_tiles:
-        return
+        return None
 
     scale_query_to_tile(dsquery, dstile, options, tilefilename=tilefilename)
 
-    # Write a copy of tile to png/jpg
-    out_driver.CreateCopy(
-        tilefilename,
-        dstile if tile_job_info.tile_driver != "JPEG" else remove_alpha_band(dstile),
-        strict=0,
-        options=_get_creation_options(options),
-    )
-    # Remove useless side car file
-    aux_xml = tilefilename + ".aux.xml"
-    if gdal.VSIStatL(aux_xml) is not None:
-        gdal.Unlink(aux_xml)
+    encoded_tile = tile_output.write_tile(overview_tz, overview_tx, overview_ty, dstile)
+    if encoded_tile:
+        assert encoded_tiles is not None
+        encoded_tiles.append(encoded_tile)
 
     if options.verbose:
         logger.debug(
@@ -1662,43 +2316,293 @@ def create_overview_tile(
                     ).encode("utf-8")
                 )
 
+    return dstile
 
-def group_overview_base_tiles(
-    base_tz: int, output_folder: str, tile_job_info: "TileJobInfo"
-) -> List[List[Tuple[int, int]]]:
-    """Group base tiles that belong to the same overview tile"""
 
-    overview_to_bases = {}
-    tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[base_tz]
-    for ty in range(tmaxy, tminy - 1, -1):
-        overview_ty = ty >> 1
-        for tx in range(tminx, tmaxx + 1):
-            overview_tx = tx >> 1
-            base_tile = (tx, ty)
-            overview_tile = (overview_tx, overview_ty)
+def get_tile_tminmax(
+    tile_job_info: "TileJobInfo", tz: int
+) -> Tuple[int, int, int, int]:
+    """Extent of the tiles generated at zoom level tz
 
-            if overview_tile not in overview_to_bases:
-                overview_to_bases[overview_tile] = []
+    Overview tiles are those that have at least one tile at tz + 1 under them.
+    In update mode, only the tiles over the area being updated are generated.
+    """
 
-            overview_to_bases[overview_tile].append(base_tile)
+    if tile_job_info.update_extent is not None:
+        shift = tile_job_info.tmaxz - tz
+        tminx, tminy, tmaxx, tmaxy = tile_job_info.update_extent
+        return tminx >> shift, tminy >> shift, tmaxx >> shift, tmaxy >> shift
+    if tz == tile_job_info.tmaxz:
+        return tile_job_info.tminmax[tz]
+    tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[tz + 1]
+    return tminx >> 1, tminy >> 1, tmaxx >> 1, tmaxy >> 1
+
+
+def is_tile_generated(tile_job_info: "TileJobInfo", tz: int, tx: int, ty: int) -> bool:
+    """Whether the tile is within the extent of the tiles generated at zoom level tz"""
+
+    tminx, tminy, tmaxx, tmaxy = get_tile_tminmax(tile_job_info, tz)
+    return tminx <= tx <= tmaxx and tminy <= ty <= tmaxy
+
+
+def merge_tile_extents(
+    extents: List[Tuple[int, int, int, int]]
+) -> List[Tuple[int, int, int, int]]:
+    """Merge the (tminx, tminy, tmaxx, tmaxy) tile extents that overlap or touch"""
+
+    merged: List[Tuple[int, int, int, int]] = []
+    for extent in extents:
+        while True:
+            for i, other in enumerate(merged):
+                if (
+                    extent[0] <= other[2] + 1
+                    and other[0] <= extent[2] + 1
+                    and extent[1] <= other[3] + 1
+                    and other[1] <= extent[3] + 1
+                ):
+                    extent = (
+                        min(extent[0], other[0]),
+                        min(extent[1], other[1]),
+                        max(extent[2], other[2]),
+                        max(extent[3], other[3]),
+                    )
+                    del merged[i]
+                    break
+            else:
+                break
+        merged.append(extent)
+    return merged
 
-    # Create directories for the tiles
-    overview_tz = base_tz - 1
+
+GeoExtent = Tuple[Tuple[float, float, float, float], Optional[osr.SpatialReference]]
+
+
+def parse_update_extent(value: str) -> Optional[GeoExtent]:
+    """Parse a xmin,ymin,xmax,ymax extent given with --update, in the
+    coordinates of the input file. None is returned if value is not an extent."""
+
+    try:
+        xmin, ymin, xmax, ymax = (float(v) for v in value.split(","))
+    except ValueError:
+        return None
+    return (xmin, ymin, xmax, ymax), None
+
+
+def read_changed_extents(
+    filename: str, reference_filename: Optional[str] = None
+) -> List[GeoExtent]:
+    """Return the extents of the features of a vector dataset, typically the
+    tile index of the changed source files, with their SRS
+
+    If reference_filename, a previous version of the tile index, is given,
+    only the features that are not found identical (by geometry and attributes)
+    in the other dataset are returned, from both datasets.
+    """
+
+    def read_features(filename: str) -> Dict[Tuple, GeoExtent]:
+        ds = gdal.OpenEx(filename, gdal.OF_VECTOR)
+        if ds is None:
+            exit_with_error("Cannot open %s" % filename)
+        features = {}
+        for i in range(ds.GetLayerCount()):
+            lyr = ds.GetLayer(i)
+            srs = lyr.GetSpatialRef()
+            if srs is not None:
+                srs = srs.Clone()
+                srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+            for f in lyr:
+                geom = f.GetGeometryRef()
+                if geom is None or geom.IsEmpty():
+                    continue
+                key = (
+                    lyr.GetName(),
+                    bytes(geom.ExportToWkb()),
+                    tuple(f.GetFieldAsString(j) for j in range(f.GetFieldCount())),
+                )
+                minx, maxx, miny, maxy = geom.GetEnvelope()
+                features[key] = ((minx, miny, maxx, maxy), srs)
+        return features
+
+    features = read_features(filename)
+    if reference_filename is None:
+        return list(features.values())
+    reference_features = read_features(reference_filename)
+    return [v for k, v in features.items() if k not in reference_features] + [
+        v for k, v in reference_features.items() if k not in features
+    ]
+
+
+def count_tiles(tile_job_info: "TileJobInfo", tz: int) -> int:
+    """Number of positions of tiles at zoom level tz"""
+
+    tminx, tminy, tmaxx, tmaxy = get_tile_tminmax(tile_job_info, tz)
+    return (1 + tmaxx - tminx) * (1 + tmaxy - tminy)
+
+
+def make_overview_column_dirs(tile_job_info: "TileJobInfo", tz: int) -> None:
+    """Create the directories for the overview tiles at zoom level tz"""
+
+    tile_output = open_tile_output(tile_job_info, None)
+    tminx, _, tmaxx, _ = get_tile_tminmax(tile_job_info, tz)
     for tx in range(tminx, tmaxx + 1):
-        overview_tx = tx >> 1
-        tiledirname = os.path.join(output_folder, str(overview_tz), str(overview_tx))
-        makedirs(tiledirname)
+        tile_output.make_column_dir(tz, tx)
+
+
+def create_overview_tiles(
+    tile_job_info: "TileJobInfo", tmsMap: dict, tile_range: TileRange
+) -> List[EncodedTile]:
+    """Generate the overview tiles of a row segment from the tiles of the
+    underlying zoom level
+
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    tz, ty, tx_min, tx_max = tile_range
+    base_tz = tz + 1
+    tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[base_tz]
+    encoded_tiles: List[EncodedTile] = []
+    for tx in range(tx_min, tx_max + 1):
+        base_tiles = [
+            (base_tx, base_ty)
+            for base_ty in (2 * ty + 1, 2 * ty)
+            for base_tx in (2 * tx, 2 * tx + 1)
+            if tminx <= base_tx <= tmaxx and tminy <= base_ty <= tmaxy
+        ]
+        if not base_tiles:
+            continue
+        if (
+            _create_overview_tile(
+                base_tz,
+                base_tiles,
+                tile_job_info.output_file_path,
+                tile_job_info,
+                tile_job_info.options,
+                tmsMap,
+                encoded_tiles=encoded_tiles,
+            )
+            is None
+        ):
+            _delete_stale_tile(tile_job_info, tmsMap, tz, tx, ty, encoded_tiles)
+    return encoded_tiles
 
-    return list(overview_to_bases.values())
 
+def count_overview_tiles(
+    tile_job_info: "TileJobInfo", base_tz: Optional[int] = None
+) -> int:
+    """Count the overview tiles built from the tiles at base_tz (default: tmaxz)"""
 
-def count_overview_tiles(tile_job_info: "TileJobInfo") -> int:
-    tile_number = 0
-    for tz in range(tile_job_info.tmaxz - 1, tile_job_info.tminz - 1, -1):
-        tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[tz]
-        tile_number += (1 + abs(tmaxx - tminx)) * (1 + abs(tmaxy - tminy))
+    if base_tz is None:
+        base_tz = tile_job_info.tmaxz
+    return sum(
+        count_tiles(tile_job_info, tz)
+        for tz in range(base_tz - 1, tile_job_info.tminz - 1, -1)
+    )
+
+
+def get_subtree_root_zoom(tile_job_info: "TileJobInfo", nb_processes: int) -> int:
+    """Zoom level of the roots of the quadtree subtrees generated in memory
 
-    return tile_number
+    This is the lowest zoom level with enough tiles to keep all processes busy.
+    When the tiles are sent back to the main process to be written, the depth
+    of the subtrees is limited, to bound the size of what is sent back.
+    """
+
+    min_root_tz = tile_job_info.tminz
+    if tile_job_info.output_format != "directory":
+        min_root_tz = max(min_root_tz, tile_job_info.tmaxz - 5)
+    if nb_processes <= 1:
+        return min_root_tz
+    for tz in range(min_root_tz, tile_job_info.tmaxz + 1):
+        if count_tiles(tile_job_info, tz) >= 4 * nb_processes:
+            return tz
+    return tile_job_info.tmaxz
+
+
+def create_subtree_tiles(
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    root_tz: int,
+    subtree: Tuple[int, int],
+) -> List[EncodedTile]:
+    """Generate all the tiles of a quadtree subtree, from its base tiles up to its root
+
+    Overview tiles are built from the in-memory underlying tiles, so that
+    each tile is encoded once and never read back. subtree is the (tx, ty)
+    position of the root tile.
+    Returns the encoded tiles that must be written by the main process.
+    """
+
+    if tmsMap is None:
+        _, tmsMap = get_profile_list_and_tmsMap()
+
+    root_tx, root_ty = subtree
+    encoded_tiles: List[EncodedTile] = []
+    _create_subtree_tile(
+        tile_job_info, tmsMap, root_tz, root_tx, root_ty, encoded_tiles
+    )
+    return encoded_tiles
+
+
+def _create_subtree_tile(
+    tile_job_info: "TileJobInfo",
+    tmsMap: dict,
+    tz: int,
+    tx: int,
+    ty: int,
+    encoded_tiles: List[EncodedTile],
+) -> Optional[gdal.Dataset]:
+
+    if tz == tile_job_info.tmaxz:
+        tile_detail = get_base_tile_detail(tile_job_info, tmsMap, tx, ty)
+        dstile = None
+        if tile_detail is not None:
+            dstile = _create_base_tile(
+                tile_job_info, tmsMap, tile_detail, encoded_tiles
+            )
+        if dstile is None:
+            _delete_stale_tile(tile_job_info, tmsMap, tz, tx, ty, encoded_tiles)
+        return dstile
+
+    base_tz = tz + 1
+    tminx, tminy, tmaxx, tmaxy = tile_job_info.tminmax[base_tz]
+    children: Dict[Tuple[int, int], gdal.Dataset] = {}
+    base_tiles = []
+    for base_ty in (2 * ty + 1, 2 * ty):
+        for base_tx in (2 * tx, 2 * tx + 1):
+            if tminx <= base_tx <= tmaxx and tminy <= base_ty <= tmaxy:
+                base_tiles.append((base_tx, base_ty))
+                if not is_tile_generated(tile_job_info, base_tz, base_tx, base_ty):
+                    # Outside of the area being updated: read back from the output
+                    continue
+                child = _create_subtree_tile(
+                    tile_job_info,
+                    tmsMap,
+                    base_tz,
+                    base_tx,
+                    base_ty,
+                    encoded_tiles,
+                )
+                if child is not None:
+                    children[(base_tx, base_ty)] = child
+
+    if not base_tiles:
+        return None
+
+    open_tile_output(tile_job_info, tmsMap).make_column_dir(tz, tx)
+
+    dstile = _create_overview_tile(
+        base_tz,
+        base_tiles,
+        tile_job_info.output_file_path,
+        tile_job_info,
+        tile_job_info.options,
+        tmsMap,
+        in_memory_tiles=children,
+        encoded_tiles=encoded_tiles,
+    )
+    if dstile is None:
+        _delete_stale_tile(tile_job_info, tmsMap, tz, tx, ty, encoded_tiles)
+    return dstile
 
 
 def optparse_init() -> Tuple[optparse.OptionParser, Dict[Any, Any]]:
@@ -1748,6 +2652,24 @@ def optparse_init() -> Tuple[optparse.OptionParser, Dict[Any, Any]]:
         action="store_true",
         help="Resume mode. Generate only missing files.",
     )
+    p.add_option(
+        "--update",
+        dest="update",
+        action="append",
+        metavar="EXTENT",
+        help="Update mode. Regenerate, in an existing output, only the tiles "
+        "over EXTENT and the overview tiles above them. EXTENT is either "
+        "xmin,ymin,xmax,ymax in the coordinates of the input file, or a vector "
+        "dataset (e.g. a tile index of the changed source files) whose feature "
+        "extents are used. May be repeated.",
+    )
+    p.add_option(
+        "--update-reference-index",
+        dest="update_reference_index",
+        metavar="INDEX",
+        help="Previous version of the tile index given with --update: only its "
+        "features that were added, removed or modified since then are considered.",
+    )
     p.add_option(
         "-a",
         "--srcnodata",
@@ -1805,6 +2727,20 @@ def optparse_init() -> Tuple[optparse.OptionParser, Dict[Any, Any]]:
         help="Assume launched by mpiexec and ignore --processes. "
         "User should set GDAL_CACHEMAX to size per process.",
     )
+    p.add_option(
+        "--threads",
+        dest="nb_threads",
+        type="int",
+        help="Number of threads to use for tiling, in a single process sharing "
+        "the source dataset and the GDAL block cache, instead of --processes",
+    )
+    p.add_option(
+        "--in-memory-overviews",
+        action="store_true",
+        dest="in_memory_overviews",
+        help="Build overview tiles from the in-memory underlying tiles of quadtree "
+        "subtrees, instead of reading them back from the output.",
+    )
     p.add_option(
         "--tilesize",
         dest="tilesize",
@@ -1821,6 +2757,14 @@ def optparse_init() -> Tuple[optparse.OptionParser, Dict[Any, Any]]:
         type="choice",
         help="which tile driver to use for the tiles",
     )
+    p.add_option(
+        "--output-format",
+        dest="output_format",
+        type="choice",
+        choices=output_format_list,
+        help="Output format (%s) - default guessed from the extension of the "
+        "output, or 'directory'" % ",".join(output_format_list),
+    )
     p.add_option(
         "--excluded-values",
         dest="excluded_values",
@@ -2073,6 +3017,45 @@ def options_post_processing(
             exit_with_error("jpeg_quality should be in the range [1-100]")
         options.jpeg_quality = int(options.jpeg_quality)
 
+    if getattr(options, "nb_threads", None):
+        if options.nb_threads < 1:
+            exit_with_error("--threads should be at least 1")
+        if options.mpi or (options.nb_processes or 1) > 1:
+            exit_with_error(
+                "--threads is mutually exclusive with --processes and --mpi"
+            )
+
+    if getattr(options, "update", None):
+        if options.resume:
+            exit_with_error("--update is mutually exclusive with --resume")
+        if gdal.VSIStatL(output_folder) is None:
+            exit_with_error("--update requires an existing output: %s" % output_folder)
+    elif getattr(options, "update_reference_index", None):
+        exit_with_error("--update-reference-index requires --update")
+
+    if not getattr(options, "output_format", None):
+        options.output_format = guess_tile_output_format(output_folder)
+    if options.output_format != "directory":
+        if output_folder.startswith("/vsi"):
+            exit_with_error(
+                "%s output is not supported on /vsi file systems"
+                % options.output_format
+            )
+        if options.output_format in ("MBTiles", "PMTiles"):
+            if options.profile != "mercator":
+                exit_with_error(
+                    "%s output is only supported with the mercator profile"
+                    % options.output_format
+                )
+        elif options.profile == "raster":
+            exit_with_error("GPKG output is not supported with the raster profile")
+        if options.output_format == "PMTiles" and options.resume:
+            exit_with_error("--resume is not supported with PMTiles output")
+        if options.output_format == "PMTiles" and getattr(options, "update", None):
+            exit_with_error("--update is not supported with PMTiles output")
+        # Web viewers expect z/x/y files
+        options.webviewer = "none"
+
     # Output the results
     if options.verbose:
         logger.debug("Options: %s" % str(options))
@@ -2116,10 +3099,13 @@ class TileJobInfo:
     """
 
     src_file = ""
+    input_file = ""
     nb_data_bands = 0
     output_file_path = ""
     tile_extension = ""
     tile_size = 0
+    querysize = 0
+    tsize = []
     tile_driver = None
     kml = False
     tminmax = []
@@ -2131,6 +3117,11 @@ class TileJobInfo:
     is_epsg_4326 = False
     options = None
     exclude_transparent = False
+    output_format = "directory"
+    # Update mode: extents of the base tiles to regenerate, and the one being
+    # currently regenerated
+    update_extents = []
+    update_extent = None
 
     def __init__(self, **kwargs):
         for key in kwargs:
@@ -2151,6 +3142,945 @@ class Gdal2TilesError(Exception):
     pass
 
 
+def guess_tile_output_format(output: str) -> str:
+    """Guess the tile output format from the extension of the output"""
+
+    ext = os.path.splitext(output)[1].lower()
+    if ext == ".mbtiles":
+        return "MBTiles"
+    if ext == ".gpkg":
+        return "GPKG"
+    if ext == ".pmtiles":
+        return "PMTiles"
+    return "directory"
+
+
+def _read_vsi_file(filename: str) -> bytes:
+    f = gdal.VSIFOpenL(filename, "rb")
+    if f is None:
+        raise Exception(f"Cannot open {filename}")
+    try:
+        gdal.VSIFSeekL(f, 0, 2)
+        size = gdal.VSIFTellL(f)
+        gdal.VSIFSeekL(f, 0, 0)
+        return gdal.VSIFReadL(1, size, f)
+    finally:
+        gdal.VSIFCloseL(f)
+
+
+class DirectoryTileOutput:
+    """Tiles written as z/x/y.ext files in a directory, directly by the workers"""
+
+    written_by_workers = True
+
+    # Number of tiles written but not committed yet
+    pending_tiles = 0
+
+    def __init__(
+        self,
+        output: str,
+        tile_extension: str,
+        tile_driver: str,
+        options: Options,
+        tmsMap: dict,
+        tmp_dir: str,
+    ) -> None:
+        self.output = output
+        self.tile_extension = tile_extension
+        self.tile_driver = tile_driver
+        self.options = options
+        self.tmsMap = tmsMap
+        self.tmp_dir = tmp_dir
+
+    def create(self, gdal2tiles: "GDAL2Tiles") -> None:
+        """Create the output, before any tile is written"""
+        makedirs(self.output)
+
+    def make_column_dir(self, tz: int, tx: int) -> None:
+        makedirs(os.path.join(self.output, str(tz), str(tx)))
+
+    def tile_filename(self, tz: int, tx: int, ty: int) -> str:
+        ty_real = GDAL2Tiles.getYTile(ty, tz, self.options, self.tmsMap)
+        return os.path.join(
+            self.output, str(tz), str(tx), "%s.%s" % (ty_real, self.tile_extension)
+        )
+
+    def has_tile(self, tz: int, tx: int, ty: int) -> bool:
+        return isfile(self.tile_filename(tz, tx, ty))
+
+    def open_tile(self, tz: int, tx: int, ty: int) -> Optional[gdal.Dataset]:
+        tilefilename = self.tile_filename(tz, tx, ty)
+        if not isfile(tilefilename):
+            return None
+        return gdal.Open(tilefilename, gdal.GA_ReadOnly)
+
+    def write_tile(
+        self, tz: int, tx: int, ty: int, dstile: gdal.Dataset
+    ) -> Optional[EncodedTile]:
+        """Write the tile, or return it encoded if it must be written by the main process"""
+        write_tile(
+            dstile, self.tile_filename(tz, tx, ty), self.tile_driver, self.options
+        )
+        return None
+
+    def write_tile_data(
+        self, tz: int, tx: int, ty: int, data: bytes
+    ) -> Optional[EncodedTile]:
+        """Write an already encoded tile, or return it if it must be written by
+        the main process"""
+        with my_open(self.tile_filename(tz, tx, ty), "wb") as f:
+            f.write(data)
+        return None
+
+    def delete_tile(self, tz: int, tx: int, ty: int) -> Optional[EncodedTile]:
+        """Delete the tile if it exists, or return the deletion, as an encoded
+        tile with empty content, if it must be done by the main process"""
+        tilefilename = self.tile_filename(tz, tx, ty)
+        if isfile(tilefilename):
+            gdal.Unlink(tilefilename)
+        return None
+
+    def write_encoded_tiles(self, encoded_tiles: List[EncodedTile]) -> None:
+        assert not encoded_tiles
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteTileOutput(DirectoryTileOutput, ABC):
+    """Base class for tiles written in a single SQLite based file
+
+    Tiles are encoded by the workers and sent back to the main process, which
+    is the single writer of the file and groups the writes in transactions.
+    """
+
+    written_by_workers = False
+
+    # Number of tiles written per transaction
+    batch_size = 1000
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.conn = None
+        self.pending_tiles = 0
+
+    @property
+    def sqlite_filename(self) -> str:
+        return self.output
+
+    def create(self, gdal2tiles: "GDAL2Tiles") -> None:
+        if (
+            not self.options.resume
+            and not getattr(self.options, "update", None)
+            and os.path.exists(self.sqlite_filename)
+        ):
+            os.unlink(self.sqlite_filename)
+        conn = sqlite3.connect(self.sqlite_filename)
+        try:
+            self._create_schema(conn, gdal2tiles)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @abstractmethod
+    def _create_schema(self, conn, gdal2tiles: "GDAL2Tiles") -> None:
+        """Create the tables of the file, if they do not exist yet"""
+
+    @abstractmethod
+    def _tile_key(self, tz: int, tx: int, ty: int) -> Tuple:
+        """Return the values identifying a tile in the SQL statements"""
+
+    _select_sql = ""
+    _insert_sql = ""
+    _delete_sql = ""
+
+    def _write_connection(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.sqlite_filename)
+            # Let the workers read committed tiles while the main process writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=OFF")
+        return self.conn
+
+    def make_column_dir(self, tz: int, tx: int) -> None:
+        pass
+
+    def tile_filename(self, tz: int, tx: int, ty: int) -> str:
+        return "%s:%d/%d/%d" % (self.output, tz, tx, ty)
+
+    def _read_tile_data(self, tz: int, tx: int, ty: int) -> Optional[bytes]:
+        if self.conn is not None:
+            conn = self.conn
+        else:
+            # Do not keep connections opened in the workers, so that the
+            # main process can leave WAL mode when closing the file
+            conn = sqlite3.connect(
+                "file:%s?mode=ro"
+                % urllib.request.pathname2url(os.path.abspath(self.sqlite_filename)),
+                uri=True,
+            )
+        try:
+            row = conn.execute(self._select_sql, self._tile_key(tz, tx, ty)).fetchone()
+        finally:
+            if conn is not self.conn:
+                conn.close()
+        return row[0] if row else None
+
+    def has_tile(self, tz: int, tx: int, ty: int) -> bool:
+        return self._read_tile_data(tz, tx, ty) is not None
+
+    def open_tile(self, tz: int, tx: int, ty: int) -> Optional[gdal.Dataset]:
+        data = self._read_tile_data(tz, tx, ty)
+        if data is None:
+            return None
+        tmp_filename = "/vsimem/gdal2tiles/%s.%s" % (uuid4(), self.tile_extension)
+        gdal.FileFromMemBuffer(tmp_filename, data)
+        try:
+            ds = gdal.Open(tmp_filename, gdal.GA_ReadOnly)
+            return gdal.GetDriverByName("MEM").CreateCopy("", ds)
+        finally:
+            ds = None
+            gdal.Unlink(tmp_filename)
+
+    def write_tile(
+        self, tz: int, tx: int, ty: int, dstile: gdal.Dataset
+    ) -> Optional[EncodedTile]:
+        data = encode_tile(dstile, self.tile_extension, self.tile_driver, self.options)
+        return (tz, tx, ty, data)
+
+    def write_tile_data(
+        self, tz: int, tx: int, ty: int, data: bytes
+    ) -> Optional[EncodedTile]:
+        return (tz, tx, ty, data)
+
+    def delete_tile(self, tz: int, tx: int, ty: int) -> Optional[EncodedTile]:
+        return (tz, tx, ty, b"")
+
+    def _insert_tiles(self, conn, encoded_tiles: List[EncodedTile]) -> None:
+        conn.executemany(
+            self._insert_sql,
+            [
+                self._tile_key(tz, tx, ty) + (data,)
+                for (tz, tx, ty, data) in encoded_tiles
+            ],
+        )
+
+    def write_encoded_tiles(self, encoded_tiles: List[EncodedTile]) -> None:
+        if not encoded_tiles:
+            return
+        conn = self._write_connection()
+        # Deletions are pending as well until committed, so that the overview
+        # tiles are not built from the previous version of the deleted tiles
+        self.pending_tiles += len(encoded_tiles)
+        deleted_tiles = [
+            self._tile_key(tz, tx, ty) for tz, tx, ty, data in encoded_tiles if not data
+        ]
+        if deleted_tiles:
+            conn.executemany(self._delete_sql, deleted_tiles)
+            encoded_tiles = [tile for tile in encoded_tiles if tile[3]]
+        if encoded_tiles:
+            self._insert_tiles(conn, encoded_tiles)
+        if self.pending_tiles >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.conn is not None and self.conn.in_transaction:
+            self.conn.commit()
+        self.pending_tiles = 0
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.flush()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.execute("PRAGMA journal_mode=DELETE")
+            self.conn.close()
+            self.conn = None
+
+
+class MBTilesTileOutput(SQLiteTileOutput):
+    """Tiles written in a MBTiles file
+
+    Identical tiles (typically uniform ones) are stored only once: tiles is
+    a view joining the map table, which references a tile content for each
+    tile coordinate, with the images table, which holds the tile contents.
+    """
+
+    _select_sql = (
+        "SELECT tile_data FROM tiles "
+        "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+    )
+    _delete_sql = (
+        "DELETE FROM map WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+    )
+
+    def _tile_key(self, tz: int, tx: int, ty: int) -> Tuple:
+        # MBTiles uses the TMS numbering
+        return (tz, tx, ty)
+
+    def close(self) -> None:
+        if self.conn is not None and getattr(self.options, "update", None):
+            # Remove the contents no tile refers to anymore
+            self.conn.execute(
+                "DELETE FROM images WHERE tile_id NOT IN (SELECT tile_id FROM map)"
+            )
+            self.conn.commit()
+        super().close()
+
+    def _insert_tiles(self, conn, encoded_tiles: List[EncodedTile]) -> None:
+        images = {}
+        map_rows = []
+        for tz, tx, ty, data in encoded_tiles:
+            tile_id = hashlib.sha256(data).hexdigest()
+            images[tile_id] = data
+            map_rows.append(self._tile_key(tz, tx, ty) + (tile_id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO images (tile_id, tile_data) VALUES (?, ?)",
+            images.items(),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO map "
+            "(zoom_level, tile_column, tile_row, tile_id) VALUES (?, ?, ?, ?)",
+            map_rows,
+        )
+
+    def _create_schema(self, conn, gdal2tiles: "GDAL2Tiles") -> None:
+        conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS map (zoom_level INTEGER, "
+            "tile_column INTEGER, tile_row INTEGER, tile_id TEXT)"
+        )
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS map_index ON map "
+            "(zoom_level, tile_column, tile_row)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS images (tile_data BLOB, tile_id TEXT)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS images_id ON images (tile_id)")
+        conn.execute(
+            "CREATE VIEW IF NOT EXISTS tiles AS SELECT "
+            "map.zoom_level AS zoom_level, map.tile_column AS tile_column, "
+            "map.tile_row AS tile_row, images.tile_data AS tile_data "
+            "FROM map JOIN images ON images.tile_id = map.tile_id"
+        )
+        south, west, north, east = gdal2tiles.swne
+        metadata = {
+            "name": self.options.title,
+            "description": self.options.title,
+            "type": "overlay",
+            "version": "1.1",
+            "format": self.tile_extension,
+            "bounds": "%.17g,%.17g,%.17g,%.17g" % (west, south, east, north),
+            "minzoom": str(gdal2tiles.tminz),
+            "maxzoom": str(gdal2tiles.tmaxz),
+        }
+        if self.options.copyright:
+            metadata["attribution"] = self.options.copyright
+        conn.execute("DELETE FROM metadata")
+        conn.executemany(
+            "INSERT INTO metadata (name, value) VALUES (?, ?)", metadata.items()
+        )
+
+
+class GPKGTileOutput(SQLiteTileOutput):
+    """Tiles written in a tile pyramid user data table of a GeoPackage"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.table_name = os.path.splitext(os.path.basename(self.output))[0]
+        self._select_sql = (
+            'SELECT tile_data FROM "%s" '
+            "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+            % self.table_name.replace('"', '""')
+        )
+        self._insert_sql = (
+            'INSERT OR REPLACE INTO "%s" '
+            "(zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)"
+            % self.table_name.replace('"', '""')
+        )
+        self._delete_sql = (
+            'DELETE FROM "%s" '
+            "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+            % self.table_name.replace('"', '""')
+        )
+        self.matrix_height = self._tile_matrix_set()[4]
+
+    def _tile_matrix_set(self) -> Tuple[osr.SpatialReference, float, float, int, int]:
+        """Return the SRS, the top left corner, and the matrix size at zoom level 0"""
+
+        tile_size = self.options.tilesize
+        if self.options.profile == "mercator":
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(3857)
+            mercator = GlobalMercator(tile_size)
+            return srs, -mercator.originShift, mercator.originShift, 1, 1
+        if self.options.profile == "geodetic":
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(4326)
+            geodetic = GlobalGeodetic(self.options.tmscompatible, tile_size)
+            top = -90 + geodetic.resFact * tile_size
+            return srs, -180.0, top, 2 if self.options.tmscompatible else 1, 1
+        tms = self.tmsMap[self.options.profile]
+        return (
+            tms.srs,
+            tms.topleft_x,
+            tms.topleft_y,
+            tms.matrix_width,
+            tms.matrix_height,
+        )
+
+    def _resolution(self, tz: int) -> float:
+        tile_size = self.options.tilesize
+        if self.options.profile == "mercator":
+            return GlobalMercator(tile_size).Resolution(tz)
+        if self.options.profile == "geodetic":
+            return GlobalGeodetic(self.options.tmscompatible, tile_size).Resolution(tz)
+        tms = self.tmsMap[self.options.profile]
+        return tms.resolution * tms.tile_size / tile_size / (2**tz)
+
+    def _tile_key(self, tz: int, tx: int, ty: int) -> Tuple:
+        # GeoPackage tile rows start at the top of the matrix
+        return (tz, tx, self.matrix_height * 2**tz - 1 - ty)
+
+    def _create_schema(self, conn, gdal2tiles: "GDAL2Tiles") -> None:
+        srs, topleft_x, topleft_y, matrix_width, matrix_height = self._tile_matrix_set()
+        tile_size = self.options.tilesize
+        res0 = self._resolution(0)
+
+        conn.execute("PRAGMA application_id = 1196444487")  # 'GPKG'
+        conn.execute("PRAGMA user_version = 10200")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys ("
+            "srs_name TEXT NOT NULL, srs_id INTEGER NOT NULL PRIMARY KEY, "
+            "organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, "
+            "definition TEXT NOT NULL, description TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_contents ("
+            "table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, "
+            "identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+            "last_change DATETIME NOT NULL "
+            "DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+            "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, "
+            "CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) "
+            "REFERENCES gpkg_spatial_ref_sys(srs_id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_tile_matrix_set ("
+            "table_name TEXT NOT NULL PRIMARY KEY, srs_id INTEGER NOT NULL, "
+            "min_x DOUBLE NOT NULL, min_y DOUBLE NOT NULL, "
+            "max_x DOUBLE NOT NULL, max_y DOUBLE NOT NULL, "
+            "CONSTRAINT fk_gtms_table_name FOREIGN KEY (table_name) "
+            "REFERENCES gpkg_contents(table_name), "
+            "CONSTRAINT fk_gtms_srs FOREIGN KEY (srs_id) "
+            "REFERENCES gpkg_spatial_ref_sys (srs_id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_tile_matrix ("
+            "table_name TEXT NOT NULL, zoom_level INTEGER NOT NULL, "
+            "matrix_width INTEGER NOT NULL, matrix_height INTEGER NOT NULL, "
+            "tile_width INTEGER NOT NULL, tile_height INTEGER NOT NULL, "
+            "pixel_x_size DOUBLE NOT NULL, pixel_y_size DOUBLE NOT NULL, "
+            "CONSTRAINT pk_ttm PRIMARY KEY (table_name, zoom_level), "
+            "CONSTRAINT fk_tmm_table_name FOREIGN KEY (table_name) "
+            "REFERENCES gpkg_contents(table_name))"
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS "%s" ('
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, zoom_level INTEGER NOT NULL, "
+            "tile_column INTEGER NOT NULL, tile_row INTEGER NOT NULL, "
+            "tile_data BLOB NOT NULL, UNIQUE (zoom_level, tile_column, tile_row))"
+            % self.table_name.replace('"', '""')
+        )
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    "Undefined cartesian SRS",
+                    -1,
+                    "NONE",
+                    -1,
+                    "undefined",
+                    "undefined cartesian coordinate reference system",
+                ),
+                (
+                    "Undefined geographic SRS",
+                    0,
+                    "NONE",
+                    0,
+                    "undefined",
+                    "undefined geographic coordinate reference system",
+                ),
+            ],
+        )
+        srs_4326 = osr.SpatialReference()
+        srs_4326.ImportFromEPSG(4326)
+        organization = srs.GetAuthorityName(None)
+        code = srs.GetAuthorityCode(None)
+        if organization and code and organization.upper() == "EPSG":
+            srs_id = int(code)
+        else:
+            srs_id, organization = 100000, "NONE"
+        for srs_row in [
+            (srs_4326.GetName(), 4326, "EPSG", 4326, srs_4326.ExportToWkt()),
+            (srs.GetName(), srs_id, organization, srs_id, srs.ExportToWkt()),
+        ]:
+            conn.execute(
+                "INSERT OR IGNORE INTO gpkg_spatial_ref_sys "
+                "(srs_name, srs_id, organization, organization_coordsys_id, "
+                "definition) VALUES (?, ?, ?, ?, ?)",
+                srs_row,
+            )
+
+        conn.execute(
+            "INSERT OR REPLACE INTO gpkg_contents (table_name, data_type, "
+            "identifier, description, min_x, min_y, max_x, max_y, srs_id) "
+            "VALUES (?, 'tiles', ?, '', ?, ?, ?, ?, ?)",
+            (
+                self.table_name,
+                self.options.title,
+                gdal2tiles.ominx,
+                gdal2tiles.ominy,
+                gdal2tiles.omaxx,
+                gdal2tiles.omaxy,
+                srs_id,
+            ),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO gpkg_tile_matrix_set VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.table_name,
+                srs_id,
+                topleft_x,
+                topleft_y - matrix_height * tile_size * res0,
+                topleft_x + matrix_width * tile_size * res0,
+                topleft_y,
+            ),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO gpkg_tile_matrix VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.table_name,
+                    tz,
+                    matrix_width * 2**tz,
+                    matrix_height * 2**tz,
+                    tile_size,
+                    tile_size,
+                    self._resolution(tz),
+                    self._resolution(tz),
+                )
+                for tz in range(gdal2tiles.tminz, gdal2tiles.tmaxz + 1)
+            ],
+        )
+
+        if self.tile_driver == "WEBP":
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS gpkg_extensions ("
+                "table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL, "
+                "definition TEXT NOT NULL, scope TEXT NOT NULL, "
+                "CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name))"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO gpkg_extensions VALUES "
+                "(?, 'tile_data', 'gpkg_webp', "
+                "'http://www.geopackage.org/spec120/#extension_tiles_webp', "
+                "'read-write')",
+                (self.table_name,),
+            )
+
+
+def _pmtiles_tile_id(tz: int, tx: int, ty: int) -> int:
+    """Tile id of a z/x/y tile (with a top-left origin), along a Hilbert curve"""
+
+    tile_id = ((1 << (2 * tz)) - 1) // 3  # number of tiles at lower zoom levels
+    n = 1 << tz
+    s = n >> 1
+    while s > 0:
+        rx = 1 if tx & s else 0
+        ry = 1 if ty & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                tx = n - 1 - tx
+                ty = n - 1 - ty
+            tx, ty = ty, tx
+        s >>= 1
+    return tile_id
+
+
+def _pmtiles_write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _pmtiles_serialize_directory(entries: List[List[int]]) -> bytes:
+    """Serialize (tile_id, offset, length, run_length) entries as a gzip'ed directory"""
+
+    out = bytearray()
+    _pmtiles_write_varint(out, len(entries))
+    last_tile_id = 0
+    for entry in entries:
+        _pmtiles_write_varint(out, entry[0] - last_tile_id)
+        last_tile_id = entry[0]
+    for entry in entries:
+        _pmtiles_write_varint(out, entry[3])
+    for entry in entries:
+        _pmtiles_write_varint(out, entry[2])
+    for i, entry in enumerate(entries):
+        if i > 0 and entry[1] == entries[i - 1][1] + entries[i - 1][2]:
+            _pmtiles_write_varint(out, 0)
+        else:
+            _pmtiles_write_varint(out, entry[1] + 1)
+    return gzip.compress(bytes(out))
+
+
+class PMTilesTileOutput(SQLiteTileOutput):
+    """Tiles written in a PMTiles (version 3) file
+
+    Tiles are first accumulated in a temporary SQLite database, from which
+    the PMTiles file is written, with deduplicated tile contents, on close.
+    """
+
+    header_size = 127
+    # The header and the root directory must fit in the first 16 kB
+    max_root_directory_size = 16384 - header_size
+
+    _select_sql = "SELECT tile_data FROM tiles WHERE tile_id = ?"
+    _insert_sql = "INSERT OR REPLACE INTO tiles (tile_id, tile_data) VALUES (?, ?)"
+    _delete_sql = "DELETE FROM tiles WHERE tile_id = ?"
+
+    @property
+    def sqlite_filename(self) -> str:
+        return os.path.join(self.tmp_dir, "pmtiles.sqlite")
+
+    def _tile_key(self, tz: int, tx: int, ty: int) -> Tuple:
+        return (_pmtiles_tile_id(tz, tx, 2**tz - 1 - ty),)
+
+    def _create_schema(self, conn, gdal2tiles: "GDAL2Tiles") -> None:
+        conn.execute("CREATE TABLE tiles (tile_id INTEGER PRIMARY KEY, tile_data BLOB)")
+        conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        south, west, north, east = gdal2tiles.swne
+        header = {
+            "min_zoom": gdal2tiles.tminz,
+            "max_zoom": gdal2tiles.tmaxz,
+            "bounds": [west, south, east, north],
+        }
+        metadata = {
+            "name": self.options.title,
+            "description": self.options.title,
+            "type": "overlay",
+            "format": self.tile_extension,
+        }
+        if self.options.copyright:
+            metadata["attribution"] = self.options.copyright
+        conn.executemany(
+            "INSERT INTO metadata (name, value) VALUES (?, ?)",
+            [("header", json.dumps(header)), ("metadata", json.dumps(metadata))],
+        )
+
+    def _build_directories(self, entries: List[List[int]]) -> Tuple[bytes, bytes]:
+        root = _pmtiles_serialize_directory(entries)
+        if len(root) <= self.max_root_directory_size:
+            return root, b""
+        leaf_size = 4096
+        while True:
+            root_entries = []
+            leaves = bytearray()
+            for i in range(0, len(entries), leaf_size):
+                leaf = _pmtiles_serialize_directory(entries[i : i + leaf_size])
+                root_entries.append([entries[i][0], len(leaves), len(leaf), 0])
+                leaves += leaf
+            root = _pmtiles_serialize_directory(root_entries)
+            if len(root) <= self.max_root_directory_size:
+                return root, bytes(leaves)
+            leaf_size *= 2
+
+    def close(self) -> None:
+        super().close()
+
+        conn = sqlite3.connect(self.sqlite_filename)
+        try:
+            info = dict(conn.execute("SELECT name, value FROM metadata"))
+            header = json.loads(info["header"])
+
+            entries: List[List[int]] = []
+            contents: Dict[bytes, Tuple[int, int]] = {}
+            addressed_tiles = 0
+            tile_data_filename = os.path.join(self.tmp_dir, "pmtiles_tile_data.bin")
+            with open(tile_data_filename, "wb") as tile_data_file:
+                offset = 0
+                for tile_id, data in conn.execute(
+                    "SELECT tile_id, tile_data FROM tiles ORDER BY tile_id"
+                ):
+                    addressed_tiles += 1
+                    digest = hashlib.sha256(data).digest()
+                    if digest in contents:
+                        tile_offset, length = contents[digest]
+                    else:
+                        tile_offset, length = offset, len(data)
+                        contents[digest] = (tile_offset, length)
+                        tile_data_file.write(data)
+                        offset += length
+                    if (
+                        entries
+                        and entries[-1][0] + entries[-1][3] == tile_id
+                        and entries[-1][1] == tile_offset
+                    ):
+                        entries[-1][3] += 1
+                    else:
+                        entries.append([tile_id, tile_offset, length, 1])
+                tile_data_length = offset
+        finally:
+            conn.close()
+
+        root, leaves = self._build_directories(entries)
+        metadata = gzip.compress(info["metadata"].encode("utf-8"))
+        root_offset = self.header_size
+        metadata_offset = root_offset + len(root)
+        leaves_offset = metadata_offset + len(metadata)
+        tile_data_offset = leaves_offset + len(leaves)
+
+        west, south, east, north = header["bounds"]
+        tile_type = {"png": 2, "jpg": 3, "webp": 4}[self.tile_extension]
+        header_bytes = struct.pack(
+            "<7sBQQQQQQQQQQQBBBBBBiiiiBii",
+            b"PMTiles",
+            3,
+            root_offset,
+            len(root),
+            metadata_offset,
+            len(metadata),
+            leaves_offset,
+            len(leaves),
+            tile_data_offset,
+            tile_data_length,
+            addressed_tiles,
+            len(entries),
+            len(contents),
+            1,  # clustered
+            2,  # internal compression: gzip
+            1,  # tile compression: none
+            tile_type,
+            header["min_zoom"],
+            header["max_zoom"],
+            int(west * 1e7),
+            int(south * 1e7),
+            int(east * 1e7),
+            int(north * 1e7),
+            header["min_zoom"],
+            int((west + east) / 2 * 1e7),
+            int((south + north) / 2 * 1e7),
+        )
+        assert len(header_bytes) == self.header_size
+
+        with open(self.output, "wb") as f:
+            f.write(header_bytes)
+            f.write(root)
+            f.write(metadata)
+            f.write(leaves)
+            with open(tile_data_filename, "rb") as tile_data_file:
+                shutil.copyfileobj(tile_data_file, f)
+        os.unlink(tile_data_filename)
+
+
+tile_output_classes = {
+    "directory": DirectoryTileOutput,
+    "MBTiles": MBTilesTileOutput,
+    "GPKG": GPKGTileOutput,
+    "PMTiles": PMTilesTileOutput,
+}
+
+
+def open_tile_output(
+    tile_job_info: "TileJobInfo", tmsMap: Optional[dict]
+) -> DirectoryTileOutput:
+    """Return the (thread-local) tile output of the tile job"""
+
+    tile_outputs = getattr(threadLocal, "tile_outputs", None)
+    if tile_outputs is None:
+        tile_outputs = threadLocal.tile_outputs = {}
+    key = (tile_job_info.output_format, tile_job_info.output_file_path)
+    if key not in tile_outputs:
+        if tmsMap is None:
+            _, tmsMap = get_profile_list_and_tmsMap()
+        tile_outputs[key] = tile_output_classes[tile_job_info.output_format](
+            tile_job_info.output_file_path,
+            tile_job_info.tile_extension,
+            tile_job_info.tile_driver,
+            tile_job_info.options,
+            tmsMap,
+            os.path.dirname(tile_job_info.src_file),
+        )
+    return tile_outputs[key]
+
+
+def close_tile_outputs() -> None:
+    """Close the tile outputs opened by open_tile_output() in this thread"""
+
+    for tile_output in getattr(threadLocal, "tile_outputs", {}).values():
+        tile_output.close()
+    threadLocal.tile_outputs = {}
+
+
+class SourceCoverage:
+    """Cheap detection of the base tiles that have no valid source pixel
+
+    The validity of the source pixels is determined on the input dataset,
+    before any warping. A tile is empty if its footprint does not intersect
+    the input dataset, if GDALRasterBand::GetDataCoverageStatus() reports
+    that the corresponding source window is empty (sparse GeoTIFF files,
+    VRT or GTI mosaics with holes, ...), or if the mask of an overview of
+    the input dataset, sampled with at least a few pixels per tile, is
+    entirely zero.
+    """
+
+    # Number of points per tile edge transformed to get the source window
+    edge_points = 9
+
+    # Minimum number of overview pixels per tile, in each direction, for
+    # the mask of an overview to be used
+    min_overview_samples = 4
+
+    def __init__(
+        self, warped_ds: gdal.Dataset, input_ds: gdal.Dataset, options: Options
+    ) -> None:
+        self.input_ds = input_ds
+        self.transformer = None
+        # Scaling factors from the warped dataset to the input dataset, when
+        # they cover the same extent
+        self.scale = None
+        if warped_ds is not input_ds and (
+            input_ds.GetGCPCount() != 0
+            or warped_ds.RasterXSize != input_ds.RasterXSize
+            or warped_ds.RasterYSize != input_ds.RasterYSize
+            or warped_ds.GetGeoTransform() != input_ds.GetGeoTransform()
+        ):
+            if has_georeference(input_ds) and has_georeference(warped_ds):
+                self.transformer = gdal.Transformer(warped_ds, input_ds, [])
+            else:
+                self.scale = (
+                    input_ds.RasterXSize / warped_ds.RasterXSize,
+                    input_ds.RasterYSize / warped_ds.RasterYSize,
+                )
+
+        self.coverage_bands = []
+        self.overview_masks = []
+
+        band = input_ds.GetRasterBand(1)
+        mask_flags = band.GetMaskFlags()
+        if options.srcnodata or (mask_flags & gdal.GMF_ALL_VALID):
+            # Only the tiles outside of the input dataset are known to be empty
+            return
+
+        # With nodata values, a pixel is invalid only if all its bands are
+        # at nodata, hence all bands must be checked.
+        if mask_flags & gdal.GMF_NODATA:
+            bands = [input_ds.GetRasterBand(i + 1) for i in range(input_ds.RasterCount)]
+            # Regions reported as empty read as nodata
+            self.coverage_bands = bands
+        else:
+            bands = [band]
+            # Regions reported as empty read as 0, unless the mask band
+            # has a non-zero nodata value
+            if not band.GetMaskBand().GetNoDataValue():
+                self.coverage_bands = [band.GetMaskBand()]
+
+        for i in range(min(b.GetOverviewCount() for b in bands)):
+            ovr_bands = [b.GetOverview(i) for b in bands]
+            self.overview_masks.append(
+                (
+                    input_ds.RasterXSize / ovr_bands[0].XSize,
+                    input_ds.RasterYSize / ovr_bands[0].YSize,
+                    [ovr_band.GetMaskBand() for ovr_band in ovr_bands],
+                )
+            )
+        # From the most to the least decimated overview
+        self.overview_masks.sort(key=lambda x: -x[0])
+
+    def _source_window(
+        self, rx: int, ry: int, rxsize: int, rysize: int
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Return the window of the input dataset that contributes to a window
+        of the warped dataset, or None if it is outside of the input dataset"""
+
+        if self.scale is not None:
+            x0 = int(rx * self.scale[0])
+            y0 = int(ry * self.scale[1])
+            x1 = int(math.ceil((rx + rxsize) * self.scale[0]))
+            y1 = int(math.ceil((ry + rysize) * self.scale[1]))
+            return x0, y0, x1 - x0, y1 - y0
+
+        if self.transformer is None:
+            return rx, ry, rxsize, rysize
+
+        n = self.edge_points
+        points = []
+        for i in range(n):
+            t = i / (n - 1)
+            points += [
+                (rx + t * rxsize, ry),
+                (rx + t * rxsize, ry + rysize),
+                (rx, ry + t * rysize),
+                (rx + rxsize, ry + t * rysize),
+            ]
+        points.append((rx + rxsize / 2, ry + rysize / 2))
+        transformed, success = self.transformer.TransformPoints(0, points)
+        if not all(success):
+            # Cannot conclude
+            return 0, 0, self.input_ds.RasterXSize, self.input_ds.RasterYSize
+
+        xs = [p[0] for p in transformed]
+        ys = [p[1] for p in transformed]
+        # Margin for the resampling kernel
+        margin_x = 3 * max(1.0, (max(xs) - min(xs)) / rxsize)
+        margin_y = 3 * max(1.0, (max(ys) - min(ys)) / rysize)
+        x0 = max(0, int(math.floor(min(xs) - margin_x)))
+        y0 = max(0, int(math.floor(min(ys) - margin_y)))
+        x1 = min(self.input_ds.RasterXSize, int(math.ceil(max(xs) + margin_x)))
+        y1 = min(self.input_ds.RasterYSize, int(math.ceil(max(ys) + margin_y)))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1 - x0, y1 - y0
+
+    def is_empty(self, rx: int, ry: int, rxsize: int, rysize: int) -> bool:
+        """Whether the window of the warped dataset has no valid source pixel"""
+
+        window = self._source_window(rx, ry, rxsize, rysize)
+        if window is None:
+            return True
+        x, y, xsize, ysize = window
+
+        if self.coverage_bands and all(
+            band.GetDataCoverageStatus(x, y, xsize, ysize)[0]
+            == gdal.GDAL_DATA_COVERAGE_STATUS_EMPTY
+            for band in self.coverage_bands
+        ):
+            return True
+
+        min_size = min(xsize, ysize) / self.min_overview_samples
+        for factor_x, factor_y, mask_bands in self.overview_masks:
+            if max(factor_x, factor_y) > min_size:
+                continue
+            # Expand the window by one overview pixel in each direction, to
+            # account for the subsampling
+            ox0 = max(0, int(x / factor_x) - 1)
+            oy0 = max(0, int(y / factor_y) - 1)
+            ox1 = min(mask_bands[0].XSize, int(math.ceil((x + xsize) / factor_x)) + 1)
+            oy1 = min(mask_bands[0].YSize, int(math.ceil((y + ysize) / factor_y)) + 1)
+            for mask_band in mask_bands:
+                mask = mask_band.ReadRaster(ox0, oy0, ox1 - ox0, oy1 - oy0)
+                if mask.count(0) != len(mask):
+                    return False
+            return True
+
+        return False
+
+
 class GDAL2Tiles:
     def __init__(
         self, input_file: str, output_folder: str, options: Options, tmsMap: dict
@@ -2194,9 +4124,15 @@ class GDAL2Tiles:
             self.tileext = "webp"
         else:
             self.tileext = "jpg"
+        self.output_format = getattr(options, "output_format", None) or "directory"
         if options.mpi:
-            makedirs(output_folder)
-            self.tmp_dir = tempfile.mkdtemp(dir=output_folder)
+            if self.output_format == "directory":
+                makedirs(output_folder)
+                self.tmp_dir = tempfile.mkdtemp(dir=output_folder)
+            else:
+                self.tmp_dir = tempfile.mkdtemp(
+                    dir=os.path.dirname(os.path.abspath(output_folder))
+                )
         else:
             self.tmp_dir = tempfile.mkdtemp()
         self.tmp_vrt_filename = os.path.join(self.tmp_dir, str(uuid4()) + ".vrt")
@@ -2230,6 +4166,17 @@ class GDAL2Tiles:
 
         # KML generation
         self.kml = self.options.kml
+        if self.output_format != "directory":
+            self.kml = False
+
+        self.tile_output = tile_output_classes[self.output_format](
+            self.output_folder,
+            self.tileext,
+            self.tiledriver,
+            self.options,
+            self.tmsMap,
+            self.tmp_dir,
+        )
 
     # -------------------------------------------------------------------------
     def open_input(self) -> None:
@@ -2675,7 +4622,8 @@ class GDAL2Tiles:
         tiles are generated during the tile processing).
         """
 
-        makedirs(self.output_folder)
+        if self.output_format == "directory":
+            makedirs(self.output_folder)
 
         if self.options.profile == "mercator":
 
@@ -2739,6 +4687,7 @@ class GDAL2Tiles:
         # Generate tilemapresource.xml.
         if (
             not self.options.xyz
+            and self.output_format == "directory"
             and self.swne is not None
             and (
                 not self.options.resume
@@ -2794,159 +4743,44 @@ class GDAL2Tiles:
                             ).encode("utf-8")
                         )
 
-    def generate_base_tiles(self) -> Tuple[TileJobInfo, List[TileDetail]]:
+        self.tile_output.create(self)
+
+    def generate_base_tiles(self) -> Tuple[TileJobInfo, Iterator[TileRange]]:
         """
         Generation of the base tiles (the lowest in the pyramid) directly from the input raster
+
+        Returns the tile job configuration and a generator of the row segments
+        of base tiles to process. The details of each base tile are computed
+        by the process that generates it (see get_base_tile_detail()), so that
+        neither time nor memory depend on the number of tiles here.
         """
 
         if not self.options.quiet:
-            logger.info("Generating Base Tiles:")
+            logger.info("Generating Tiles:")
 
         if self.options.verbose:
             logger.debug("")
             logger.debug("Tiles generated from the max zoom level:")
             logger.debug("----------------------------------------")
             logger.debug("")
-
-        # Set the bounds
-        tminx, tminy, tmaxx, tmaxy = self.tminmax[self.tmaxz]
-
-        ds = self.warped_input_dataset
-        tilebands = self.dataBandsCount + 1
-        querysize = self.querysize
-
-        if self.options.verbose:
             logger.debug("dataBandsCount: %d" % self.dataBandsCount)
-            logger.debug("tilebands: %d" % tilebands)
-
-        tcount = (1 + abs(tmaxx - tminx)) * (1 + abs(tmaxy - tminy))
-        ti = 0
-
-        tile_details = []
-
-        tz = self.tmaxz
+            logger.debug("tilebands: %d" % (self.dataBandsCount + 1))
 
         # Create directories for the tiles
+        tminx, tminy, tmaxx, tmaxy = self.tminmax[self.tmaxz]
         for tx in range(tminx, tmaxx + 1):
-            tiledirname = os.path.join(self.output_folder, str(tz), str(tx))
-            makedirs(tiledirname)
-
-        for ty in range(tmaxy, tminy - 1, -1):
-            for tx in range(tminx, tmaxx + 1):
-
-                ti += 1
-                ytile = GDAL2Tiles.getYTile(ty, tz, self.options, self.tmsMap)
-                tilefilename = os.path.join(
-                    self.output_folder,
-                    str(tz),
-                    str(tx),
-                    "%s.%s" % (ytile, self.tileext),
-                )
-                if self.options.verbose:
-                    logger.debug("%d / %d, %s" % (ti, tcount, tilefilename))
-
-                if self.options.resume and isfile(tilefilename):
-                    if self.options.verbose:
-                        logger.debug("Tile generation skipped because of --resume")
-                    continue
-
-                if self.options.profile == "mercator":
-                    # Tile bounds in EPSG:3857
-                    b = self.mercator.TileBounds(tx, ty, tz)
-                elif self.options.profile == "geodetic":
-                    b = self.geodetic.TileBounds(tx, ty, tz)
-                elif self.options.profile != "raster":
-                    b = self.tmsMap[self.options.profile].TileBounds(
-                        tx, ty, tz, self.tile_size
-                    )
-
-                # Don't scale up by nearest neighbour, better change the querysize
-                # to the native resolution (and return smaller query tile) for scaling
-
-                if self.options.profile != "raster":
-                    rb, wb = self.geo_query(ds, b[0], b[3], b[2], b[1])
-
-                    # Pixel size in the raster covering query geo extent
-                    nativesize = wb[0] + wb[2]
-                    if self.options.verbose:
-                        logger.debug(
-                            f"\tNative Extent (querysize {nativesize}): {rb}, {wb}"
-                        )
-
-                    # Tile bounds in raster coordinates for ReadRaster query
-                    rb, wb = self.geo_query(
-                        ds, b[0], b[3], b[2], b[1], querysize=querysize
-                    )
-
-                    rx, ry, rxsize, rysize = rb
-                    wx, wy, wxsize, wysize = wb
-
-                else:  # 'raster' profile:
-
-                    tsize = int(
-                        self.tsize[tz]
-                    )  # tile_size in raster coordinates for actual zoom
-                    xsize = (
-                        self.warped_input_dataset.RasterXSize
-                    )  # size of the raster in pixels
-                    ysize = self.warped_input_dataset.RasterYSize
-                    querysize = self.tile_size
-
-                    rx = tx * tsize
-                    rxsize = 0
-                    if tx == tmaxx:
-                        rxsize = xsize % tsize
-                    if rxsize == 0:
-                        rxsize = tsize
-
-                    ry = ty * tsize
-                    rysize = 0
-                    if ty == tmaxy:
-                        rysize = ysize % tsize
-                    if rysize == 0:
-                        rysize = tsize
-
-                    wx, wy = 0, 0
-                    wxsize = int(rxsize / float(tsize) * self.tile_size)
-                    wysize = int(rysize / float(tsize) * self.tile_size)
-
-                    if not self.options.xyz:
-                        ry = ysize - (ty * tsize) - rysize
-                        if wysize != self.tile_size:
-                            wy = self.tile_size - wysize
-
-                if rxsize == 0 or rysize == 0 or wxsize == 0 or wysize == 0:
-                    if self.options.verbose:
-                        logger.debug("\tExcluding tile with no pixel coverage")
-                    continue
-
-                # Read the source raster if anything is going inside the tile as per the computed
-                # geo_query
-                tile_details.append(
-                    TileDetail(
-                        tx=tx,
-                        ty_tms=ty,
-                        ty=ytile,
-                        tz=tz,
-                        rx=rx,
-                        ry=ry,
-                        rxsize=rxsize,
-                        rysize=rysize,
-                        wx=wx,
-                        wy=wy,
-                        wxsize=wxsize,
-                        wysize=wysize,
-                        querysize=querysize,
-                    )
-                )
+            self.tile_output.make_column_dir(self.tmaxz, tx)
 
         conf = TileJobInfo(
             src_file=self.tmp_vrt_filename,
+            input_file=self.input_file,
             nb_data_bands=self.dataBandsCount,
             output_file_path=self.output_folder,
             tile_extension=self.tileext,
             tile_driver=self.tiledriver,
             tile_size=self.tile_size,
+            querysize=self.querysize,
+            tsize=self.tsize,
             kml=self.kml,
             tminmax=self.tminmax,
             tminz=self.tminz,
@@ -2957,9 +4791,96 @@ class GDAL2Tiles:
             is_epsg_4326=self.isepsg4326,
             options=self.options,
             exclude_transparent=self.options.exclude_transparent,
+            output_format=self.output_format,
+            update_extents=(
+                self.get_update_tile_extents()
+                if getattr(self.options, "update", None)
+                else []
+            ),
         )
+        self.tile_output.close()
+
+        width = get_tile_range_width(conf, self.tmaxz, self.options.nb_processes or 1)
+        return conf, iter_tile_ranges(conf, self.tmaxz, width)
+
+    def get_tile_extent(
+        self, xmin: float, ymin: float, xmax: float, ymax: float
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Return the extent of the base tiles intersecting the given extent
+        in the output SRS, or None if it does not intersect the raster"""
+
+        tz = self.tmaxz
+        if self.options.profile == "mercator":
+            tminx, tminy = self.mercator.MetersToTile(xmin, ymin, tz)
+            tmaxx, tmaxy = self.mercator.MetersToTile(xmax, ymax, tz)
+        elif self.options.profile == "geodetic":
+            tminx, tminy = self.geodetic.LonLatToTile(xmin, ymin, tz)
+            tmaxx, tmaxy = self.geodetic.LonLatToTile(xmax, ymax, tz)
+        elif self.options.profile == "raster":
+            tsize = self.tsize[tz]
+            gt = self.out_gt
+            col_min, col_max = sorted((x - gt[0]) / gt[1] for x in (xmin, xmax))
+            row_min, row_max = sorted((y - gt[3]) / gt[5] for y in (ymin, ymax))
+            tminx = int(math.floor(col_min / tsize))
+            tmaxx = int(math.floor(col_max / tsize))
+            if self.options.xyz:
+                tminy = int(math.floor(row_min / tsize))
+                tmaxy = int(math.floor(row_max / tsize))
+            else:
+                ysize = self.warped_input_dataset.RasterYSize
+                tminy = int(math.floor((ysize - row_max) / tsize))
+                tmaxy = int(math.floor((ysize - row_min) / tsize))
+        else:
+            tms = self.tmsMap[self.options.profile]
+            tminx, tminy = tms.GeorefCoordToTileCoord(xmin, ymin, tz, self.tile_size)
+            tmaxx, tmaxy = tms.GeorefCoordToTileCoord(xmax, ymax, tz, self.tile_size)
+
+        # Clip to the tiles of the raster
+        rtminx, rtminy, rtmaxx, rtmaxy = self.tminmax[tz]
+        tminx, tminy = max(tminx, rtminx), max(tminy, rtminy)
+        tmaxx, tmaxy = min(tmaxx, rtmaxx), min(tmaxy, rtmaxy)
+        if tminx > tmaxx or tminy > tmaxy:
+            return None
+        return tminx, tminy, tmaxx, tmaxy
+
+    def get_update_tile_extents(self) -> List[Tuple[int, int, int, int]]:
+        """Return the extents of the base tiles over the areas given with
+        --update, merged when they overlap or touch
+
+        Areas are enlarged by a few source pixels, as resampling makes the
+        changed pixels contribute to the neighbouring tiles.
+        """
+
+        extents: List[GeoExtent] = []
+        for value in self.options.update:
+            extent = parse_update_extent(value)
+            if extent is not None:
+                extents.append(extent)
+            else:
+                extents += read_changed_extents(
+                    value, getattr(self.options, "update_reference_index", None)
+                )
+
+        tile_extents = []
+        for (xmin, ymin, xmax, ymax), srs in extents:
+            if srs is None:
+                srs = self.in_srs
+            if srs and self.out_srs and not srs.IsSame(self.out_srs):
+                ct = osr.CoordinateTransformation(srs, self.out_srs)
+                xmin, ymin, xmax, ymax = ct.TransformBounds(xmin, ymin, xmax, ymax, 21)
+            margin = 3 * abs(self.out_gt[1])
+            tile_extent = self.get_tile_extent(
+                xmin - margin, ymin - margin, xmax + margin, ymax + margin
+            )
+            if tile_extent is not None:
+                tile_extents.append(tile_extent)
 
-        return conf, tile_details
+        tile_extents = merge_tile_extents(tile_extents)
+        if self.options.verbose:
+            logger.debug(
+                "Tile extents to update at zoom %d: %s" % (self.tmaxz, tile_extents)
+            )
+        return tile_extents
 
     def geo_query(self, ds, ulx, uly, lrx, lry, querysize=0):
         """
@@ -2969,41 +4890,7 @@ class GDAL2Tiles:
 
         raises Gdal2TilesError if the dataset does not contain anything inside this geo_query
         """
-        geotran = ds.GetGeoTransform()
-        rx = int((ulx - geotran[0]) / geotran[1] + 0.001)
-        ry = int((uly - geotran[3]) / geotran[5] + 0.001)
-        rxsize = max(1, int((lrx - ulx) / geotran[1] + 0.5))
-        rysize = max(1, int((lry - uly) / geotran[5] + 0.5))
-
-        if not querysize:
-            wxsize, wysize = rxsize, rysize
-        else:
-            wxsize, wysize = querysize, querysize
-
-        # Coordinates should not go out of the bounds of the raster
-        wx = 0
-        if rx < 0:
-            rxshift = abs(rx)
-            wx = int(wxsize * (float(rxshift) / rxsize))
-            wxsize = wxsize - wx
-            rxsize = rxsize - int(rxsize * (float(rxshift) / rxsize))
-            rx = 0
-        if rx + rxsize > ds.RasterXSize:
-            wxsize = int(wxsize * (float(ds.RasterXSize - rx) / rxsize))
-            rxsize = ds.RasterXSize - rx
-
-        wy = 0
-        if ry < 0:
-            ryshift = abs(ry)
-            wy = int(wysize * (float(ryshift) / rysize))
-            wysize = wysize - wy
-            rysize = rysize - int(rysize * (float(ryshift) / rysize))
-            ry = 0
-        if ry + rysize > ds.RasterYSize:
-            wysize = int(wysize * (float(ds.RasterYSize - ry) / rysize))
-            rysize = ds.RasterYSize - ry
-
-        return (rx, ry, rxsize, rysize), (wx, wy, wxsize, wysize)
+        return geo_query(ds, ulx, uly, lrx, lry, querysize=querysize)
 
     def generate_tilemapresource(self) -> str:
         """
@@ -4421,12 +6308,12 @@ function ExtDraggableObject(src, opt_drag) {
 
 def worker_tile_details(
     input_file: str, output_folder: str, options: Options, tmsMap: dict
-) -> Tuple[TileJobInfo, List[TileDetail]]:
+) -> Tuple[TileJobInfo, Iterator[TileRange]]:
     gdal2tiles = GDAL2Tiles(input_file, output_folder, options, tmsMap)
     gdal2tiles.open_input()
     gdal2tiles.generate_metadata()
-    tile_job_info, tile_details = gdal2tiles.generate_base_tiles()
-    return tile_job_info, tile_details
+    tile_job_info, tile_ranges = gdal2tiles.generate_base_tiles()
+    return tile_job_info, tile_ranges
 
 
 class ProgressBar:
@@ -4503,101 +6390,93 @@ def single_threaded_tiling(
     Keep a single threaded version that stays clear of multiprocessing, for platforms that would not
     support it
     """
-    if options.verbose:
-        logger.debug("Begin tiles details calc")
-    conf, tile_details = worker_tile_details(input_file, output_folder, options, tmsMap)
-
-    if options.verbose:
-        logger.debug("Tiles details calc complete.")
-
-    if not options.verbose and not options.quiet:
-        base_progress_bar = ProgressBar(len(tile_details))
-        base_progress_bar.start()
-
-    for tile_detail in tile_details:
-        create_base_tile(conf, tmsMap, tile_detail)
-
-        if not options.verbose and not options.quiet:
-            base_progress_bar.log_progress()
+    tiling(input_file, output_folder, options, None, tmsMap)
 
     if getattr(threadLocal, "cached_ds", None):
         del threadLocal.cached_ds
-
-    if not options.quiet:
-        count = count_overview_tiles(conf)
-        if count:
-            logger.info("Generating Overview Tiles:")
-
-            if not options.verbose:
-                overview_progress_bar = ProgressBar(count)
-                overview_progress_bar.start()
-
-    for base_tz in range(conf.tmaxz, conf.tminz, -1):
-        base_tile_groups = group_overview_base_tiles(base_tz, output_folder, conf)
-        for base_tiles in base_tile_groups:
-            create_overview_tile(
-                base_tz, base_tiles, output_folder, conf, options, tmsMap
-            )
-            if not options.verbose and not options.quiet:
-                overview_progress_bar.log_progress()
-
-    shutil.rmtree(os.path.dirname(conf.src_file))
+    if getattr(threadLocal, "cached_coverage", None):
+        del threadLocal.cached_coverage
 
 
 @enable_gdal_exceptions
 def multi_threaded_tiling(
     input_file: str, output_folder: str, options: Options, pool, tmsMap: dict
 ) -> None:
-    nb_processes = options.nb_processes or 1
+    tiling(input_file, output_folder, options, pool, tmsMap)
+
+
+def tiling(
+    input_file: str, output_folder: str, options: Options, pool, tmsMap: dict
+) -> None:
+    """Generate all the tiles, in the current process if pool is None"""
+
+    nb_processes = (options.nb_processes or 1) if pool is not None else 1
 
     if options.verbose:
         logger.debug("Begin tiles details calc")
 
-    conf, tile_details = worker_tile_details(input_file, output_folder, options, tmsMap)
+    conf, tile_ranges = worker_tile_details(input_file, output_folder, options, tmsMap)
 
     if options.verbose:
         logger.debug("Tiles details calc complete.")
 
+    tile_output = open_tile_output(conf, tmsMap)
+
+    def get_top_base_tz() -> int:
+        if options.in_memory_overviews:
+            return get_subtree_root_zoom(conf, nb_processes)
+        return conf.tmaxz
+
+    if getattr(options, "update", None):
+        # Regenerate the tiles over each area to update, one after the other
+        update_extents = conf.update_extents
+    else:
+        update_extents = [None]
+
+    progress_bar = None
     if not options.verbose and not options.quiet:
-        base_progress_bar = ProgressBar(len(tile_details))
-        base_progress_bar.start()
-
-    # TODO: gbataille - check the confs for which each element is an array... one useless level?
-    # TODO: gbataille - assign an ID to each job for print in verbose mode "ReadRaster Extent ..."
-    chunksize = max(1, min(128, len(tile_details) // nb_processes))
-    for _ in pool.imap_unordered(
-        partial(create_base_tile, conf, None), tile_details, chunksize=chunksize
-    ):
-        if not options.verbose and not options.quiet:
-            base_progress_bar.log_progress()
-
-    if not options.quiet:
-        count = count_overview_tiles(conf)
-        if count:
-            logger.info("Generating Overview Tiles:")
-
-            if not options.verbose:
-                overview_progress_bar = ProgressBar(count)
-                overview_progress_bar.start()
-
-    for base_tz in range(conf.tmaxz, conf.tminz, -1):
-        base_tile_groups = group_overview_base_tiles(base_tz, output_folder, conf)
-        chunksize = max(1, min(128, len(base_tile_groups) // nb_processes))
-        for _ in pool.imap_unordered(
-            partial(
-                create_overview_tile,
-                base_tz,
-                output_folder=output_folder,
-                tile_job_info=conf,
-                options=options,
-                tmsMap=None,
-            ),
-            base_tile_groups,
-            chunksize=chunksize,
-        ):
-            if not options.verbose and not options.quiet:
-                overview_progress_bar.log_progress()
+        nb_tiles = 0
+        for update_extent in update_extents:
+            conf.update_extent = update_extent
+            top_base_tz = get_top_base_tz()
+            nb_tiles += count_tiles(conf, top_base_tz)
+            nb_tiles += count_overview_tiles(conf, top_base_tz)
+        progress_bar = ProgressBar(nb_tiles)
+        progress_bar.start()
+
+    for update_extent in update_extents:
+        conf.update_extent = update_extent
+        top_base_tz = get_top_base_tz()
+        if options.in_memory_overviews:
+            base_jobs = iter_tile_ranges(conf, top_base_tz, 1)
+        elif conf.update_extent is not None:
+            base_jobs = iter_tile_ranges(
+                conf,
+                top_base_tz,
+                get_tile_range_width(conf, top_base_tz, nb_processes),
+            )
+        else:
+            base_jobs = tile_ranges
+
+        for tz in range(top_base_tz - 1, conf.tminz - 1, -1):
+            make_overview_column_dirs(conf, tz)
+
+        run_tile_jobs(
+            pool,
+            nb_processes,
+            conf,
+            tmsMap,
+            top_base_tz,
+            base_jobs,
+            tile_output,
+            progress_bar,
+        )
+        # Make the updated tiles visible to the workers, for the next area
+        tile_output.flush()
+    conf.update_extent = None
 
+    close_tile_outputs()
+    close_shared_src_datasets()
     shutil.rmtree(os.path.dirname(conf.src_file))
 
 
@@ -4636,8 +6515,6 @@ def main(argv: List[str] = sys.argv, called_from_main=False) -> int:
         with MPICommExecutor(MPI.COMM_WORLD, root=0) as pool:
             if pool is None:
                 return 0
-            # add interface of multiprocessing.Pool to MPICommExecutor
-            pool.imap_unordered = partial(pool.map, unordered=True)
             return submain(
                 argv, pool, MPI.COMM_WORLD.Get_size(), called_from_main=called_from_main
             )
@@ -4660,6 +6537,16 @@ def submain(argv: List[str], pool=None, pool_size=0, called_from_main=False) ->
 
     if pool is not None:  # MPI
         multi_threaded_tiling(input_file, output_folder, options, pool, tmsMap)
+    elif options.nb_threads:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Threads share the block cache, which is thus not divided
+        options.nb_processes = options.nb_threads
+        try:
+            with ThreadPoolExecutor(max_workers=options.nb_threads) as pool:
+                multi_threaded_tiling(input_file, output_folder, options, pool, tmsMap)
+        finally:
+            close_shared_src_datasets()
     elif nb_processes == 1:
         single_threaded_tiling(input_file, output_folder, options, tmsMap)
     else:
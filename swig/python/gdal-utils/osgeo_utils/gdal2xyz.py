@@ -12,6 +12,7 @@
 #
 # SPDX-License-Identifier: MIT
 ###############################################################################
+import itertools
 import sys
 import textwrap
 from numbers import Number
@@ -19,7 +20,7 @@ from typing import Optional, Sequence, Tuple, Union
 
 import numpy as np
 
-from osgeo import gdal
+from osgeo import gdal, ogr
 from osgeo_utils.auxiliary.base import PathLikeOrStr
 from osgeo_utils.auxiliary.gdal_argparse import GDALArgumentParser, GDALScript
 from osgeo_utils.auxiliary.numpy_util import GDALTypeCodeAndNumericTypeCodeFromDataSet
@@ -34,6 +35,73 @@ from osgeo_utils.auxiliary.util import (
     open_ds,
 )
 
+# Maximum number of source pixels read, per band, for each block of output lines
+MAX_BLOCK_PIXELS = 256 * 1024
+
+# Little endian WKB point
+WKB_POINT_DTYPE = np.dtype(
+    [("byte_order", "u1"), ("geometry_type", "<u4"), ("x", "<f8"), ("y", "<f8")]
+)
+
+
+def create_points_layer(
+    dstfile,
+    dst_format: Optional[str],
+    dst_layername: Optional[str],
+    layer_creation_options: Optional[Sequence[str]],
+    srs,
+):
+    """
+    creates the point layer receiving the output of gdal2xyz
+
+    dstfile - the output vector dataset, or its filename when dst_format is set
+    returns the dataset and the layer
+    """
+    if isinstance(dstfile, (gdal.Dataset, ogr.DataSource)):
+        dst_ds = dstfile
+    else:
+        if dstfile is None:
+            raise Exception("An output file is required with an output format.")
+        drv = gdal.GetDriverByName(dst_format)
+        if drv is None or drv.GetMetadataItem(gdal.DCAP_VECTOR) != "YES":
+            raise Exception(f"Vector driver {dst_format} not found.")
+        dst_ds = drv.Create(dstfile, 0, 0, 0, gdal.GDT_Unknown)
+    return dst_ds, dst_ds.CreateLayer(
+        dst_layername or "points",
+        srs=srs,
+        geom_type=ogr.wkbPoint,
+        options=layer_creation_options or [],
+    )
+
+
+def get_points_record_batch(pa, geo_x, geo_y, data, field_names):
+    """
+    returns a pyarrow.RecordBatch of points, with a WKB geometry column and
+    a column per band
+    """
+    count = len(geo_x)
+    wkb = np.empty(count, dtype=WKB_POINT_DTYPE)
+    wkb["byte_order"] = 1
+    wkb["geometry_type"] = ogr.wkbPoint
+    wkb["x"] = geo_x
+    wkb["y"] = geo_y
+    offsets = np.arange(
+        0, (count + 1) * WKB_POINT_DTYPE.itemsize, WKB_POINT_DTYPE.itemsize, np.int32
+    )
+    geometry = pa.Array.from_buffers(
+        pa.binary(),
+        count,
+        [None, pa.py_buffer(offsets), pa.py_buffer(wkb.view(np.uint8))],
+    )
+    fields = [
+        pa.field("geometry", pa.binary(), metadata={"ARROW:extension:name": "ogc.wkb"})
+    ]
+    arrays = [geometry]
+    for field_name, band_data in zip(field_names, data):
+        fields.append(pa.field(field_name, pa.from_numpy_dtype(band_data.dtype)))
+        arrays.append(pa.array(band_data))
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
 
 @enable_gdal_exceptions
 def gdal2xyz(
@@ -49,6 +117,9 @@ def gdal2xyz(
     return_np_arrays: bool = False,
     pre_allocate_np_arrays: bool = True,
     progress_callback: OptionalProgressCallback = ...,
+    dst_format: Optional[str] = None,
+    dst_layername: Optional[str] = None,
+    layer_creation_options: Optional[Sequence[str]] = None,
 ) -> Optional[Tuple]:
     """
     translates a raster file (or dataset) into xyz format
@@ -70,6 +141,11 @@ def gdal2xyz(
     pre_allocate_np_arrays - pre-allocated result arrays.
         Should be faster unless skip_nodata and the input is very sparse thus most data points will be skipped.
     progress_callback - progress callback function. use None for quiet or Ellipsis for using the default callback
+    dst_format - OGR format of dstfile, to write the output as a point layer
+        instead of text. dstfile can also be a vector dataset object.
+        The points are written with Layer.WriteArrow(), which requires pyarrow.
+    dst_layername - name of the point layer, "points" by default
+    layer_creation_options - creation options of the point layer
     """
 
     result = None
@@ -96,7 +172,25 @@ def gdal2xyz(
     dt, np_dt = GDALTypeCodeAndNumericTypeCodeFromDataSet(ds)
 
     # Open the output file.
-    if dstfile is not None:
+    dst_ds = dst_layer = None
+    if dst_format is not None or isinstance(dstfile, (gdal.Dataset, ogr.DataSource)):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise Exception(
+                "pyarrow Python module not available. Try 'pip install pyarrow'"
+            )
+        dst_ds, dst_layer = create_points_layer(
+            dstfile,
+            dst_format,
+            dst_layername,
+            layer_creation_options,
+            ds.GetSpatialRef(),
+        )
+        field_names = [f"band_{band.GetBand()}" for band in bands]
+        dst_layer.StartTransaction()
+        dst_fh = None
+    elif dstfile is not None:
         dst_fh = gdal.VSIFOpenL(dstfile, "wb")
     elif return_np_arrays:
         dst_fh = None
@@ -116,9 +210,9 @@ def gdal2xyz(
             and abs(ds.RasterXSize * gt[1]) < 180
             and abs(ds.RasterYSize * gt[5]) < 180
         ):
-            frmt = "%.10g" + delim + "%.10g" + delim + "%s"
+            frmt = "%.10g" + delim + "%.10g" + delim + band_format
         else:
-            frmt = "%.3f" + delim + "%.3f" + delim + "%s"
+            frmt = "%.3f" + delim + "%.3f" + delim + band_format
 
     if isinstance(src_nodata, Number):
         src_nodata = [src_nodata] * band_count
@@ -146,11 +240,10 @@ def gdal2xyz(
         x_skip = y_skip = skip
 
     x_off, y_off, x_size, y_size = srcwin
-    bands_count = len(bands)
 
-    nXBlocks = (x_size - x_off) // x_skip
-    nYBlocks = (y_size - y_off) // y_skip
-    progress_end = nXBlocks * nYBlocks
+    x_range = range(x_off, x_off + x_size, x_skip)
+    y_range = range(y_off, y_off + y_size, y_skip)
+    progress_end = len(x_range) * len(y_range)
     progress_curr = 0
     progress_prev = -1
     progress_parts = 100
@@ -160,62 +253,91 @@ def gdal2xyz(
         all_geo_x = np.empty(size)
         all_geo_y = np.empty(size)
         all_data = np.empty((size, band_count), dtype=np_dt)
+        block_results = []
 
-    # Loop emitting data.
+    # pixel/line coordinates of the centers of the output pixels
+    x_centers = np.arange(x_range.start, x_range.stop, x_range.step) + 0.5
+    y_centers = np.arange(y_range.start, y_range.stop, y_range.step) + 0.5
+
+    # Loop emitting data, by blocks of lines.
+    block_lines = max(1, MAX_BLOCK_PIXELS // max(1, x_size))
     idx = 0
-    for y in range(y_off, y_off + y_size, y_skip):
+    for block_start in range(0, len(y_range), block_lines):
+        block_y = y_range[block_start : block_start + block_lines]
+        block_y_centers = y_centers[block_start : block_start + block_lines]
 
-        size = bands_count if pre_allocate_np_arrays else 0
-        data = np.empty((size, x_size), dtype=np_dt)  # dims: (bands_count, x_size)
+        # dims: (bands_count, lines, columns)
+        data = np.empty((band_count, len(block_y), len(x_range)), dtype=np_dt)
         for i_bnd, band in enumerate(bands):
-            band_data = band.ReadAsArray(x_off, y, x_size, 1)  # read one band line
+            if y_skip == 1:
+                band_data = band.ReadAsArray(x_off, block_y[0], x_size, len(block_y))
+                data[i_bnd] = band_data[:, ::x_skip]
+            else:
+                for i_line, y in enumerate(block_y):
+                    band_data = band.ReadAsArray(x_off, y, x_size, 1)  # one band line
+                    data[i_bnd, i_line] = band_data[0, ::x_skip]
+        data = data.reshape(band_count, -1)  # dims: (bands_count, pixels)
+
+        geo_x = (
+            gt[0]
+            + x_centers[np.newaxis, :] * gt[1]
+            + block_y_centers[:, np.newaxis] * gt[2]
+        ).ravel()
+        geo_y = (
+            gt[3]
+            + x_centers[np.newaxis, :] * gt[4]
+            + block_y_centers[:, np.newaxis] * gt[5]
+        ).ravel()
+
+        if process_nodata:
+            # pixels whose value is the nodata value in all the bands
+            is_nodata = np.all(data == src_nodata[:, np.newaxis], axis=0)
+            if skip_nodata:
+                geo_x = geo_x[~is_nodata]
+                geo_y = geo_y[~is_nodata]
+                data = data[:, ~is_nodata]
+            elif replace_nodata:
+                data[:, is_nodata] = dst_nodata[:, np.newaxis]
+
+        count = len(geo_x)
+        if dst_fh and count:
+            # format the whole block at once, with the line format repeated for
+            # each line
+            values = itertools.chain.from_iterable(
+                zip(geo_x.tolist(), geo_y.tolist(), *data.tolist())
+            )
+            lines = ((frmt * count) % tuple(values)).encode("UTF-8")
+            if gdal.VSIFWriteL(lines, len(lines), 1, dst_fh) != 1:
+                gdal.VSIFCloseL(dst_fh)
+                raise IOError("Cannot write into destination file")
+        if dst_layer is not None and count:
+            batch = get_points_record_batch(pa, geo_x, geo_y, data, field_names)
+            if dst_layer.WriteArrow(batch) != ogr.OGRERR_NONE:
+                raise IOError("Cannot write into destination layer")
+        if return_np_arrays:
             if pre_allocate_np_arrays:
-                data[i_bnd] = band_data[0]
+                all_geo_x[idx : idx + count] = geo_x
+                all_geo_y[idx : idx + count] = geo_y
+                all_data[idx : idx + count] = data.transpose()
             else:
-                data = np.append(data, band_data, axis=0)
-
-        for x_i in range(0, x_size, x_skip):
-
-            progress_curr += 1
-            if progress_callback:
-                progress_frac = progress_curr / progress_end
-                progress = int(progress_frac * progress_parts)
-                if progress > progress_prev:
-                    progress_prev = progress
-                    progress_callback(progress_frac)
-
-            x_i_data = data[:, x_i]  # single pixel, dims: (bands)
-            if process_nodata and np.array_equal(src_nodata, x_i_data):
-                if skip_nodata:
-                    continue
-                elif replace_nodata:
-                    x_i_data = dst_nodata
-
-            x = x_i + x_off
-
-            geo_x = gt[0] + (x + 0.5) * gt[1] + (y + 0.5) * gt[2]
-            geo_y = gt[3] + (x + 0.5) * gt[4] + (y + 0.5) * gt[5]
-
-            if dst_fh:
-                band_str = band_format % tuple(x_i_data)
-                line = (frmt % (float(geo_x), float(geo_y), band_str)).encode("UTF-8")
-                if gdal.VSIFWriteL(line, len(line), 1, dst_fh) != 1:
-                    gdal.VSIFCloseL(dst_fh)
-                    raise IOError("Cannot write into destination file")
-            if return_np_arrays:
-                if pre_allocate_np_arrays:
-                    all_geo_x[idx] = geo_x
-                    all_geo_y[idx] = geo_y
-                    all_data[idx] = x_i_data
-                else:
-                    all_geo_x = np.append(all_geo_x, geo_x)
-                    all_geo_y = np.append(all_geo_y, geo_y)
-                    all_data = np.append(all_data, [x_i_data], axis=0)
-            idx += 1
+                block_results.append((geo_x, geo_y, data.transpose()))
+        idx += count
+
+        progress_curr += len(block_y) * len(x_range)
+        if progress_callback:
+            progress_frac = progress_curr / progress_end
+            progress = int(progress_frac * progress_parts)
+            if progress > progress_prev:
+                progress_prev = progress
+                progress_callback(progress_frac)
 
     if return_np_arrays:
         nodata = None if skip_nodata else dst_nodata if replace_nodata else src_nodata
-        if idx != progress_curr:
+        if not pre_allocate_np_arrays and block_results:
+            all_geo_x, all_geo_y, all_data = (
+                np.concatenate(arrays) for arrays in zip(*block_results)
+            )
+        if idx != len(all_geo_x):
             all_geo_x = all_geo_x[:idx]
             all_geo_y = all_geo_y[:idx]
             all_data = all_data[:idx, :]
@@ -223,6 +345,10 @@ def gdal2xyz(
 
     if dst_fh:
         gdal.VSIFCloseL(dst_fh)
+    if dst_layer is not None:
+        dst_layer.CommitTransaction()
+        if dst_ds is not dstfile:
+            dst_ds.Close()
 
     return result
 
@@ -324,6 +450,32 @@ class GDAL2XYZ(GDALScript):
             "(per band or per dataset).",
         )
 
+        parser.add_argument(
+            "-of",
+            "-f",
+            dest="dst_format",
+            metavar="ogr_format",
+            help="Write the output as a point layer of the given vector format, "
+            "instead of text. Use the short format name. Requires pyarrow.",
+        )
+
+        parser.add_argument(
+            "-nln",
+            dest="dst_layername",
+            metavar="name",
+            help="Name of the point layer, with -of.",
+        )
+
+        parser.add_argument(
+            "-lco",
+            dest="layer_creation_options",
+            type=str,
+            action="append",
+            metavar="name=value",
+            help="Specify a layer creation option, with -of. "
+            "This may be specified multiple times.",
+        )
+
         parser.add_argument(
             "srcfile",
             metavar="src_dataset",
@@ -16,12 +16,17 @@
 # ******************************************************************************
 
 import argparse
+import collections
+import concurrent.futures
+import contextlib
 import glob
+import math
 import os
 import os.path
 import string
 import sys
 import textwrap
+import threading
 from numbers import Number
 from typing import Dict, Optional, Sequence, Tuple, Union
 
@@ -68,6 +73,51 @@ DefaultNDVLookup = {
 # tuple of available output datatypes names
 GDALDataTypeNames = tuple(gdal.GetDataTypeName(dt) for dt in DefaultNDVLookup.keys())
 
+
+# maximum size of the input data of a block processed at once, in bytes
+ChunkMaxBytes = 64 * 1024 * 1024
+
+
+def plan_chunk_size(
+    raster_size: Sequence[int], block_sizes: Sequence[Sequence[int]], max_pixels: int
+) -> Tuple[int, int]:
+    """Return the size of the blocks of data to process at once
+
+    Blocks are aligned on the first block size (of the first input), and on
+    the other ones (other inputs, output) when that does not make them larger
+    than max_pixels. Then they are extended to whole rows, and to several rows,
+    as long as they are not larger than max_pixels, so that striped files are
+    read by multi-row strips, and tiled files row of tiles after row of tiles.
+    """
+    xsize, ysize = raster_size
+    chunk_x = min(block_sizes[0][0], xsize)
+    chunk_y = min(block_sizes[0][1], ysize)
+    for block_x, block_y in block_sizes[1:]:
+        aligned_x = min(chunk_x * block_x // math.gcd(chunk_x, block_x), xsize)
+        aligned_y = min(chunk_y * block_y // math.gcd(chunk_y, block_y), ysize)
+        if aligned_x * aligned_y <= max_pixels:
+            chunk_x, chunk_y = aligned_x, aligned_y
+
+    if xsize * chunk_y <= max_pixels:
+        chunk_x = xsize
+    else:
+        chunk_x = min(max(chunk_x, max_pixels // chunk_y // chunk_x * chunk_x), xsize)
+    chunk_y = min(max(chunk_y, max_pixels // chunk_x // chunk_y * chunk_y), ysize)
+    return chunk_x, chunk_y
+
+
+def _get_thread_safe_dataset(ds: gdal.Dataset) -> Optional[gdal.Dataset]:
+    """Return a thread-safe version of ds, or None if it cannot be obtained
+    (GDAL < 3.10, or dataset that cannot be reopened, like MEM ones)"""
+    if not hasattr(ds, "GetThreadSafeDataset"):
+        return None
+    try:
+        with gdal.quiet_errors():
+            return ds.GetThreadSafeDataset(gdal.OF_RASTER)
+    except RuntimeError:
+        return None
+
+
 """ Perform raster calculations with numpy syntax.
 Use any basic arithmetic supported by numpy arrays such as +-* along with logical
 operators such as >. Note that all files must have the same dimensions, but no projection checking is performed.
@@ -113,6 +163,8 @@ def Calc(
     debug: bool = False,
     quiet: bool = False,
     progress_callback: Optional = gdal.TermProgress_nocb,
+    threads: Optional[int] = None,
+    engine: str = "numpy",
     **input_files,
 ):
 
@@ -147,9 +199,29 @@ def Calc(
 
     if not calc:
         raise Exception("No calculation provided.")
+
     elif not outfile and format.upper() != "MEM":
         raise Exception("No output file provided.")
 
+    # compile the expressions once
+    if engine == "numexpr":
+        try:
+            import numexpr
+        except ImportError:
+            raise Exception(
+                "numexpr Python module not available. Try 'pip install numexpr'"
+            )
+    elif engine == "numpy":
+        compiled_calc = []
+        for this_calc in calc:
+            try:
+                compiled_calc.append(compile(this_calc, "<calc>", "eval"))
+            except SyntaxError:
+                print(f"evaluation of calculation {this_calc} failed")
+                raise
+    else:
+        raise Exception(f"Unknown evaluation engine: {engine}")
+
     if format is None:
         format = GetOutputDriverFor(outfile)
 
@@ -466,12 +538,24 @@ def Calc(
     # find block size to chop grids into bite-sized chunks
     ################################################################
 
-    # use the block size of the first layer to read efficiently
-    myBlockSize = myFiles[0].GetRasterBand(myBands[0]).GetBlockSize()
+    # follow the block layout of the first layer to read efficiently, and
+    # align on the blocks of the other layers and of the output if possible
+    myBlockSizes = [myFiles[0].GetRasterBand(myBands[0]).GetBlockSize()]
+    for i in range(1, len(myFiles)):
+        myBlockSizes.append(myFiles[i].GetRasterBand(myBands[i]).GetBlockSize())
+    myBlockSizes.append(myOut.GetRasterBand(1).GetBlockSize())
+    myPixelBytes = sum(gdal.GetDataTypeSize(dt) // 8 for dt in myDataTypeNum)
+    myMaxChunkPixels = max(1, ChunkMaxBytes // max(1, myPixelBytes))
+    if threads and threads > 1:
+        # let all threads get work
+        myMaxChunkPixels = min(
+            myMaxChunkPixels,
+            max(1, DimensionsCheck[0] * DimensionsCheck[1] // (4 * threads)),
+        )
+    myBlockSize = plan_chunk_size(DimensionsCheck, myBlockSizes, myMaxChunkPixels)
     # find total x and y blocks to be read
     nXBlocks = (int)((DimensionsCheck[0] + myBlockSize[0] - 1) / myBlockSize[0])
     nYBlocks = (int)((DimensionsCheck[1] + myBlockSize[1] - 1) / myBlockSize[1])
-    myBufSize = myBlockSize[0] * myBlockSize[1]
 
     if debug:
         print(f"using blocksize {myBlockSize[0]} x {myBlockSize[1]}")
@@ -481,19 +565,11 @@ def Calc(
     ProgressEnd = nXBlocks * nYBlocks * allBandsCount
 
     ################################################################
-    # start looping through each band in allBandsCount
+    # find the arrays to build for each band in allBandsCount
     ################################################################
 
+    alpha_arrays_per_band = {}
     for bandNo in range(1, allBandsCount + 1):
-
-        ################################################################
-        # start looping through blocks of data
-        ################################################################
-
-        # store these numbers in variables that may change later
-        nXValid = myBlockSize[0]
-        nYValid = myBlockSize[1]
-
         count_file_per_alpha = {}
         largest_datatype_per_alpha = {}
         for i, Alpha in enumerate(myAlphaList):
@@ -513,139 +589,209 @@ def Calc(
                         largest_datatype_per_alpha[Alpha] = gdal.DataTypeUnion(
                             largest_datatype_per_alpha[Alpha], band.DataType
                         )
+        alpha_arrays_per_band[bandNo] = (
+            count_file_per_alpha,
+            largest_datatype_per_alpha,
+        )
 
-        # loop through X-lines
-        for X in range(0, nXBlocks):
+    ################################################################
+    # set up the datasets read by the threads
+    ################################################################
 
-            # in case the blocks don't fit perfectly
-            # change the block size of the final piece
-            if X == nXBlocks - 1:
-                nXValid = DimensionsCheck[0] - X * myBlockSize[0]
+    # datasets to read each input from, and locks serializing the reads of
+    # the datasets that cannot be shared by several threads
+    myReadFiles = myFiles
+    myReadLocks = [None] * len(myFiles)
+    if threads and threads > 1:
+        myReadFiles = []
+        locks = {}
+        for i, myFile in enumerate(myFiles):
+            myThreadSafeFile = _get_thread_safe_dataset(myFile)
+            if myThreadSafeFile is not None:
+                myReadFiles.append(myThreadSafeFile)
+            else:
+                myReadFiles.append(myFile)
+                myReadLocks[i] = locks.setdefault(id(myFile), threading.Lock())
+        if debug:
+            print(
+                f"using {threads} threads, "
+                f"{myReadLocks.count(None)} thread-safe input(s) of {len(myFiles)}"
+            )
 
-            # find X offset
-            myX = X * myBlockSize[0]
+    ################################################################
+    # calculation of a block of data
+    ################################################################
 
-            # reset buffer size for start of Y loop
-            nYValid = myBlockSize[1]
-            myBufSize = nXValid * nYValid
+    def calc_block(bandNo, myX, myY, nXValid, nYValid):
+        count_file_per_alpha, largest_datatype_per_alpha = alpha_arrays_per_band[bandNo]
+
+        # create empty buffer to mark where nodata occurs
+        myNDVs = None
+
+        # make local namespace for calculation
+        local_namespace = {}
+
+        # Create destination numpy arrays for each alpha
+        numpy_arrays = {}
+        counter_per_alpha = {}
+        for Alpha in count_file_per_alpha:
+            dtype = gdal_array.GDALTypeCodeToNumericTypeCode(
+                largest_datatype_per_alpha[Alpha]
+            )
+            if count_file_per_alpha[Alpha] == 1:
+                numpy_arrays[Alpha] = numpy.empty((nYValid, nXValid), dtype=dtype)
+            else:
+                numpy_arrays[Alpha] = numpy.empty(
+                    (count_file_per_alpha[Alpha], nYValid, nXValid), dtype=dtype
+                )
+            counter_per_alpha[Alpha] = 0
+
+        # fetch data for each input layer
+        for i, Alpha in enumerate(myAlphaList):
 
-            # loop through Y lines
-            for Y in range(0, nYBlocks):
-                ProgressCt += 1
-                if not quiet:
-                    progress_callback(float(ProgressCt) / ProgressEnd, "", None)
+            # populate lettered arrays with values
+            if allBandsIndex is not None and allBandsIndex == i:
+                myBandNo = bandNo
+            else:
+                myBandNo = myBands[i]
 
-                # change the block size of the final piece
-                if Y == nYBlocks - 1:
-                    nYValid = DimensionsCheck[1] - Y * myBlockSize[1]
-                    myBufSize = nXValid * nYValid
+            buf_obj = None
+            if Alpha in myAlphaFileLists:
+                if count_file_per_alpha[Alpha] == 1:
+                    buf_obj = numpy_arrays[Alpha]
+                else:
+                    buf_obj = numpy_arrays[Alpha][counter_per_alpha[Alpha]]
+                counter_per_alpha[Alpha] += 1
+            with myReadLocks[i] or contextlib.nullcontext():
+                myval = gdal_array.BandReadAsArray(
+                    myReadFiles[i].GetRasterBand(myBandNo),
+                    xoff=myX,
+                    yoff=myY,
+                    win_xsize=nXValid,
+                    win_ysize=nYValid,
+                    buf_obj=buf_obj,
+                )
+            if myval is None:
+                raise Exception(
+                    f"Input block reading failed from filename {myFileNames[i]}"
+                )
 
-                # find Y offset
-                myY = Y * myBlockSize[1]
+            # fill in nodata values
+            if myNDV[i] is not None:
+                # myNDVs is a boolean buffer.
+                # a cell is True if there is NDV in any of the corresponding cells in input raster bands.
+                if myNDVs is None:
+                    myNDVs = myval == myNDV[i]
+                else:
+                    myNDVs |= myval == myNDV[i]
 
-                # create empty buffer to mark where nodata occurs
-                myNDVs = None
+            # add an array of values for this block to the eval namespace
+            if Alpha not in myAlphaFileLists:
+                local_namespace[Alpha] = myval
+            myval = None
 
-                # make local namespace for calculation
-                local_namespace = {}
+        for lst in myAlphaFileLists:
+            local_namespace[lst] = numpy_arrays[lst]
 
-                # Create destination numpy arrays for each alpha
-                numpy_arrays = {}
-                counter_per_alpha = {}
-                for Alpha in count_file_per_alpha:
-                    dtype = gdal_array.GDALTypeCodeToNumericTypeCode(
-                        largest_datatype_per_alpha[Alpha]
+        # try the calculation on the array blocks
+        calc_index = bandNo - 1 if len(calc) > 1 else 0
+        propagate_nodata = myNDVs is not None and myOutNDV is not None
+        try:
+            if engine == "numexpr":
+                # numexpr caches the compiled expressions, and evaluates the
+                # propagation of nodata values in the same pass
+                if propagate_nodata:
+                    local_namespace["_calc_nodata_mask"] = myNDVs
+                    local_namespace["_calc_nodata_value"] = myOutNDV
+                    myResult = numexpr.evaluate(
+                        f"where(_calc_nodata_mask, _calc_nodata_value, {calc[calc_index]})",
+                        local_dict=local_namespace,
+                        global_dict=global_namespace,
                     )
-                    if count_file_per_alpha[Alpha] == 1:
-                        numpy_arrays[Alpha] = numpy.empty(
-                            (nYValid, nXValid), dtype=dtype
-                        )
-                    else:
-                        numpy_arrays[Alpha] = numpy.empty(
-                            (count_file_per_alpha[Alpha], nYValid, nXValid), dtype=dtype
-                        )
-                    counter_per_alpha[Alpha] = 0
+                    propagate_nodata = False
+                else:
+                    myResult = numexpr.evaluate(
+                        calc[calc_index],
+                        local_dict=local_namespace,
+                        global_dict=global_namespace,
+                    )
+            else:
+                myResult = eval(
+                    compiled_calc[calc_index], global_namespace, local_namespace
+                )
+        except Exception:
+            print(f"evaluation of calculation {calc[calc_index]} failed")
+            raise
 
-                # fetch data for each input layer
-                for i, Alpha in enumerate(myAlphaList):
+        # Propagate nodata values (the nodata value in the nodata cells)
+        if propagate_nodata:
+            myResult = numpy.where(myNDVs, numpy.asarray(myOutNDV), myResult)
+        elif not isinstance(myResult, numpy.ndarray):
+            myResult = numpy.ones((nYValid, nXValid)) * myResult
 
-                    # populate lettered arrays with values
-                    if allBandsIndex is not None and allBandsIndex == i:
-                        myBandNo = bandNo
-                    else:
-                        myBandNo = myBands[i]
+        # Convert float16 to float32 if necessary
+        # (While numpy probably supports float16, GDAL may not)
+        if myResult.dtype == "float16":
+            myResult = numpy.float32(myResult)
 
-                    if Alpha in myAlphaFileLists:
-                        if count_file_per_alpha[Alpha] == 1:
-                            buf_obj = numpy_arrays[Alpha]
-                        else:
-                            buf_obj = numpy_arrays[Alpha][counter_per_alpha[Alpha]]
-                        myval = gdal_array.BandReadAsArray(
-                            myFiles[i].GetRasterBand(myBandNo),
-                            xoff=myX,
-                            yoff=myY,
-                            win_xsize=nXValid,
-                            win_ysize=nYValid,
-                            buf_obj=buf_obj,
-                        )
-                        counter_per_alpha[Alpha] += 1
-                    else:
-                        myval = gdal_array.BandReadAsArray(
-                            myFiles[i].GetRasterBand(myBandNo),
-                            xoff=myX,
-                            yoff=myY,
-                            win_xsize=nXValid,
-                            win_ysize=nYValid,
-                        )
-                    if myval is None:
-                        raise Exception(
-                            f"Input block reading failed from filename {filename[i]}"
-                        )
+        return myResult
 
-                    # fill in nodata values
-                    if myNDV[i] is not None:
-                        # myNDVs is a boolean buffer.
-                        # a cell equals to 1 if there is NDV in any of the corresponding cells in input raster bands.
-                        if myNDVs is None:
-                            # this is the first band that has NDV set. we initializes myNDVs to a zero buffer
-                            # as we didn't see any NDV value yet.
-                            myNDVs = numpy.zeros(myBufSize)
-                            myNDVs.shape = (nYValid, nXValid)
-                        myNDVs = 1 * numpy.logical_or(myNDVs == 1, myval == myNDV[i])
-
-                    # add an array of values for this block to the eval namespace
-                    if Alpha not in myAlphaFileLists:
-                        local_namespace[Alpha] = myval
-                    myval = None
-
-                for lst in myAlphaFileLists:
-                    local_namespace[lst] = numpy_arrays[lst]
-
-                # try the calculation on the array blocks
-                this_calc = calc[bandNo - 1 if len(calc) > 1 else 0]
-                try:
-                    myResult = eval(this_calc, global_namespace, local_namespace)
-                except Exception:
-                    print(f"evaluation of calculation {this_calc} failed")
-                    raise
-
-                # Propagate nodata values (set nodata cells to zero
-                # then add nodata value to these cells).
-                if myNDVs is not None and myOutNDV is not None:
-                    myResult = ((1 * (myNDVs == 0)) * myResult) + (myOutNDV * myNDVs)
-                elif not isinstance(myResult, numpy.ndarray):
-                    myResult = numpy.ones((nYValid, nXValid)) * myResult
-
-                # Convert float16 to float32 if necessary
-                # (While numpy probably supports float16, GDAL may not)
-                if myResult.dtype == "float16":
-                    myResult = numpy.float32(myResult)
-
-                # write data block to the output file
-                myOutB = myOut.GetRasterBand(bandNo)
-                if gdal_array.BandWriteArray(myOutB, myResult, xoff=myX, yoff=myY) != 0:
-                    raise Exception("Block writing failed")
-                myOutB = None  # write to band
+    ################################################################
+    # start looping through each band in allBandsCount
+    ################################################################
+
+    def iter_blocks():
+        # loop through Y lines, in the natural order of the files
+        for Y in range(0, nYBlocks):
+
+            # find Y offset and, in case the blocks don't fit perfectly,
+            # the size of the final piece
+            myY = Y * myBlockSize[1]
+            nYValid = min(myBlockSize[1], DimensionsCheck[1] - myY)
+
+            # loop through X-lines
+            for X in range(0, nXBlocks):
+
+                # find X offset and size
+                myX = X * myBlockSize[0]
+                nXValid = min(myBlockSize[0], DimensionsCheck[0] - myX)
+
+                # all bands of a block one after the other, while the blocks
+                # of pixel interleaved files are in the block cache
+                for bandNo in range(1, allBandsCount + 1):
+                    yield bandNo, myX, myY, nXValid, nYValid
+
+    def write_block(block, myResult):
+        nonlocal ProgressCt
+        ProgressCt += 1
+        if not quiet:
+            progress_callback(float(ProgressCt) / ProgressEnd, "", None)
+
+        # write data block to the output file
+        bandNo, myX, myY, _, _ = block
+        myOutB = myOut.GetRasterBand(bandNo)
+        if gdal_array.BandWriteArray(myOutB, myResult, xoff=myX, yoff=myY) != 0:
+            raise Exception("Block writing failed")
+        myOutB = None  # write to band
+
+    if threads and threads > 1:
+        # Blocks are computed by the threads, and written by the current one
+        # in the order they are read, with a bounded number of blocks in flight
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            pending = collections.deque()
+            for block in iter_blocks():
+                pending.append((block, executor.submit(calc_block, *block)))
+                if len(pending) >= 2 * threads:
+                    block, future = pending.popleft()
+                    write_block(block, future.result())
+            while pending:
+                block, future = pending.popleft()
+                write_block(block, future.result())
+    else:
+        for block in iter_blocks():
+            write_block(block, calc_block(*block))
+
+    myReadFiles = None
 
     # remove temp files
     for idx, tempFile in enumerate(myTempFileNames):
@@ -852,6 +998,25 @@ class GDALCalc(GDALScript):
             "--color-table", type=str, dest="color_table", help="color table file name"
         )
 
+        parser.add_argument(
+            "--engine",
+            dest="engine",
+            type=str,
+            default="numpy",
+            choices=("numpy", "numexpr"),
+            help="evaluation engine of the calculation: Python with numpy (default), "
+            "or numexpr, which only supports its own subset of functions",
+        )
+
+        parser.add_argument(
+            "--threads",
+            dest="threads",
+            type=int,
+            metavar="n",
+            help="number of threads evaluating the calculation on blocks of data "
+            "in parallel (default 1)",
+        )
+
         group = parser.add_mutually_exclusive_group()
         group.add_argument(
             "--extent",
@@ -19,16 +19,15 @@ from numbers import Real
 from typing import Optional
 
 from osgeo import gdal
+from osgeo_utils.auxiliary.block_util import block_windows
 from osgeo_utils.auxiliary.gdal_argparse import GDALArgumentParser, GDALScript
 from osgeo_utils.auxiliary.util import enable_gdal_exceptions
 
 
 def CopyBand(srcband, dstband):
-    for line in range(srcband.YSize):
-        line_data = srcband.ReadRaster(0, line, srcband.XSize, 1)
-        dstband.WriteRaster(
-            0, line, srcband.XSize, 1, line_data, buf_type=srcband.DataType
-        )
+    for window in block_windows(srcband):
+        data = srcband.ReadRaster(*window)
+        dstband.WriteRaster(*window, data, buf_type=srcband.DataType)
 
 
 @enable_gdal_exceptions
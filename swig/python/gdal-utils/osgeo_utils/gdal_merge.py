@@ -29,8 +29,12 @@
 # building the stack.
 # anssi.pekkarinen@fao.org
 
+import collections
+import concurrent.futures
 import math
+import os
 import sys
+import threading
 import time
 
 from osgeo import gdal
@@ -273,29 +277,22 @@ class file_info:
         print("Pixel Size: %f x %f" % (self.geotransform[1], self.geotransform[5]))
         print("UL:(%f,%f)   LR:(%f,%f)" % (self.ulx, self.uly, self.lrx, self.lry))
 
-    def copy_into(self, t_fh, s_band=1, t_band=1, nodata_arg=None, verbose=0):
+    def get_target_window(self, t_geotransform, t_xsize, t_ysize):
         """
-        Copy this files image into target file.
+        Compute the overlap of this file with a target grid.
 
-        This method will compute the overlap area of the file_info objects
-        file, and the target gdal.Dataset object, and copy the image data
-        for the common window area.  It is assumed that the files are in
-        a compatible projection ... no checking or warping is done.  However,
-        if the destination file is a different resolution, or different
-        image pixel type, the appropriate resampling and conversions will
-        be done (using normal GDAL promotion/demotion rules).
+        t_geotransform -- geotransform of the target grid.
 
-        t_fh -- gdal.Dataset object for the file into which some or all
-        of this file may be copied.
+        t_xsize, t_ysize -- size of the target grid in pixels.
 
-        Returns 1 on success (or if nothing needs to be copied), and zero one
-        failure.
+        Returns a (tw_xoff, tw_yoff, tw_xsize, tw_ysize, sw_xoff, sw_yoff,
+        sw_xsize, sw_ysize) tuple with the target and source windows in pixel
+        coordinates, or None if the file does not intersect the target grid.
         """
-        t_geotransform = t_fh.GetGeoTransform()
         t_ulx = t_geotransform[0]
         t_uly = t_geotransform[3]
-        t_lrx = t_geotransform[0] + t_fh.RasterXSize * t_geotransform[1]
-        t_lry = t_geotransform[3] + t_fh.RasterYSize * t_geotransform[5]
+        t_lrx = t_geotransform[0] + t_xsize * t_geotransform[1]
+        t_lry = t_geotransform[3] + t_ysize * t_geotransform[5]
 
         # figure out intersection region
         tgw_ulx = max(t_ulx, self.ulx)
@@ -309,11 +306,11 @@ class file_info:
 
         # do they even intersect?
         if tgw_ulx >= tgw_lrx:
-            return 1
+            return None
         if t_geotransform[5] < 0 and tgw_uly <= tgw_lry:
-            return 1
+            return None
         if t_geotransform[5] > 0 and tgw_uly >= tgw_lry:
-            return 1
+            return None
 
         # compute target window in pixel coordinates.
         tw_xoff = int((tgw_ulx - t_geotransform[0]) / t_geotransform[1] + 0.1)
@@ -326,7 +323,7 @@ class file_info:
         )
 
         if tw_xsize < 1 or tw_ysize < 1:
-            return 1
+            return None
 
         # Compute source window in pixel coordinates.
         sw_xoff = int((tgw_ulx - self.geotransform[0]) / self.geotransform[1] + 0.1)
@@ -339,7 +336,52 @@ class file_info:
         )
 
         if sw_xsize < 1 or sw_ysize < 1:
+            return None
+
+        return (
+            tw_xoff,
+            tw_yoff,
+            tw_xsize,
+            tw_ysize,
+            sw_xoff,
+            sw_yoff,
+            sw_xsize,
+            sw_ysize,
+        )
+
+    def copy_into(self, t_fh, s_band=1, t_band=1, nodata_arg=None, verbose=0):
+        """
+        Copy this files image into target file.
+
+        This method will compute the overlap area of the file_info objects
+        file, and the target gdal.Dataset object, and copy the image data
+        for the common window area.  It is assumed that the files are in
+        a compatible projection ... no checking or warping is done.  However,
+        if the destination file is a different resolution, or different
+        image pixel type, the appropriate resampling and conversions will
+        be done (using normal GDAL promotion/demotion rules).
+
+        t_fh -- gdal.Dataset object for the file into which some or all
+        of this file may be copied.
+
+        Returns 1 on success (or if nothing needs to be copied), and zero one
+        failure.
+        """
+        window = self.get_target_window(
+            t_fh.GetGeoTransform(), t_fh.RasterXSize, t_fh.RasterYSize
+        )
+        if window is None:
             return 1
+        (
+            tw_xoff,
+            tw_yoff,
+            tw_xsize,
+            tw_ysize,
+            sw_xoff,
+            sw_yoff,
+            sw_xsize,
+            sw_ysize,
+        ) = window
 
         # Open the source file, and copy the selected region.
         s_fh = gdal.Open(self.filename)
@@ -362,6 +404,635 @@ class file_info:
         )
 
 
+# =============================================================================
+
+# Maximum size in bytes of an output chunk composited in memory.
+ChunkMaxBytes = 64 * 1024 * 1024
+
+
+def get_chunk_size(raster_size, block_size, max_pixels):
+    """
+    Compute the size of the output chunks composited in memory.
+
+    Chunks are made of whole output blocks: several rows of blocks when a
+    row of blocks holds in max_pixels, or a run of blocks of the same row
+    otherwise.
+
+    Returns a (chunk_xsize, chunk_ysize) tuple.
+    """
+    xsize, ysize = raster_size
+    block_xsize = max(1, min(block_size[0], xsize))
+    block_ysize = max(1, min(block_size[1], ysize))
+    if xsize * block_ysize <= max_pixels:
+        block_rows = max(1, max_pixels // (xsize * block_ysize))
+        return xsize, min(ysize, block_rows * block_ysize)
+    block_cols = max(1, max_pixels // (block_xsize * block_ysize))
+    return min(xsize, block_cols * block_xsize), block_ysize
+
+
+def get_band_maps(file_infos, bands, separate=0):
+    """
+    Compute the bands copied from each file.
+
+    Returns a list with, for each file, a list of (source band, target band)
+    pairs.
+    """
+    band_maps = []
+    t_band = 1
+    for fi in file_infos:
+        if separate == 0:
+            band_maps.append(
+                [(band, band) for band in range(1, min(bands, fi.bands) + 1)]
+            )
+        else:
+            band_maps.append(
+                [(band, t_band + band - 1) for band in range(1, fi.bands + 1)]
+            )
+            t_band = t_band + fi.bands
+    return band_maps
+
+
+def get_mask_band(s_band):
+    """
+    Return the band whose zero values are not copied from s_band, following
+    the rules of raster_copy(), or None if all its pixels are copied.
+    """
+    if s_band.GetMaskFlags() != gdal.GMF_ALL_VALID:
+        return s_band.GetMaskBand()
+    if s_band.GetColorInterpretation() == gdal.GCI_AlphaBand:
+        return s_band
+    return None
+
+
+# *****************************************************************************
+
+
+class SourceDatasetCache:
+    """
+    A cache of source datasets opened in read-only mode.
+
+    At most max_size datasets are kept open, the least recently used one
+    being closed when another one needs to be opened.
+    """
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.datasets = collections.OrderedDict()
+
+    def get(self, filename):
+        s_fh = self.datasets.get(filename)
+        if s_fh is not None:
+            self.datasets.move_to_end(filename)
+            return s_fh
+        if len(self.datasets) >= self.max_size:
+            self.datasets.popitem(last=False)
+        s_fh = gdal.Open(filename)
+        self.datasets[filename] = s_fh
+        return s_fh
+
+    def close(self):
+        self.datasets.clear()
+
+
+# *****************************************************************************
+
+
+class ChunkCompositor:
+    """
+    Composite source files into a target file, one output chunk at a time.
+
+    The target is split in chunks made of whole output blocks. An index maps
+    each chunk to the files whose window intersects it, so that all the
+    sources of a chunk are composited in memory in input order, and the
+    chunk is written once. Only the part of each source overlapping the
+    chunk is read, which bounds the memory used by the size of a chunk.
+    """
+
+    def __init__(
+        self,
+        t_fh,
+        file_infos,
+        bands,
+        separate=0,
+        nodata=None,
+        init_values=None,
+        max_bytes=None,
+        min_chunks=1,
+    ):
+        """
+        t_fh -- gdal.Dataset object of the target file.
+
+        file_infos -- list of file_info objects, in compositing order.
+
+        bands -- number of bands copied from each file, when not separate.
+
+        separate -- place each band of each file into a separate target band.
+
+        nodata -- source value not copied into the target, or None.
+
+        init_values -- value of each target band where no source is copied,
+        or None to keep the existing content of the target file.
+
+        max_bytes -- maximum size of a chunk, defaults to ChunkMaxBytes.
+
+        min_chunks -- the size of a chunk is lowered so that the target is
+        split in at least that number of chunks, when its blocks allow it.
+        """
+        import numpy as np
+
+        from osgeo import gdal_array
+
+        self.t_fh = t_fh
+        self.t_xsize = t_fh.RasterXSize
+        self.t_ysize = t_fh.RasterYSize
+        self.filenames = [fi.filename for fi in file_infos]
+        self.nodata = nodata
+        self.init_values = init_values
+        self.t_types = [
+            t_fh.GetRasterBand(i + 1).DataType for i in range(t_fh.RasterCount)
+        ]
+        self.dtype = gdal_array.GDALTypeCodeToNumericTypeCode(self.t_types[0])
+
+        self.band_maps = get_band_maps(file_infos, bands, separate)
+
+        t_geotransform = t_fh.GetGeoTransform()
+        self.windows = [
+            fi.get_target_window(t_geotransform, t_fh.RasterXSize, t_fh.RasterYSize)
+            for fi in file_infos
+        ]
+
+        if max_bytes is None:
+            max_bytes = ChunkMaxBytes
+        pixel_bytes = np.dtype(self.dtype).itemsize * t_fh.RasterCount
+        if min_chunks > 1:
+            max_bytes = min(
+                max_bytes,
+                pixel_bytes * t_fh.RasterXSize * t_fh.RasterYSize // min_chunks,
+            )
+        self.chunk_xsize, self.chunk_ysize = get_chunk_size(
+            (t_fh.RasterXSize, t_fh.RasterYSize),
+            t_fh.GetRasterBand(1).GetBlockSize(),
+            max(1, max_bytes // pixel_bytes),
+        )
+        self.chunks_x = (t_fh.RasterXSize + self.chunk_xsize - 1) // self.chunk_xsize
+        self.chunks_y = (t_fh.RasterYSize + self.chunk_ysize - 1) // self.chunk_ysize
+
+        # Indices of the files intersecting each chunk, in input order.
+        self.chunk_index = {}
+        for i, window in enumerate(self.windows):
+            if window is None or not self.band_maps[i]:
+                continue
+            tw_xoff, tw_yoff, tw_xsize, tw_ysize = window[:4]
+            first_x = max(0, tw_xoff // self.chunk_xsize)
+            last_x = min(
+                self.chunks_x - 1, (tw_xoff + tw_xsize - 1) // self.chunk_xsize
+            )
+            first_y = max(0, tw_yoff // self.chunk_ysize)
+            last_y = min(
+                self.chunks_y - 1, (tw_yoff + tw_ysize - 1) // self.chunk_ysize
+            )
+            for chunk_y in range(first_y, last_y + 1):
+                for chunk_x in range(first_x, last_x + 1):
+                    self.chunk_index.setdefault((chunk_x, chunk_y), []).append(i)
+
+    def chunks(self):
+        """
+        Return the (chunk_x, chunk_y) coordinates of the chunks to write, in
+        row-major order.
+
+        Chunks intersecting no source are skipped, unless the target must be
+        initialized.
+        """
+        if self.init_values is not None:
+            return [
+                (chunk_x, chunk_y)
+                for chunk_y in range(self.chunks_y)
+                for chunk_x in range(self.chunks_x)
+            ]
+        return sorted(self.chunk_index, key=lambda chunk: (chunk[1], chunk[0]))
+
+    def composite_chunk(self, chunk_x, chunk_y, ds_cache, verbose=0):
+        """
+        Composite the sources intersecting a chunk.
+
+        The target file is not accessed, so that chunks can be composited
+        concurrently, and written by write_chunk().
+
+        ds_cache -- SourceDatasetCache used to open the source files.
+
+        Returns a (t_xoff, t_yoff, array, band_list, masks) tuple with the
+        content of the chunk for the target bands of band_list, or None if
+        there is nothing to write. For each band, masks holds None, or an
+        array telling which pixels were copied from a source, the other ones
+        keeping the existing content of the target.
+        """
+        import numpy as np
+
+        t_xoff = chunk_x * self.chunk_xsize
+        t_yoff = chunk_y * self.chunk_ysize
+        t_xsize = min(self.chunk_xsize, self.t_xsize - t_xoff)
+        t_ysize = min(self.chunk_ysize, self.t_ysize - t_yoff)
+
+        # Source bands copied into each target band, in input order.
+        band_sources = {}
+        for i in self.chunk_index.get((chunk_x, chunk_y), []):
+            for s_band, t_band in self.band_maps[i]:
+                band_sources.setdefault(t_band, []).append((i, s_band))
+
+        if self.init_values is not None:
+            band_list = list(range(1, len(self.t_types) + 1))
+        else:
+            band_list = sorted(band_sources)
+        if not band_list:
+            return None
+
+        array = np.empty((len(band_list), t_ysize, t_xsize), dtype=self.dtype)
+        masks = []
+        for t_array, t_band in zip(array, band_list):
+            sources = band_sources.get(t_band, [])
+            written = None
+
+            # Sources below the last opaque one covering the whole chunk are
+            # hidden, and so is the previous content of the target.
+            first = 0
+            for j in range(len(sources) - 1, -1, -1):
+                i, s_band = sources[j]
+                if self._covers(i, t_xoff, t_yoff, t_xsize, t_ysize) and (
+                    self._is_opaque(ds_cache.get(self.filenames[i]), s_band)
+                ):
+                    first = j
+                    break
+            else:
+                if self.init_values is not None:
+                    t_array.fill(self.init_values[t_band - 1])
+                else:
+                    t_array.fill(0)
+                    written = np.zeros(t_array.shape, dtype=bool)
+
+            for i, s_band in sources[first:]:
+                self._copy_source(
+                    i,
+                    ds_cache.get(self.filenames[i]),
+                    s_band,
+                    t_band,
+                    t_array,
+                    written,
+                    t_xoff,
+                    t_yoff,
+                    verbose,
+                )
+            masks.append(written)
+
+        return t_xoff, t_yoff, array, band_list, masks
+
+    def write_chunk(self, t_xoff, t_yoff, array, band_list, masks):
+        """Write a chunk returned by composite_chunk() into the target file."""
+        import numpy as np
+
+        t_ysize, t_xsize = array.shape[1:]
+        for t_array, t_band, written in zip(array, band_list, masks):
+            if written is not None and not written.all():
+                t_content = self.t_fh.GetRasterBand(t_band).ReadAsArray(
+                    t_xoff, t_yoff, t_xsize, t_ysize
+                )
+                np.copyto(t_array, t_content, where=~written)
+        self.t_fh.WriteArray(array, t_xoff, t_yoff, band_list=band_list)
+
+    def __getstate__(self):
+        # The target dataset is only used by the process writing the chunks
+        state = self.__dict__.copy()
+        state["t_fh"] = None
+        return state
+
+    def _covers(self, i, t_xoff, t_yoff, t_xsize, t_ysize):
+        tw_xoff, tw_yoff, tw_xsize, tw_ysize = self.windows[i][:4]
+        return (
+            tw_xoff <= t_xoff
+            and tw_yoff <= t_yoff
+            and tw_xoff + tw_xsize >= t_xoff + t_xsize
+            and tw_yoff + tw_ysize >= t_yoff + t_ysize
+        )
+
+    def _is_opaque(self, s_fh, s_band):
+        if self.nodata is not None:
+            return False
+        return get_mask_band(s_fh.GetRasterBand(s_band)) is None
+
+    def _copy_source(
+        self, i, s_fh, s_band_n, t_band_n, t_array, written, t_xoff, t_yoff, verbose
+    ):
+        """
+        Copy the part of a source band overlapping a chunk into it, and flag
+        the copied pixels in written, unless it is None.
+        """
+        import numpy as np
+
+        (
+            tw_xoff,
+            tw_yoff,
+            tw_xsize,
+            tw_ysize,
+            sw_xoff,
+            sw_yoff,
+            sw_xsize,
+            sw_ysize,
+        ) = self.windows[i]
+
+        t_ysize, t_xsize = t_array.shape
+        x0 = max(t_xoff, tw_xoff)
+        x1 = min(t_xoff + t_xsize, tw_xoff + tw_xsize)
+        y0 = max(t_yoff, tw_yoff)
+        y1 = min(t_yoff + t_ysize, tw_yoff + tw_ysize)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        s_band = s_fh.GetRasterBand(s_band_n)
+        s_xoff, s_xsize = self._source_window(
+            x0 - tw_xoff, x1 - tw_xoff, tw_xsize, sw_xoff, sw_xsize, s_fh.RasterXSize
+        )
+        s_yoff, s_ysize = self._source_window(
+            y0 - tw_yoff, y1 - tw_yoff, tw_ysize, sw_yoff, sw_ysize, s_fh.RasterYSize
+        )
+
+        if verbose != 0:
+            print(
+                "Copy %g,%g,%g,%g to %d,%d,%d,%d."
+                % (s_xoff, s_yoff, s_xsize, s_ysize, x0, y0, x1 - x0, y1 - y0)
+            )
+
+        t_type = self.t_types[t_band_n - 1]
+        data = s_band.ReadAsArray(
+            s_xoff, s_yoff, s_xsize, s_ysize, x1 - x0, y1 - y0, buf_type=t_type
+        )
+        dst = t_array[y0 - t_yoff : y1 - t_yoff, x0 - t_xoff : x1 - t_xoff]
+        if written is not None:
+            dst_written = written[y0 - t_yoff : y1 - t_yoff, x0 - t_xoff : x1 - t_xoff]
+
+        if self.nodata is not None:
+            # Compare with the nodata value before conversion to the target type
+            if s_band.DataType != t_type:
+                data_src = s_band.ReadAsArray(
+                    s_xoff, s_yoff, s_xsize, s_ysize, x1 - x0, y1 - y0
+                )
+            else:
+                data_src = data
+            if not np.isnan(self.nodata):
+                valid = np.not_equal(data_src, self.nodata)
+            else:
+                valid = ~np.isnan(data_src)
+            np.copyto(dst, data, where=valid)
+            if written is not None:
+                dst_written |= valid
+            return
+
+        m_band = get_mask_band(s_band)
+        if m_band is not None:
+            data_mask = m_band.ReadAsArray(
+                s_xoff, s_yoff, s_xsize, s_ysize, x1 - x0, y1 - y0
+            )
+            valid = np.not_equal(data_mask, 0)
+            np.copyto(dst, data, where=valid)
+            if written is not None:
+                dst_written |= valid
+            return
+
+        dst[...] = data
+        if written is not None:
+            dst_written[...] = True
+
+    @staticmethod
+    def _source_window(t_off, t_end, tw_size, sw_off, sw_size, raster_size):
+        """
+        Compute the source window matching [t_off, t_end) in the target
+        window of a file, possibly with a fractional offset and size when
+        the file has a different resolution than the target.
+        """
+        if sw_size == tw_size:
+            return sw_off + t_off, t_end - t_off
+        s_off = sw_off + t_off * sw_size / tw_size
+        s_size = sw_off + t_end * sw_size / tw_size - s_off
+        # RasterIO() rounds the window to check it against the raster size
+        if int(s_off + 0.5) + int(s_size + 0.5) > raster_size:
+            s_size = min(s_size, raster_size - int(s_off + 0.5) + 0.5 - 1e-6)
+        return s_off, s_size
+
+
+# =============================================================================
+
+# Compositor and dataset cache of a worker process of composite_chunks()
+worker_compositor = None
+worker_ds_cache = None
+
+
+def _init_worker(compositor):
+    global worker_compositor, worker_ds_cache
+    gdal.UseExceptions()
+    worker_compositor = compositor
+    worker_ds_cache = SourceDatasetCache()
+
+
+def _composite_chunk_in_worker(chunk, verbose):
+    return worker_compositor.composite_chunk(*chunk, worker_ds_cache, verbose)
+
+
+def composite_chunks(compositor, chunks, threads=None, processes=None, verbose=0):
+    """
+    Composite chunks with a ChunkCompositor.
+
+    With several threads or processes, the chunks are composited
+    concurrently, each worker keeping the source files it opened in its own
+    SourceDatasetCache, with a bounded number of chunks in flight.
+
+    Yields the results of ChunkCompositor.composite_chunk(), in the order of
+    chunks.
+    """
+    if threads and threads > 1:
+        thread_local = threading.local()
+
+        def composite(chunk, verbose):
+            ds_cache = getattr(thread_local, "ds_cache", None)
+            if ds_cache is None:
+                ds_cache = thread_local.ds_cache = SourceDatasetCache()
+            return compositor.composite_chunk(*chunk, ds_cache, verbose)
+
+        workers = threads
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+    elif processes and processes > 1:
+        composite = _composite_chunk_in_worker
+        workers = processes
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(compositor,)
+        )
+    else:
+        ds_cache = SourceDatasetCache()
+        for chunk in chunks:
+            yield compositor.composite_chunk(*chunk, ds_cache, verbose)
+        ds_cache.close()
+        return
+
+    with executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(composite, chunk, verbose))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# =============================================================================
+
+
+def get_vrt_source_filename(filename, vrt_filename):
+    """
+    Return a (filename, relative_to_vrt) tuple referencing a source file from
+    a VRT file, relatively to the VRT file when they are both on the local
+    file system.
+    """
+    if (
+        filename.startswith("/vsi")
+        or vrt_filename.startswith("/vsi")
+        or not os.path.exists(filename)
+    ):
+        return filename, False
+    try:
+        return (
+            os.path.relpath(
+                os.path.abspath(filename),
+                os.path.dirname(os.path.abspath(vrt_filename)),
+            ),
+            True,
+        )
+    except ValueError:
+        # On different drives on Windows
+        return filename, False
+
+
+def get_vrt_source_xml(
+    filename, relative_to_vrt, s_band, s_band_n, window, nodata=None
+):
+    """
+    Return the XML definition of a VRT source compositing a band of a file
+    the same way as raster_copy().
+
+    window -- target and source windows, as returned by
+    file_info.get_target_window().
+    """
+    (
+        tw_xoff,
+        tw_yoff,
+        tw_xsize,
+        tw_ysize,
+        sw_xoff,
+        sw_yoff,
+        sw_xsize,
+        sw_ysize,
+    ) = window
+
+    m_band = get_mask_band(s_band)
+    if nodata is not None:
+        source_type = "ComplexSource"
+        options = "<NODATA>%.17g</NODATA>" % nodata
+    elif m_band is None:
+        source_type = "SimpleSource"
+        options = ""
+    elif s_band.GetMaskFlags() == gdal.GMF_ALL_VALID:
+        # Alpha band: its zero values are not copied
+        source_type = "ComplexSource"
+        options = "<NODATA>0</NODATA>"
+    else:
+        source_type = "ComplexSource"
+        options = "<UseMaskBand>true</UseMaskBand>"
+
+    block_xsize, block_ysize = s_band.GetBlockSize()
+    return (
+        "<%s>"
+        '<SourceFilename relativeToVRT="%d">%s</SourceFilename>'
+        "<SourceBand>%d</SourceBand>"
+        '<SourceProperties RasterXSize="%d" RasterYSize="%d" DataType="%s" '
+        'BlockXSize="%d" BlockYSize="%d"/>'
+        '<SrcRect xOff="%d" yOff="%d" xSize="%d" ySize="%d"/>'
+        '<DstRect xOff="%d" yOff="%d" xSize="%d" ySize="%d"/>'
+        "%s"
+        "</%s>"
+        % (
+            source_type,
+            1 if relative_to_vrt else 0,
+            gdal.EscapeString(filename, gdal.CPLES_XML),
+            s_band_n,
+            s_band.XSize,
+            s_band.YSize,
+            gdal.GetDataTypeName(s_band.DataType),
+            block_xsize,
+            block_ysize,
+            sw_xoff,
+            sw_yoff,
+            sw_xsize,
+            sw_ysize,
+            tw_xoff,
+            tw_yoff,
+            tw_xsize,
+            tw_ysize,
+            options,
+            source_type,
+        )
+    )
+
+
+def add_vrt_sources(
+    t_fh, file_infos, bands, separate=0, nodata=None, verbose=0, progress_cb=None
+):
+    """
+    Add the files as sources of the bands of a VRT target file, so that
+    reading the VRT composites them like they would be copied into the
+    target, without copying any data.
+
+    t_fh -- gdal.Dataset object of the VRT file.
+
+    file_infos -- list of file_info objects, in compositing order.
+
+    bands -- number of bands copied from each file, when not separate.
+
+    separate -- place each band of each file into a separate target band.
+
+    nodata -- source value not copied into the target, or None.
+    """
+    vrt_filename = t_fh.GetDescription()
+    t_geotransform = t_fh.GetGeoTransform()
+    band_maps = get_band_maps(file_infos, bands, separate)
+    for fi_processed, (fi, band_map) in enumerate(zip(file_infos, band_maps)):
+        if verbose != 0:
+            print("")
+            fi.report()
+
+        window = fi.get_target_window(
+            t_geotransform, t_fh.RasterXSize, t_fh.RasterYSize
+        )
+        if window is not None:
+            s_fh = gdal.Open(fi.filename)
+            filename, relative_to_vrt = get_vrt_source_filename(
+                fi.filename, vrt_filename
+            )
+            for s_band_n, t_band_n in band_map:
+                source_xml = get_vrt_source_xml(
+                    filename,
+                    relative_to_vrt,
+                    s_fh.GetRasterBand(s_band_n),
+                    s_band_n,
+                    window,
+                    nodata,
+                )
+                if verbose != 0:
+                    print(source_xml)
+                t_fh.GetRasterBand(t_band_n).SetMetadataItem(
+                    "source_0", source_xml, "new_vrt_sources"
+                )
+            s_fh = None
+
+        if progress_cb is not None:
+            progress_cb((fi_processed + 1) / float(len(file_infos)))
+
+
 # =============================================================================
 def Usage(isError):
     f = sys.stderr if isError else sys.stdout
@@ -383,7 +1054,15 @@ def Usage(isError):
         file=f,
     )
     print(
-        "                     [-ot <datatype>] [-createonly] <input_file> [<input_file>]...",
+        "                     [-ot <datatype>] [-createonly]",
+        file=f,
+    )
+    print(
+        "                     [-threads <n>|ALL_CPUS | -processes <n>|ALL_CPUS]",
+        file=f,
+    )
+    print(
+        "                     <input_file> [<input_file>]...",
         file=f,
     )
     print("                     [--help-general]", file=f)
@@ -414,6 +1093,8 @@ def _gdal_merge(argv=None):
     band_type = None
     createonly = 0
     bTargetAlignedPixels = False
+    nb_threads = None
+    nb_processes = None
     start_time = time.time()
 
     if argv is None:
@@ -496,6 +1177,23 @@ def _gdal_merge(argv=None):
             lry = float(argv[i + 4])
             i = i + 4
 
+        elif arg == "-threads" or arg == "-processes":
+            i = i + 1
+            if argv[i].upper() == "ALL_CPUS":
+                nb_workers = gdal.GetNumCPUs()
+            else:
+                try:
+                    nb_workers = int(argv[i])
+                except ValueError:
+                    nb_workers = 0
+                if nb_workers < 1:
+                    print("Invalid value for %s: %s" % (arg, argv[i]))
+                    return 1
+            if arg == "-threads":
+                nb_threads = nb_workers
+            else:
+                nb_processes = nb_workers
+
         elif arg[:1] == "-":
             print("Unrecognized command option: %s" % arg)
             return Usage(isError=True)
@@ -509,6 +1207,10 @@ def _gdal_merge(argv=None):
         print("No input files selected.")
         return Usage(isError=True)
 
+    if nb_threads is not None and nb_processes is not None:
+        print("-threads and -processes cannot be used together.")
+        return 1
+
     if driver_name is None:
         driver_name = GetOutputDriverFor(out_file)
 
@@ -525,6 +1227,10 @@ def _gdal_merge(argv=None):
         )
         return 1
 
+    if driver.ShortName == "VRT" and pre_init:
+        print("-init is not supported with a VRT output file.")
+        return 1
+
     # Collect information on all the source files.
     file_infos = names_to_fileinfos(names)
 
@@ -604,49 +1310,73 @@ def _gdal_merge(argv=None):
             t_fh.GetRasterBand(i + 1).SetNoDataValue(a_nodata)
 
     # Do we need to pre-initialize the whole mosaic file to some value?
+    init_values = None
     if pre_init is not None:
         if t_fh.RasterCount <= len(pre_init):
-            for i in range(t_fh.RasterCount):
-                t_fh.GetRasterBand(i + 1).Fill(pre_init[i])
+            init_values = pre_init[: t_fh.RasterCount]
         elif len(pre_init) == 1:
+            init_values = pre_init * t_fh.RasterCount
+
+    if createonly != 0:
+        if init_values is not None:
             for i in range(t_fh.RasterCount):
-                t_fh.GetRasterBand(i + 1).Fill(pre_init[0])
+                t_fh.GetRasterBand(i + 1).Fill(init_values[i])
+        t_fh = None
+        return
 
-    # Copy data from source files into output file.
-    t_band = 1
+    if t_fh.GetDriver().ShortName == "VRT":
+        # Virtual mosaic: the files are composited when the VRT is read
+        progress_cb = progress if quiet == 0 and verbose == 0 else None
+        add_vrt_sources(t_fh, file_infos, bands, separate, nodata, verbose, progress_cb)
+        t_fh = None
+        return
+
+    if verbose != 0:
+        for fi in file_infos:
+            print("")
+            fi.report()
+
+    # Copy data from source files into output file, chunk by chunk. The
+    # initialization values are written with the chunks, so that each output
+    # block is written once. Chunks are composited by the workers, if any,
+    # and written by the current thread, in order.
+    workers = nb_threads or nb_processes or 1
+    compositor = ChunkCompositor(
+        t_fh,
+        file_infos,
+        bands,
+        separate,
+        nodata,
+        init_values,
+        min_chunks=4 * workers if workers > 1 else 1,
+    )
+    chunks = compositor.chunks()
 
     if quiet == 0 and verbose == 0:
         progress(0.0)
-    fi_processed = 0
-
-    for fi in file_infos:
-        if createonly != 0:
-            continue
 
+    results = composite_chunks(compositor, chunks, nb_threads, nb_processes, verbose)
+    for chunk_processed, result in enumerate(results):
         if verbose != 0:
             print("")
             print(
-                "Processing file %5d of %5d, %6.3f%% completed in %d minutes."
+                "Processed chunk %5d of %5d, %6.3f%% completed in %d minutes."
                 % (
-                    fi_processed + 1,
-                    len(file_infos),
-                    fi_processed * 100.0 / len(file_infos),
+                    chunk_processed + 1,
+                    len(chunks),
+                    (chunk_processed + 1) * 100.0 / len(chunks),
                     int(round((time.time() - start_time) / 60.0)),
                 )
             )
-            fi.report()
 
-        if separate == 0:
-            for band in range(1, bands + 1):
-                fi.copy_into(t_fh, band, band, nodata, verbose)
-        else:
-            for band in range(1, fi.bands + 1):
-                fi.copy_into(t_fh, band, t_band, nodata, verbose)
-                t_band = t_band + 1
+        if result is not None:
+            compositor.write_chunk(*result)
 
-        fi_processed = fi_processed + 1
         if quiet == 0 and verbose == 0:
-            progress(fi_processed / float(len(file_infos)))
+            progress((chunk_processed + 1) / float(len(chunks)))
+
+    if quiet == 0 and verbose == 0 and not chunks:
+        progress(1.0)
 
     # Force file to be closed.
     t_fh = None
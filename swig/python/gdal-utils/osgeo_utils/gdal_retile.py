@@ -11,10 +11,14 @@
 #
 # SPDX-License-Identifier: MIT
 ###############################################################################
+import collections
+import concurrent.futures
 import os
 import sys
+import threading
 
 from osgeo import gdal, ogr, osr
+from osgeo_utils.auxiliary.rtree import RTree
 from osgeo_utils.auxiliary.util import enable_gdal_exceptions
 
 progress = gdal.TermProgress_nocb
@@ -51,34 +55,48 @@ class AffineTransformDecorator:
         return [xlist, ylist]
 
 
+def getHandlePoolSize():
+    """
+    Return the number of source tiles that the pool of datasets of the VRT
+    driver can keep open at the same time, derived from the limit of open files
+    of the process.
+    """
+    try:
+        import resource
+
+        limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if limit == resource.RLIM_INFINITY:
+            limit = 4096
+    except (ImportError, OSError, ValueError):
+        # Default limit of the C runtime on Windows
+        limit = 512
+    # Keep room for the datasets opened by GDAL, and the output tiles
+    return max(8, min(1024, limit // 3))
+
+
 class DataSetCache:
-    """A class for caching source tiles"""
+    """A class for caching source tiles, closing the least recently used ones"""
 
-    def __init__(self):
-        self.cacheSize = 8
-        self.queue = []
-        self.dict = {}
+    def __init__(self, cacheSize=8):
+        self.cacheSize = cacheSize
+        self.dict = collections.OrderedDict()
 
     def get(self, name):
 
         if name in self.dict:
+            self.dict.move_to_end(name)
             return self.dict[name]
         result = gdal.Open(name)
         if result is None:
-            print("Error opening: %s" % NameError, file=sys.stderr)
+            print("Error opening: %s" % name, file=sys.stderr)
             return 1
-        if len(self.queue) == self.cacheSize:
-            toRemove = self.queue.pop(0)
-            del self.dict[toRemove]
-        self.queue.append(name)
+        if len(self.dict) == self.cacheSize:
+            self.dict.popitem(last=False)
         self.dict[name] = result
         return result
 
     def __del__(self):
-        for dataset in self.dict.values():
-            del dataset
-        del self.queue
-        del self.dict
+        self.dict.clear()
 
 
 class tile_info:
@@ -121,16 +139,26 @@ class mosaic_info:
         inputDS -- OGR DataSet representing the tile index
 
         """
-        self.TempDriver = gdal.GetDriverByName("MEM")
+        self.TempDriver = gdal.GetDriverByName("VRT")
         self.filename = filename
         self.cache = DataSetCache()
+        # protects the cache and tileGeometries, getDataSet() being called
+        # from several threads
+        self.lock = threading.Lock()
         self.ogrTileIndexDS = inputDS
 
+        # R-tree of the envelopes of the tiles of the index, whose first
+        # field is the filename
         self.ogrTileIndexDS.GetLayer().ResetReading()
+        self.tileIndex = RTree(
+            (feature.GetGeometryRef().GetEnvelope(), feature.GetField(0))
+            for feature in self.ogrTileIndexDS.GetLayer()
+        )
+        # geotransform and size of the tiles read so far
+        self.tileGeometries = {}
+
         # grab the first feature of the temporary tile index created
-        feature = self.ogrTileIndexDS.GetLayer().GetNextFeature()
-        # the first field is the filename
-        imgLocation = feature.GetField(0)
+        imgLocation = self.tileIndex.items[0]
 
         # get the first tile that exists, extract metadata abut mosaic
         fhInputTile = self.cache.get(imgLocation)
@@ -167,72 +195,70 @@ class mosaic_info:
         del self.cache
         del self.ogrTileIndexDS
 
+    def getTileGeometry(self, name):
+        """
+        Return the geotransform, as an AffineTransformDecorator, and the size
+        of a tile of the mosaic.
+        """
+        with self.lock:
+            if name not in self.tileGeometries:
+                sourceDS = self.cache.get(name)
+                dec = AffineTransformDecorator(sourceDS.GetGeoTransform())
+                dec.lrx = dec.ulx + sourceDS.RasterXSize * dec.scaleX
+                dec.lry = dec.uly + sourceDS.RasterYSize * dec.scaleY
+                self.tileGeometries[name] = (
+                    dec,
+                    sourceDS.RasterXSize,
+                    sourceDS.RasterYSize,
+                )
+            return self.tileGeometries[name]
+
+    def getTileNames(self, minx, miny, maxx, maxy):
+        """
+        Return the names of the tiles of the mosaic overlapping a bounding box,
+        in the order of the tile index.
+        """
+        return self.tileIndex.query(
+            min(minx, maxx), max(minx, maxx), min(miny, maxy), max(miny, maxy)
+        )
+
     def getDataSet(self, minx, miny, maxx, maxy):
         """
         Find a gdal dataset representing a subset of a mosaic, based on a bounding box. Might overlap multiple tiles of the mosaic
 
+        The returned dataset is a VRT reading the overlapping tiles, which are
+        kept open in the pool of datasets of the VRT driver. The sources are
+        not shared, so that a tile opened for a previous output tile is reused
+        from the pool rather than opened again.
+
         returns GDALDataset or None
         """
-        self.ogrTileIndexDS.GetLayer().ResetReading()
-        self.ogrTileIndexDS.GetLayer().SetSpatialFilterRect(minx, miny, maxx, maxy)
-        features = []
-        envelope = None
-        # Find the envelope of all features in the dataset
-        while True:
-            feature = self.ogrTileIndexDS.GetLayer().GetNextFeature()
-            if feature is None:
-                break
-            features.append(feature)
-            # on first iteration get envelope of the first feature
-            if envelope is None:
-                envelope = feature.GetGeometryRef().GetEnvelope()
-            else:
-                featureEnv = feature.GetGeometryRef().GetEnvelope()
-                # then expand the envelop as needed based on other features
-                envelope = (
-                    min(featureEnv[0], envelope[0]),
-                    max(featureEnv[1], envelope[1]),
-                    min(featureEnv[2], envelope[2]),
-                    max(featureEnv[3], envelope[3]),
-                )
-
-        if envelope is None:
+        featureNames = self.getTileNames(minx, miny, maxx, maxy)
+        if not featureNames:
             return None
 
-        # get overlap
-        envelope = (
-            min(minx, envelope[0]),
-            max(maxx, envelope[1]),
-            min(miny, envelope[2]),
-            max(maxy, envelope[3]),
-        )
-
-        self.ogrTileIndexDS.GetLayer().SetSpatialFilter(None)
-
         # merge tiles
 
         resultSizeX = int((maxx - minx) / self.scaleX + 0.5)
         resultSizeY = int((miny - maxy) / self.scaleY + 0.5)
 
         resultDS = self.TempDriver.Create(
-            "TEMP", resultSizeX, resultSizeY, self.bands, self.band_type, []
+            "", resultSizeX, resultSizeY, self.bands, self.band_type, []
         )
         resultDS.SetGeoTransform([minx, self.scaleX, 0, maxy, 0, self.scaleY])
 
         for bandNr in range(1, self.bands + 1):
             t_band = resultDS.GetRasterBand(bandNr)
             if self.nodata is not None:
-                t_band.Fill(self.nodata)
                 t_band.SetNoDataValue(self.nodata)
+            if self.ct is not None:
+                t_band.SetRasterColorTable(self.ct)
+            t_band.SetRasterColorInterpretation(self.ci[bandNr - 1])
 
         # for each tile in the index, find its overlap (if any) with the requested bbox, then add it to the returned GDAL dataset if needed.
-        for feature in features:
-            featureName = feature.GetField(0)
-            sourceDS = self.cache.get(featureName)
-            dec = AffineTransformDecorator(sourceDS.GetGeoTransform())
-
-            dec.lrx = dec.ulx + sourceDS.RasterXSize * dec.scaleX
-            dec.lry = dec.uly + sourceDS.RasterYSize * dec.scaleY
+        sourceCount = 0
+        for featureName in featureNames:
+            dec, sourceXSize, sourceYSize = self.getTileGeometry(featureName)
 
             # Find the intersection region
             tgw_ulx = max(dec.ulx, minx)
@@ -248,12 +274,10 @@ class mosaic_info:
             sw_xoff = int((tgw_ulx - dec.ulx) / dec.scaleX + 0.5)
             sw_yoff = int((tgw_uly - dec.uly) / dec.scaleY + 0.5)
             sw_xsize = (
-                min(sourceDS.RasterXSize, int((tgw_lrx - dec.ulx) / dec.scaleX + 0.5))
-                - sw_xoff
+                min(sourceXSize, int((tgw_lrx - dec.ulx) / dec.scaleX + 0.5)) - sw_xoff
             )
             sw_ysize = (
-                min(sourceDS.RasterYSize, int((tgw_lry - dec.uly) / dec.scaleY + 0.5))
-                - sw_yoff
+                min(sourceYSize, int((tgw_lry - dec.uly) / dec.scaleY + 0.5)) - sw_yoff
             )
             if sw_xsize <= 0 or sw_ysize <= 0:
                 continue
@@ -278,25 +302,33 @@ class mosaic_info:
             assert sw_yoff >= 0
 
             for bandNr in range(1, self.bands + 1):
-                s_band = sourceDS.GetRasterBand(bandNr)
-                t_band = resultDS.GetRasterBand(bandNr)
-                if self.ct is not None:
-                    t_band.SetRasterColorTable(self.ct)
-                t_band.SetRasterColorInterpretation(self.ci[bandNr - 1])
-
-                data = s_band.ReadRaster(
-                    sw_xoff,
-                    sw_yoff,
-                    sw_xsize,
-                    sw_ysize,
-                    tw_xsize,
-                    tw_ysize,
-                    self.band_type,
+                resultDS.GetRasterBand(bandNr).SetMetadataItem(
+                    "source_0",
+                    "<SimpleSource>"
+                    '<SourceFilename shared="0">%s</SourceFilename>'
+                    "<SourceBand>%d</SourceBand>"
+                    '<SrcRect xOff="%d" yOff="%d" xSize="%d" ySize="%d"/>'
+                    '<DstRect xOff="%d" yOff="%d" xSize="%d" ySize="%d"/>'
+                    "</SimpleSource>"
+                    % (
+                        gdal.EscapeString(featureName, gdal.CPLES_XML),
+                        bandNr,
+                        sw_xoff,
+                        sw_yoff,
+                        sw_xsize,
+                        sw_ysize,
+                        tw_xoff,
+                        tw_yoff,
+                        tw_xsize,
+                        tw_ysize,
+                    ),
+                    "new_vrt_sources",
                 )
-                if data is None:
-                    print(gdal.GetLastErrorMsg())
+            sourceCount += 1
 
-                t_band.WriteRaster(tw_xoff, tw_yoff, tw_xsize, tw_ysize, data)
+        # tiles only touching the bbox
+        if sourceCount == 0:
+            return None
 
         return resultDS
 
@@ -383,40 +415,29 @@ def getTargetDir(g, level=-1):
     return g.TargetDir + str(level) + os.sep
 
 
-def tileImage(g, minfo, ti):
+def getLevelTiles(g, minfo, ti, level):
     """
+    Iterate over the output tiles of a level holding data, in the order of the
+    tile index.
 
-    Tile image in mosaicinfo minfo  based on tileinfo ti
-
-    returns list of created tiles
+    The tiles of level 0 are read from minfo, and the tiles of a pyramid level
+    from minfo downsampled by 2.
 
+    Yields (offsetX, offsetY, width, height, tilename, dec, feature_only)
+    tuples, dec being the AffineTransformDecorator of the tile, and
+    feature_only being True for a tile already present in resume mode.
     """
-
     g.LastRowIndx = -1
-    OGRDS = createTileIndex(
-        g.Verbose,
-        "TileResult_0",
-        g.TileIndexFieldName,
-        g.Source_SRS,
-        g.TileIndexDriverTyp,
-    )
-
-    yRange = list(range(1, ti.countTilesY + 1))
-    xRange = list(range(1, ti.countTilesX + 1))
+    zoom = 1 if level == 0 else 2
 
-    if not g.Quiet and not g.Verbose:
-        progress(0.0)
-        processed = 0
-        total = len(xRange) * len(yRange)
-
-    for yIndex in yRange:
-        for xIndex in xRange:
+    for yIndex in range(1, ti.countTilesY + 1):
+        for xIndex in range(1, ti.countTilesX + 1):
             offsetY = (yIndex - 1) * (ti.tileHeight - ti.overlap)
             offsetX = (xIndex - 1) * (ti.tileWidth - ti.overlap)
             height = ti.tileHeight
             width = ti.tileWidth
-            if g.UseDirForEachRow:
-                tilename = getTileName(g, minfo, ti, xIndex, yIndex, 0)
+            if level > 0 or g.UseDirForEachRow:
+                tilename = getTileName(g, minfo, ti, xIndex, yIndex, level)
             else:
                 tilename = getTileName(g, minfo, ti, xIndex, yIndex)
 
@@ -425,30 +446,104 @@ def tileImage(g, minfo, ti):
             if offsetY + height > ti.height:
                 height = ti.height - offsetY
 
-            feature_only = g.Resume and os.path.exists(tilename)
-            createTile(
-                g, minfo, offsetX, offsetY, width, height, tilename, OGRDS, feature_only
+            sx = minfo.scaleX * zoom
+            sy = minfo.scaleY * zoom
+            dec = AffineTransformDecorator(
+                [minfo.ulx + offsetX * sx, sx, 0, minfo.uly + offsetY * sy, 0, sy]
             )
 
-            if not g.Quiet and not g.Verbose:
-                processed += 1
-                progress(processed / float(total))
+            # if -resume flag and the tile is present, only add it to the index
+            feature_only = g.Resume and os.path.exists(tilename)
+            # skip the tiles with no data
+            if not feature_only and not minfo.getTileNames(
+                *getBoundingBox(dec, width, height)
+            ):
+                continue
 
-    if g.TileIndexName is not None:
-        if g.UseDirForEachRow and not g.PyramidOnly:
-            shapeName = getTargetDir(g, 0) + g.TileIndexName
-        else:
-            shapeName = getTargetDir(g) + g.TileIndexName
-        copyTileIndexToDisk(g, OGRDS, shapeName)
+            yield offsetX, offsetY, width, height, tilename, dec, feature_only
+
+
+def getBoundingBox(dec, width, height):
+    """
+    Return the (minx, miny, maxx, maxy) bounding box of a tile, as expected by
+    mosaic_info.getDataSet()
+    """
+    return (
+        dec.ulx,
+        dec.uly + height * dec.scaleY,
+        dec.ulx + width * dec.scaleX,
+        dec.uly,
+    )
+
+
+class tile_level:
+    """A class holding the output tiles of a level, and their tile index"""
+
+    def __init__(self, g, level, minfo, ti):
+        """
+        Build the tile index of the output tiles of a level
+
+        level -- 0, or the pyramid level
+        minfo -- mosaic_info of the tiles the tiles of the level are read from
+        ti -- tile_info of the tiles of the level
 
-    if g.CsvFileName is not None:
-        if g.UseDirForEachRow and not g.PyramidOnly:
-            csvName = getTargetDir(g, 0) + g.CsvFileName
+        """
+        self.level = level
+        self.minfo = minfo
+        self.ti = ti
+        self.OGRDS = createTileIndex(
+            g.Verbose,
+            "TileResult_" + str(level),
+            g.TileIndexFieldName,
+            g.Source_SRS,
+            g.TileIndexDriverTyp,
+        )
+
+        # names of the complete tiles
+        self.completed = set()
+        # name of the first tile of the index
+        self.firstTile = None
+        # number of tiles to create
+        self.tileCount = 0
+
+        for tile in getLevelTiles(g, minfo, ti, level):
+            width, height, tilename, dec, feature_only = tile[2:]
+            if self.firstTile is None:
+                self.firstTile = tilename
+            points = dec.pointsFor(width, height)
+            addFeature(g.TileIndexFieldName, self.OGRDS, tilename, points[0], points[1])
+            if feature_only:
+                self.completed.add(tilename)
+            else:
+                self.tileCount += 1
+
+        if level == 0 and not g.UseDirForEachRow:
+            targetDir = getTargetDir(g)
         else:
-            csvName = getTargetDir(g) + g.CsvFileName
-        copyTileIndexToCSV(g, OGRDS, csvName)
+            targetDir = getTargetDir(g, level)
+        if g.TileIndexName is not None:
+            copyTileIndexToDisk(g, self.OGRDS, targetDir + g.TileIndexName)
+        if g.CsvFileName is not None:
+            copyTileIndexToCSV(g, self.OGRDS, targetDir + g.CsvFileName)
+
+        # The tiles are iterated over again as they are created, rather than
+        # kept in memory
+        self.tiles = (
+            tile for tile in getLevelTiles(g, minfo, ti, level) if not tile[6]
+        )
+        self.nextTile = next(self.tiles, None)
 
-    return OGRDS
+    def popNextTile(self):
+        tile = self.nextTile
+        self.nextTile = next(self.tiles, None)
+        return tile
+
+    def createTile(self, g, tile):
+        offsetX, offsetY, width, height, tilename = tile[:5]
+        if self.level == 0:
+            createTile(g, self.minfo, offsetX, offsetY, width, height, tilename)
+        else:
+            createPyramidTile(g, self.minfo, offsetX, offsetY, width, height, tilename)
 
 
 def copyTileIndexToDisk(g, OGRDS, fileName):
@@ -519,9 +614,7 @@ def _renameDataset(g, oldName, newName):
     g.Driver.Rename(newName, oldName)
 
 
-def createPyramidTile(
-    g, levelMosaicInfo, offsetX, offsetY, width, height, tileName, OGRDS, feature_only
-):
+def createPyramidTile(g, levelMosaicInfo, offsetX, offsetY, width, height, tileName):
     """
     Create an individual tile for the pyramids.
 
@@ -544,21 +637,10 @@ def createPyramidTile(
             sy,
         ]
     )
-    # if -resume flag and the tile is present, add it to the index and exit function
-    if feature_only:
-        points = dec.pointsFor(width, height)
-        addFeature(g.TileIndexFieldName, OGRDS, tileName, points[0], points[1])
-        return
-
-    s_fh = levelMosaicInfo.getDataSet(
-        dec.ulx, dec.uly + height * dec.scaleY, dec.ulx + width * dec.scaleX, dec.uly
-    )
+    s_fh = levelMosaicInfo.getDataSet(*getBoundingBox(dec, width, height))
     # if there is no data in that tile area return None
     if s_fh is None:
         return
-    # add the new pyramid tile to the index
-    points = dec.pointsFor(width, height)
-    addFeature(g.TileIndexFieldName, OGRDS, tileName, points[0], points[1])
 
     if g.BandType is None:
         bt = levelMosaicInfo.band_type
@@ -630,11 +712,9 @@ def createPyramidTile(
         )
 
 
-def createTile(
-    g, minfo, offsetX, offsetY, width, height, tilename, OGRDS, feature_only
-):
+def createTile(g, minfo, offsetX, offsetY, width, height, tilename):
     """
-    Create add a vector feature representing the tile to the index, then recreate the
+    Create a tile of level 0 from the mosaic
 
     Args:
         g (RetileGlobals): object with global script variables
@@ -644,8 +724,6 @@ def createTile(
         width (int): The width of the tile.
         height (int): The height of the tile.
         tilename (str): The name of the tile.
-        OGRDS (DataSource): The OGR DataSource object containing the tile index
-        feature_only (bool): Whether to only generate features.
 
     """
     temp_tilename = _createTempFileName(tilename)
@@ -668,28 +746,13 @@ def createTile(
         dec.scaleY,
     ]
 
-    # if -resume flag and the tile is present, add it to the index and exit function
-    if feature_only:
-        dec2 = AffineTransformDecorator(geotransform)
-        points = dec2.pointsFor(width, height)
-        addFeature(g.TileIndexFieldName, OGRDS, tilename, points[0], points[1])
-        return
-
     s_fh = minfo.getDataSet(
-        dec.ulx + offsetX * dec.scaleX,
-        dec.uly + offsetY * dec.scaleY + height * dec.scaleY,
-        dec.ulx + offsetX * dec.scaleX + width * dec.scaleX,
-        dec.uly + offsetY * dec.scaleY,
+        *getBoundingBox(AffineTransformDecorator(geotransform), width, height)
     )
     # if there is no data in that tile area return None
     if s_fh is None:
         return
 
-    # add the tile to the tile index
-    dec2 = AffineTransformDecorator(geotransform)
-    points = dec2.pointsFor(width, height)
-    addFeature(g.TileIndexFieldName, OGRDS, tilename, points[0], points[1])
-
     bands = minfo.bands
 
     if g.MemDriver is None:
@@ -817,78 +880,111 @@ def closeTileIndex(OGRDataSource):
     OGRDataSource.Close()
 
 
-def buildPyramid(g, minfo, createdTileIndexDS, tileWidth, tileHeight, overlap):
-    inputDS = createdTileIndexDS
-    for level in range(1, g.Levels + 1):
-        g.LastRowIndx = -1
-        levelMosaicInfo = mosaic_info(minfo.filename, inputDS)
-        levelOutputTileInfo = tile_info(
-            int(levelMosaicInfo.xsize / 2),
-            int(levelMosaicInfo.ysize / 2),
-            tileWidth,
-            tileHeight,
-            overlap,
-        )
-        inputDS = buildPyramidLevel(g, levelMosaicInfo, levelOutputTileInfo, level)
-
-
-def buildPyramidLevel(g, levelMosaicInfo, levelOutputTileInfo, level):
+def generateTiles(g, minfo, ti, inputTileIndexDS):
     """
-    Build the pyramids at level N and returns an OGR dataset of the tile index at that level
-    """
-    yRange = list(range(1, levelOutputTileInfo.countTilesY + 1))
-    xRange = list(range(1, levelOutputTileInfo.countTilesX + 1))
+    Create the tiles of level 0, unless -pyramidOnly, and of the pyramid levels.
 
-    OGRDS = createTileIndex(
-        g.Verbose,
-        "TileResult_" + str(level),
-        g.TileIndexFieldName,
-        g.Source_SRS,
-        g.TileIndexDriverTyp,
-    )
-
-    for yIndex in yRange:
-        for xIndex in xRange:
-            offsetY = (yIndex - 1) * (
-                levelOutputTileInfo.tileHeight - levelOutputTileInfo.overlap
-            )
-            offsetX = (xIndex - 1) * (
-                levelOutputTileInfo.tileWidth - levelOutputTileInfo.overlap
-            )
-            height = levelOutputTileInfo.tileHeight
-            width = levelOutputTileInfo.tileWidth
-
-            if offsetX + width > levelOutputTileInfo.width:
-                width = levelOutputTileInfo.width - offsetX
-            if offsetY + height > levelOutputTileInfo.height:
-                height = levelOutputTileInfo.height - offsetY
-
-            tilename = getTileName(
-                g, levelMosaicInfo, levelOutputTileInfo, xIndex, yIndex, level
-            )
+    With several threads, the tiles are created concurrently. A tile of a
+    pyramid level is started as soon as the tiles of the previous level it is
+    read from are complete.
+    """
+    levels = []
+    if not g.PyramidOnly:
+        levels.append(tile_level(g, 0, minfo, ti))
 
-            feature_only = g.Resume and os.path.exists(tilename)
-            createPyramidTile(
-                g,
-                levelMosaicInfo,
-                offsetX,
-                offsetY,
-                width,
-                height,
-                tilename,
-                OGRDS,
-                feature_only,
+    def addPyramidLevels():
+        # a level can be started once the first tile of the previous level,
+        # which mosaic_info reads, is complete
+        while True:
+            level = levels[-1].level + 1 if levels else 1
+            if level > g.Levels:
+                return
+            if levels:
+                previous = levels[-1]
+                if previous.firstTile not in previous.completed:
+                    return
+                inputDS = previous.OGRDS
+            else:
+                inputDS = inputTileIndexDS
+            levelMosaicInfo = mosaic_info(minfo.filename, inputDS)
+            levelOutputTileInfo = tile_info(
+                int(levelMosaicInfo.xsize / 2),
+                int(levelMosaicInfo.ysize / 2),
+                g.TileWidth,
+                g.TileHeight,
+                g.Overlap,
             )
+            levels.append(tile_level(g, level, levelMosaicInfo, levelOutputTileInfo))
+
+    def isReady(levelIndx, tile):
+        if levelIndx == 0:
+            return True
+        previous = levels[levelIndx - 1]
+        bbox = getBoundingBox(tile[5], tile[2], tile[3])
+        return all(
+            name in previous.completed
+            for name in levels[levelIndx].minfo.getTileNames(*bbox)
+        )
 
-    if g.TileIndexName is not None:
-        shapeName = getTargetDir(g, level) + g.TileIndexName
-        copyTileIndexToDisk(g, OGRDS, shapeName)
+    showProgress = not g.Quiet and not g.Verbose and not g.PyramidOnly
+    processed = 0
 
-    if g.CsvFileName is not None:
-        csvName = getTargetDir(g, level) + g.CsvFileName
-        copyTileIndexToCSV(g, OGRDS, csvName)
+    def setCompleted(level, tilename):
+        nonlocal processed
+        level.completed.add(tilename)
+        if showProgress and level.level == 0:
+            processed += 1
+            progress(processed / float(level.tileCount))
 
-    return OGRDS
+    if showProgress:
+        progress(0.0)
+        if levels[0].tileCount == 0:
+            progress(1.0)
+
+    threads = g.Threads or 1
+    executor = None
+    if threads > 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+    maxInFlight = 2 * threads
+    inFlight = {}
+    try:
+        while True:
+            addPyramidLevels()
+
+            # submit the tiles whose input is complete, the ones of the higher
+            # levels first
+            submitted = False
+            for levelIndx in reversed(range(len(levels))):
+                level = levels[levelIndx]
+                while (
+                    len(inFlight) < maxInFlight
+                    and level.nextTile is not None
+                    and isReady(levelIndx, level.nextTile)
+                ):
+                    tile = level.popNextTile()
+                    submitted = True
+                    if executor is None:
+                        level.createTile(g, tile)
+                        setCompleted(level, tile[4])
+                        break
+                    future = executor.submit(level.createTile, g, tile)
+                    inFlight[future] = (level, tile[4])
+                if submitted and executor is None:
+                    break
+
+            if inFlight:
+                done, _ = concurrent.futures.wait(
+                    inFlight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    level, tilename = inFlight.pop(future)
+                    future.result()
+                    setCompleted(level, tilename)
+            elif not submitted:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
 
 
 def getTileName(g, minfo, ti, xIndex, yIndex, level=-1):
@@ -956,11 +1052,36 @@ def Usage(isError):
     print("        [-csv <fileName> [-csvDelim <delimiter>]]", file=f)
     print("        [-s_srs <srs_def>]  [-pyramidOnly] -levels <numberoflevels>", file=f)
     print("        [-r {near|bilinear|cubic|cubicspline|lanczos}]", file=f)
-    print("        [-useDirForEachRow] [-resume]", file=f)
+    print("        [-useDirForEachRow] [-resume] [-threads <n>|ALL_CPUS]", file=f)
     print("        -targetDir <TileDirectory> <input_file> [<input_file>]...", file=f)
     return 2 if isError else 0
 
 
+def retile(g):
+    """Tile the input files, and build the pyramid levels."""
+    tileIndexDS = getTileIndexFromFiles(g)
+    if tileIndexDS is None:
+        print("Error building tile index", file=sys.stderr)
+        return 1
+    minfo = mosaic_info(g.Names[0], tileIndexDS)
+    ti = tile_info(minfo.xsize, minfo.ysize, g.TileWidth, g.TileHeight, g.Overlap)
+
+    if g.Source_SRS is None and minfo.projection:
+        g.Source_SRS = osr.SpatialReference()
+        if g.Source_SRS.SetFromUserInput(minfo.projection) != 0:
+            print("invalid projection  " + minfo.projection, file=sys.stderr)
+            return 1
+
+    if g.Verbose:
+        minfo.report()
+        ti.report()
+
+    generateTiles(g, minfo, ti, tileIndexDS)
+    tileIndexDS.Close()
+
+    return 0
+
+
 @enable_gdal_exceptions
 def main(args=None, g=None):
 
@@ -1070,6 +1191,18 @@ def main(args=None, g=None):
             g.CsvDelimiter = argv[i]
         elif arg == "-useDirForEachRow":
             g.UseDirForEachRow = True
+        elif arg == "-threads":
+            i += 1
+            if argv[i].upper() == "ALL_CPUS":
+                g.Threads = gdal.GetNumCPUs()
+            else:
+                try:
+                    g.Threads = int(argv[i])
+                except ValueError:
+                    g.Threads = 0
+                if g.Threads < 1:
+                    print("Invalid value for -threads: %s" % argv[i], file=sys.stderr)
+                    return 1
         elif arg == "-resume":
             g.Resume = True
         elif arg[:1] == "-":
@@ -1130,31 +1263,15 @@ def main(args=None, g=None):
     if "DCAP_CREATE" not in DriverMD:
         g.MemDriver = gdal.GetDriverByName("MEM")
 
-    tileIndexDS = getTileIndexFromFiles(g)
-    if tileIndexDS is None:
-        print("Error building tile index", file=sys.stderr)
-        return 1
-    minfo = mosaic_info(g.Names[0], tileIndexDS)
-    ti = tile_info(minfo.xsize, minfo.ysize, g.TileWidth, g.TileHeight, g.Overlap)
-
-    if g.Source_SRS is None and minfo.projection:
-        g.Source_SRS = osr.SpatialReference()
-        if g.Source_SRS.SetFromUserInput(minfo.projection) != 0:
-            print("invalid projection  " + minfo.projection, file=sys.stderr)
-            return 1
-
-    if g.Verbose:
-        minfo.report()
-        ti.report()
-
-    if not g.PyramidOnly:
-        dsCreatedTileIndex = tileImage(g, minfo, ti)
-        tileIndexDS.Close()
-    else:
-        dsCreatedTileIndex = tileIndexDS
-
-    if g.Levels > 0:
-        buildPyramid(g, minfo, dsCreatedTileIndex, g.TileWidth, g.TileHeight, g.Overlap)
+    # The tiles read by the output tiles are opened through the pool of
+    # datasets of the VRT driver, sized after the limit of open files.
+    with gdal.config_option(
+        "GDAL_MAX_DATASET_POOL_SIZE",
+        gdal.GetConfigOption("GDAL_MAX_DATASET_POOL_SIZE", str(getHandlePoolSize())),
+    ):
+        ret = retile(g)
+    if ret:
+        return ret
 
     if g.Verbose:
         print("FINISHED")
@@ -1188,6 +1305,7 @@ class RetileGlobals:
         "LastRowIndx",
         "UseDirForEachRow",
         "Resume",
+        "Threads",
     ]
 
     def __init__(self):
@@ -1218,6 +1336,7 @@ class RetileGlobals:
         self.LastRowIndx = -1
         self.UseDirForEachRow = False
         self.Resume = False
+        self.Threads = None
 
 
 if __name__ == "__main__":
@@ -14,19 +14,41 @@
 # ******************************************************************************
 
 import array
+import collections
+import concurrent.futures
+import contextlib
 import filecmp
 import math
 import os
 import sys
+import threading
 
 from osgeo import gdal, osr
 
 #######################################################
 from osgeo_utils.auxiliary.base import PathLikeOrStr
+from osgeo_utils.auxiliary.block_util import block_windows
 from osgeo_utils.auxiliary.util import enable_gdal_exceptions
 
 my_print = print
 
+# Approximate number of pixels of the windows in which bands are compared
+WINDOW_PIXELS = 1024 * 1024
+
+
+def get_option_value(options, key, default=None):
+    for opt in options:
+        if opt.startswith(key + "="):
+            return opt[len(key) + 1 :]
+    return default
+
+
+def get_num_threads(options):
+    value = get_option_value(options, "NUM_THREADS", "1")
+    if value.upper() == "ALL_CPUS":
+        return gdal.GetNumCPUs()
+    return max(1, int(value))
+
 
 def compare_metadata(golden_md, new_md, md_id, options=None):
 
@@ -74,53 +96,170 @@ def compare_metadata(golden_md, new_md, md_id, options=None):
     return found_diff
 
 
+#######################################################
+# Compute the differences of a window of two bands.
+#
+# Returns None if the pixels are identical, or a (diff_count, max_diff, diffs)
+# tuple, diff_count being the number of pixels differing by more than the
+# tolerance, and diffs the differences (only computed when dumping them).
+def compare_window(golden_band, new_band, window, tolerance, dump_diffs, read_lock):
+    xoff, yoff, win_xsize, win_ysize = window
+
+    # Compare the raw pixels first, to skip identical regions cheaply
+    with read_lock:
+        golden_data = golden_band.ReadRaster(xoff, yoff, win_xsize, win_ysize)
+        new_data = new_band.ReadRaster(xoff, yoff, win_xsize, win_ysize)
+    if golden_band.DataType == new_band.DataType and golden_data == new_data:
+        return None
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is None:
+        with read_lock:
+            golden = array.array(
+                "d",
+                golden_band.ReadRaster(
+                    xoff, yoff, win_xsize, win_ysize, buf_type=gdal.GDT_Float64
+                ),
+            )
+            new = array.array(
+                "d",
+                new_band.ReadRaster(
+                    xoff, yoff, win_xsize, win_ysize, buf_type=gdal.GDT_Float64
+                ),
+            )
+        diffs = [
+            0 if math.isnan(g) and math.isnan(n) else g - n for g, n in zip(golden, new)
+        ]
+        abs_diffs = [abs(x) for x in diffs if not math.isnan(x)]
+        max_diff = max(abs_diffs) if abs_diffs else 0
+        diff_count = sum([(0 if abs(x) <= tolerance else 1) for x in diffs])
+        if dump_diffs:
+            diffs = array.array("d", diffs).tobytes()
+        return diff_count, max_diff, diffs if dump_diffs else None
+
+    with read_lock:
+        golden = golden_band.ReadAsArray(
+            xoff, yoff, win_xsize, win_ysize, buf_type=gdal.GDT_Float64
+        )
+        new = new_band.ReadAsArray(
+            xoff, yoff, win_xsize, win_ysize, buf_type=gdal.GDT_Float64
+        )
+    diffs = golden - new
+    diffs[np.isnan(golden) & np.isnan(new)] = 0
+    abs_diffs = np.abs(diffs)
+    valid = ~np.isnan(abs_diffs)
+    max_diff = float(np.max(abs_diffs, initial=0, where=valid))
+    # NaN differences are counted as differences
+    diff_count = int(np.count_nonzero(~(abs_diffs <= tolerance)))
+    return diff_count, max_diff, diffs.tobytes() if dump_diffs else None
+
+
 #######################################################
 # Review and report on the actual image pixels that differ.
+#
+# Returns the number of pixels differing by more than the tolerance.
 def compare_image_pixels(golden_band, new_band, id, options=None):
 
+    options = [] if options is None else options
+
     diff_count = 0
     max_diff = 0
 
     out_db = None
     if "DUMP_DIFFS" in options:
-        prefix = ""
-        for opt in options:
-            if opt.startswith("DUMP_DIFFS_PREFIX="):
-                prefix = opt[len("DUMP_DIFFS_PREFIX=") :]
-                break
+        prefix = get_option_value(options, "DUMP_DIFFS_PREFIX", "")
         diff_fn = prefix + id.replace(" ", "_") + ".tif"
         out_db = gdal.GetDriverByName("GTiff").Create(
             diff_fn, golden_band.XSize, golden_band.YSize, 1, gdal.GDT_Float32
         )
 
-    xsize = golden_band.XSize
-    for line in range(golden_band.YSize):
-        golden_line = array.array(
-            "d", golden_band.ReadRaster(0, line, xsize, 1, buf_type=gdal.GDT_Float64)
-        )
-        new_line = array.array(
-            "d", new_band.ReadRaster(0, line, xsize, 1, buf_type=gdal.GDT_Float64)
+    tolerance = float(get_option_value(options, "TOLERANCE", 0))
+    fail_fast = "FAIL_FAST" in options
+    num_threads = get_num_threads(options)
+
+    def is_thread_safe(band):
+        ds = band.GetDataset()
+        return ds is not None and ds.IsThreadSafe(gdal.OF_RASTER)
+
+    # Bands of datasets opened with gdal.OF_THREAD_SAFE are read concurrently
+    if num_threads == 1 or (is_thread_safe(golden_band) and is_thread_safe(new_band)):
+        read_lock = contextlib.nullcontext()
+    else:
+        read_lock = threading.Lock()
+
+    def compare(window):
+        return compare_window(
+            golden_band, new_band, window, tolerance, out_db is not None, read_lock
         )
-        diff_line = [golden_line[i] - new_line[i] for i in range(xsize)]
-        max_diff_this_line = max([abs(x) for x in diff_line])
-        max_diff = max(max_diff, max_diff_this_line)
-        if max_diff_this_line:
-            diff_count += sum([(1 if x else 0) for x in diff_line])
-        if out_db is not None:
-            out_db.GetRasterBand(1).WriteRaster(
-                0,
-                line,
-                xsize,
-                1,
-                array.array("d", diff_line).tobytes(),
-                buf_type=gdal.GDT_Float64,
-            )
+
+    windows = block_windows(golden_band, window_pixels=WINDOW_PIXELS)
+    if num_threads > 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_threads)
+        # windows are submitted ahead, and processed in order
+        pending = collections.deque()
+        for window in windows:
+            pending.append((window, executor.submit(compare, window)))
+            if len(pending) >= 2 * num_threads:
+                break
+
+        def results():
+            while pending:
+                window, future = pending.popleft()
+                next_window = next(windows, None)
+                if next_window is not None:
+                    pending.append((next_window, executor.submit(compare, next_window)))
+                yield window, future.result()
+
+    else:
+        executor = None
+
+        def results():
+            for window in windows:
+                yield window, compare(window)
+
+    first_diff_window = None
+    try:
+        for window, result in results():
+            if result is None:
+                continue
+            window_diff_count, window_max_diff, diffs = result
+            diff_count += window_diff_count
+            max_diff = max(max_diff, window_max_diff)
+            if out_db is not None:
+                xoff, yoff, win_xsize, win_ysize = window
+                out_db.GetRasterBand(1).WriteRaster(
+                    xoff,
+                    yoff,
+                    win_xsize,
+                    win_ysize,
+                    diffs,
+                    buf_type=gdal.GDT_Float64,
+                )
+            if fail_fast and window_diff_count:
+                first_diff_window = window
+                break
+    finally:
+        if executor is not None:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
     my_print("  Pixels Differing: " + str(diff_count))
     my_print("  Maximum Pixel Difference: " + str(max_diff))
+    if first_diff_window is not None:
+        my_print(
+            "  Comparison stopped at the first difference, in window "
+            "(xoff=%d, yoff=%d, xsize=%d, ysize=%d)" % first_diff_window
+        )
     if out_db is not None:
         my_print("  Wrote Diffs to: %s" % diff_fn)
 
+    return diff_count
+
 
 #######################################################
 
@@ -185,8 +324,13 @@ def compare_band(golden_band, new_band, id, options=None):
         my_print("  Golden: " + str(golden_band_checksum))
         my_print("  New:    " + str(new_band_checksum))
         if found_diff == 0:
-            compare_image_pixels(golden_band, new_band, id, options)
-        found_diff += 1
+            diff_count = compare_image_pixels(golden_band, new_band, id, options)
+            if diff_count == 0 and get_option_value(options, "TOLERANCE"):
+                my_print("  All differences are within the tolerance.")
+            else:
+                found_diff += 1
+        else:
+            found_diff += 1
     else:
         # check a bit deeper in case of Float data type for which the Checksum() function is not reliable
         if golden_band.DataType in (gdal.GDT_Float32, gdal.GDT_Float64):
@@ -363,6 +507,8 @@ def compare_db(golden_db, new_db, options=None):
                 str(i + 1),
                 options,
             )
+            if found_diff and "FAIL_FAST" in options:
+                break
 
     return found_diff
 
@@ -399,6 +545,24 @@ def compare_sds(golden_db, new_db, options=None):
 #######################################################
 
 
+def open_db(filename, options):
+    # With several threads, bands are read concurrently from thread-safe
+    # datasets, when the driver allows it
+    if get_num_threads(options) > 1:
+        # OpenEx() raises or returns None, depending on whether exceptions
+        # are enabled
+        try:
+            ds = gdal.OpenEx(filename, gdal.OF_RASTER | gdal.OF_THREAD_SAFE)
+        except Exception:
+            ds = None
+        if ds is not None:
+            return ds
+    return gdal.Open(filename)
+
+
+#######################################################
+
+
 def find_diff(
     golden_file: PathLikeOrStr,
     new_file: PathLikeOrStr,
@@ -460,8 +624,8 @@ def find_diff(
                     )
 
     # compare as GDAL Datasets.
-    golden_db = gdal.Open(golden_file)
-    new_db = gdal.Open(new_file)
+    golden_db = open_db(golden_file, options)
+    new_db = open_db(new_file, options)
     found_diff += compare_db(golden_db, new_db, options)
 
     if check_sds:
@@ -479,6 +643,8 @@ def Usage(isError=True):
     print("                      [-dumpdiffs] [-skip_binary] [-skip_overviews]", file=f)
     print("                      [-skip_geolocation] [-skip_geotransform]", file=f)
     print("                      [-skip_metadata] [-skip_rpc] [-skip_srs]", file=f)
+    print("                      [-tolerance <value>] [-fail_fast]", file=f)
+    print("                      [-threads <n>|ALL_CPUS]", file=f)
     print("                      [-sds] <golden_file> <new_file>", file=f)
     return 2 if isError else 0
 
@@ -536,6 +702,20 @@ def main(argv=sys.argv):
         elif argv[i] == "-skip_srs":
             options.append("SKIP_SRS")
 
+        elif argv[i] in ("-fail_fast", "--fail-fast"):
+            options.append("FAIL_FAST")
+
+        elif argv[i] == "-tolerance" and i + 1 < len(argv):
+            i = i + 1
+            options.append("TOLERANCE=" + argv[i])
+
+        elif argv[i] == "-threads" and i + 1 < len(argv):
+            i = i + 1
+            if argv[i].upper() != "ALL_CPUS" and not argv[i].isdigit():
+                my_print("Invalid value for -threads: " + argv[i])
+                return Usage()
+            options.append("NUM_THREADS=" + argv[i])
+
         elif golden_file is None:
             golden_file = argv[i]
 
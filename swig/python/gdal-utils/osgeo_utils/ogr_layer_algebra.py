@@ -12,12 +12,22 @@
 # SPDX-License-Identifier: MIT
 # ******************************************************************************
 
+import collections
+import concurrent.futures
 import os
 import sys
+import threading
 
 from osgeo import gdal, ogr, osr
+from osgeo_utils.auxiliary.rtree import RTree
 from osgeo_utils.auxiliary.util import enable_gdal_exceptions
 
+# Operations supported by the -index mode
+INDEXED_OPERATIONS = ("Union", "Intersection", "Clip", "Erase")
+
+# Number of input features processed at once by a worker thread
+CHUNK_SIZE = 64
+
 ###############################################################################
 
 
@@ -32,7 +42,8 @@ Usage: ogr_layer_algebra [--help] [--help-general]
                             [-opt <NAME>=<VALUE>]...
                             [-f <format_name>] [-dsco <NAME>=<VALUE>]... [-lco <NAME>=<VALUE>]...
                             [-input_fields {NONE|ALL|<fld1>,<fl2>,...<fldN>}] [-method_fields {NONE|ALL|<fld1>,<fl2>,...<fldN>}]
-                            [-nlt <geom_type>] [-a_srs <srs_def>]""",
+                            [-nlt <geom_type>] [-a_srs <srs_def>]
+                            [-index] [-threads <n>|ALL_CPUS]""",
         file=sys.stderr if isError else sys.stdout,
     )
     return 2 if isError else 0
@@ -152,6 +163,437 @@ def CreateLayer(
     return output_lyr
 
 
+###############################################################################
+# Indexed layer algebra.
+#
+# The OGRLayer methods set a spatial filter on the method layer for each
+# input feature, and read the method layer again. When the method layer has
+# no spatial index, or is slow to read, this is O(N*M) I/O. The functions
+# below load the method layer once, index the envelopes of its features in
+# an R-tree, and prepare their geometries only once, with results identical
+# to the ones of the OGRLayer methods.
+
+
+def FetchOption(opt, name, default=None):
+    for val in opt:
+        if val.lower().find(name.lower() + "=") == 0:
+            return val[len(name) + 1 :]
+    return default
+
+
+def TestBoolOption(opt, name, default):
+    val = FetchOption(opt, name, default)
+    return val.upper() not in ("NO", "FALSE", "OFF", "0")
+
+
+def SetResultSchema(output_lyr, input_defn, method_defn, combined, opt):
+    """
+    Create the fields of the result layer if it has none, as the OGRLayer
+    methods do, and return the maps from the fields of the input and method
+    layers to the fields of the result layer.
+    """
+    input_map = [-1] * input_defn.GetFieldCount()
+    method_map = [-1] * method_defn.GetFieldCount() if combined else None
+    if not TestBoolOption(opt, "ADD_FIELDS", "YES"):
+        return input_map, method_map
+
+    input_prefix = FetchOption(opt, "INPUT_PREFIX")
+    method_prefix = FetchOption(opt, "METHOD_PREFIX")
+    skip_failures = TestBoolOption(opt, "SKIP_FAILURES", "NO")
+    result_defn = output_lyr.GetLayerDefn()
+
+    if result_defn.GetFieldCount() > 0:
+        # the user has defined the schema of the output layer
+        for idx in range(input_defn.GetFieldCount()):
+            name = input_defn.GetFieldDefn(idx).GetName()
+            input_map[idx] = result_defn.GetFieldIndex((input_prefix or "") + name)
+        if method_map is not None:
+            for idx in range(method_defn.GetFieldCount()):
+                name = method_defn.GetFieldDefn(idx).GetName()
+                method_map[idx] = result_defn.GetFieldIndex(
+                    (method_prefix or "") + name
+                )
+        return input_map, method_map
+
+    input_names = set()
+    method_names = set()
+    if combined and input_prefix is None and method_prefix is None:
+        input_names = set(
+            input_defn.GetFieldDefn(idx).GetName()
+            for idx in range(input_defn.GetFieldCount())
+        )
+        method_names = set(
+            method_defn.GetFieldDefn(idx).GetName()
+            for idx in range(method_defn.GetFieldCount())
+        )
+
+    def CreateFields(layer_defn, field_map, prefix, other_names, default_prefix):
+        for idx in range(layer_defn.GetFieldCount()):
+            fld_defn = layer_defn.GetFieldDefn(idx)
+            name = fld_defn.GetName()
+            if prefix is not None:
+                name = prefix + name
+            elif name in other_names:
+                # Field of same name present in the other layer
+                name = default_prefix + name
+            new_fld_defn = ogr.FieldDefn(name, fld_defn.GetType())
+            new_fld_defn.SetSubType(fld_defn.GetSubType())
+            new_fld_defn.SetWidth(fld_defn.GetWidth())
+            new_fld_defn.SetPrecision(fld_defn.GetPrecision())
+            new_fld_defn.SetNullable(fld_defn.IsNullable())
+            new_fld_defn.SetDefault(fld_defn.GetDefault())
+            try:
+                ret = output_lyr.CreateField(new_fld_defn)
+            except RuntimeError:
+                if not skip_failures:
+                    raise
+                continue
+            if ret != 0:
+                if not skip_failures:
+                    raise RuntimeError(
+                        'Cannot create field "%s" in layer "%s"'
+                        % (name, output_lyr.GetName())
+                    )
+                continue
+            field_map[idx] = output_lyr.GetLayerDefn().GetFieldCount() - 1
+
+    if TestBoolOption(opt, "ADD_INPUT_FIELDS", "YES"):
+        CreateFields(input_defn, input_map, input_prefix, method_names, "input_")
+    if method_map is not None and TestBoolOption(opt, "ADD_METHOD_FIELDS", "YES"):
+        CreateFields(method_defn, method_map, method_prefix, input_names, "method_")
+
+    return input_map, method_map
+
+
+def PromoteToMulti(geom):
+    geom_type = ogr.GT_Flatten(geom.GetGeometryType())
+    if geom_type == ogr.wkbPoint:
+        return ogr.ForceToMultiPoint(geom)
+    if geom_type == ogr.wkbPolygon:
+        return ogr.ForceToMultiPolygon(geom)
+    if geom_type == ogr.wkbLineString:
+        return ogr.ForceToMultiLineString(geom)
+    return geom
+
+
+def GetAttributes(feature, attr_defn):
+    """Return a copy of the fields of a feature, without its geometry."""
+    attributes = ogr.Feature(attr_defn)
+    attributes.SetFromWithMap(feature, 1, list(range(attr_defn.GetFieldCount())))
+    return attributes
+
+
+def GetAttributesDefn(layer_defn):
+    attr_defn = ogr.FeatureDefn(layer_defn.GetName())
+    attr_defn.SetGeomType(ogr.wkbNone)
+    for idx in range(layer_defn.GetFieldCount()):
+        attr_defn.AddFieldDefn(layer_defn.GetFieldDefn(idx))
+    return attr_defn
+
+
+class MethodLayerIndex:
+    """
+    The features of the method layer with a geometry, held in memory with
+    their geometries indexed by envelope.
+    """
+
+    def __init__(self, method_lyr, use_prepared_geometries):
+        self.use_prepared_geometries = use_prepared_geometries
+        attr_defn = GetAttributesDefn(method_lyr.GetLayerDefn())
+        self.attributes = []
+        self.geometries = []
+        envelopes = []
+        method_lyr.ResetReading()
+        for feat in method_lyr:
+            geom = feat.GetGeometryRef()
+            if geom is None:
+                continue
+            self.attributes.append(GetAttributes(feat, attr_defn))
+            self.geometries.append(geom.Clone())
+            envelopes.append(geom.GetEnvelope())
+        self.tree = RTree(zip(envelopes, range(len(envelopes))))
+        # A prepared geometry holds its own GEOS context, and must not be
+        # used by several threads at once: each thread prepares its own.
+        self.local = threading.local()
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def GetPrepared(self, idx):
+        prepared_geometries = getattr(self.local, "prepared_geometries", None)
+        if prepared_geometries is None:
+            prepared_geometries = self.local.prepared_geometries = {}
+        prepared = prepared_geometries.get(idx)
+        if prepared is None:
+            prepared = self.geometries[idx].CreatePreparedGeometry()
+            prepared_geometries[idx] = prepared
+        return prepared
+
+    def Candidates(self, geom):
+        """
+        Return the indices of the features whose geometry intersects geom,
+        as the spatial filter set from geom would select them.
+        """
+        min_x, max_x, min_y, max_y = geom.GetEnvelope()
+        indices = self.tree.query_indices(min_x, max_x, min_y, max_y)
+        if self.use_prepared_geometries:
+            return [idx for idx in indices if self.GetPrepared(idx).Intersects(geom)]
+        return [idx for idx in indices if self.geometries[idx].Intersects(geom)]
+
+
+class LayerAlgebraContext:
+    """Options of an indexed operation, and the handling of GEOS failures."""
+
+    def __init__(self, op_str, output_lyr, opt):
+        self.op_str = op_str
+        self.skip_failures = TestBoolOption(opt, "SKIP_FAILURES", "NO")
+        self.promote_to_multi = TestBoolOption(opt, "PROMOTE_TO_MULTI", "NO")
+        self.pretest_containment = TestBoolOption(opt, "PRETEST_CONTAINMENT", "NO")
+        self.use_prepared_geometries = TestBoolOption(
+            opt, "USE_PREPARED_GEOMETRIES", "YES"
+        )
+        self.keep_lower_dim = TestBoolOption(
+            opt, "KEEP_LOWER_DIMENSION_GEOMETRIES", "YES"
+        )
+        # require that the result layer is of geom type unknown
+        if self.keep_lower_dim and output_lyr.GetGeomType() != ogr.wkbUnknown:
+            self.keep_lower_dim = False
+
+    def Apply(self, func, *args):
+        """
+        Return func(*args), or None if it failed and failures are skipped.
+        """
+        try:
+            result = func(*args)
+        except RuntimeError:
+            if not self.skip_failures:
+                raise
+            return None
+        if result is None and not self.skip_failures:
+            raise RuntimeError("%s operation failed" % self.op_str)
+        return result
+
+    def IsKept(self, x_geom, y_geom, z_geom):
+        return not (
+            z_geom.IsEmpty()
+            or (
+                not self.keep_lower_dim
+                and x_geom.GetDimension() == y_geom.GetDimension()
+                and z_geom.GetDimension() < x_geom.GetDimension()
+            )
+        )
+
+
+def OverlayFeature(ctx, index, x_geom):
+    """
+    Compute the result of the operation for the geometry of an input feature.
+
+    Return the list of (geometry, method feature index or None) result
+    pieces, and the list of indices of the method features intersecting
+    x_geom.
+    """
+    results = []
+    candidates = index.Candidates(x_geom)
+
+    if ctx.op_str == "Intersection":
+        x_prepared = None
+        if ctx.pretest_containment and ctx.use_prepared_geometries:
+            x_prepared = x_geom.CreatePreparedGeometry()
+        for idx in candidates:
+            y_geom = index.geometries[idx]
+            if x_prepared is not None and ctx.Apply(x_prepared.Contains, y_geom):
+                results.append((y_geom.Clone(), idx))
+                continue
+            z_geom = ctx.Apply(x_geom.Intersection, y_geom)
+            if z_geom is not None and ctx.IsKept(x_geom, y_geom, z_geom):
+                results.append((z_geom, idx))
+
+    elif ctx.op_str == "Union":
+        x_geom_diff = x_geom.Clone()
+        for idx in candidates:
+            y_geom = index.geometries[idx]
+            z_geom = ctx.Apply(x_geom.Intersection, y_geom)
+            if z_geom is None or not ctx.IsKept(x_geom, y_geom, z_geom):
+                continue
+            results.append((z_geom, idx))
+            x_geom_diff_new = ctx.Apply(x_geom_diff.Difference, y_geom)
+            if x_geom_diff_new is not None:
+                x_geom_diff = x_geom_diff_new
+        if not x_geom_diff.IsEmpty():
+            results.append((x_geom_diff, None))
+
+    elif ctx.op_str == "Clip":
+        geom = None
+        for idx in candidates:
+            y_geom = index.geometries[idx]
+            if geom is None:
+                geom = y_geom.Clone()
+            else:
+                geom_new = ctx.Apply(geom.Union, y_geom)
+                if geom_new is not None:
+                    geom = geom_new
+        if geom is not None:
+            z_geom = ctx.Apply(x_geom.Intersection, geom)
+            if z_geom is not None and not z_geom.IsEmpty():
+                results.append((z_geom, None))
+
+    elif ctx.op_str == "Erase":
+        geom = x_geom.Clone()
+        for idx in candidates:
+            geom_new = ctx.Apply(geom.Difference, index.geometries[idx])
+            if geom_new is not None:
+                geom = geom_new
+                if geom.IsEmpty():
+                    break
+        if not geom.IsEmpty():
+            results.append((geom, None))
+
+    return results, candidates
+
+
+def OverlayChunk(ctx, index, features):
+    """Return the result of OverlayFeature() for a list of input features."""
+    overlays = []
+    for x in features:
+        x_geom = x.GetGeometryRef()
+        overlays.append(None if x_geom is None else OverlayFeature(ctx, index, x_geom))
+    return overlays
+
+
+def ReadChunks(lyr, chunk_size=CHUNK_SIZE):
+    """Iterate over lists of consecutive features of a layer."""
+    chunk = []
+    lyr.ResetReading()
+    for feat in lyr:
+        chunk.append(feat)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def IndexedLayerAlgebra(
+    op_str, input_lyr, method_lyr, output_lyr, opt, callback=None, threads=None
+):
+    """
+    Perform a layer algebra operation, with the method layer loaded in memory
+    and indexed, instead of filtering it for each input feature.
+
+    op_str is one of INDEXED_OPERATIONS, and opt the options of the
+    corresponding OGRLayer method. Return ogr.OGRERR_NONE, or raise an
+    exception on failure (unless SKIP_FAILURES=YES).
+
+    With threads > 1, the input features are read in chunks of consecutive
+    features, whose geometric operations run in a thread pool. Features are
+    read and written in the calling thread, in the order of the input layer,
+    so that the output layer (including the FIDs it assigns) is the same
+    as with a single thread.
+    """
+    if op_str not in INDEXED_OPERATIONS:
+        raise ValueError("Unsupported operation for -index: %s" % op_str)
+
+    ctx = LayerAlgebraContext(op_str, output_lyr, opt)
+    combined = op_str in ("Intersection", "Union")
+    input_map, method_map = SetResultSchema(
+        output_lyr,
+        input_lyr.GetLayerDefn(),
+        method_lyr.GetLayerDefn(),
+        combined,
+        opt,
+    )
+    result_defn = output_lyr.GetLayerDefn()
+    input_attr_defn = GetAttributesDefn(input_lyr.GetLayerDefn())
+
+    index = MethodLayerIndex(method_lyr, ctx.use_prepared_geometries)
+    # For Union, the method geometries minus the input geometries
+    method_diffs = list(index.geometries) if op_str == "Union" else None
+
+    progress_max = input_lyr.GetFeatureCount(force=0)
+    if method_diffs is not None:
+        progress_max += method_lyr.GetFeatureCount(force=0)
+    progress_max = max(progress_max, 1)
+    progress_counter = 0
+
+    def WriteFeature(x_attributes, y_idx, geom):
+        z = ogr.Feature(result_defn)
+        if x_attributes is not None:
+            z.SetFromWithMap(x_attributes, 1, input_map)
+        if y_idx is not None:
+            z.SetFromWithMap(index.attributes[y_idx], 1, method_map)
+        if ctx.promote_to_multi:
+            geom = PromoteToMulti(geom)
+        z.SetGeometryDirectly(geom)
+        try:
+            ret = output_lyr.CreateFeature(z)
+        except RuntimeError:
+            if not ctx.skip_failures:
+                raise
+            return
+        if ret != 0 and not ctx.skip_failures:
+            raise RuntimeError(
+                "Cannot create feature in layer %s" % output_lyr.GetName()
+            )
+
+    def WriteChunk(features, overlays):
+        nonlocal progress_counter
+        for x, overlay in zip(features, overlays):
+            if callback is not None:
+                callback(progress_counter / progress_max)
+            progress_counter += 1
+            if overlay is None:
+                continue
+
+            results, candidates = overlay
+            if results:
+                x_attributes = GetAttributes(x, input_attr_defn)
+                for geom, y_idx in results:
+                    WriteFeature(x_attributes, y_idx if combined else None, geom)
+
+            # Done in input order, as the result of successive differences
+            # depends on their order
+            if method_diffs is not None:
+                x_geom = x.GetGeometryRef()
+                for idx in candidates:
+                    diff = ctx.Apply(method_diffs[idx].Difference, x_geom)
+                    if diff is not None:
+                        method_diffs[idx] = diff
+
+    if threads is None or threads <= 1:
+        for features in ReadChunks(input_lyr):
+            WriteChunk(features, OverlayChunk(ctx, index, features))
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            pending = collections.deque()
+            try:
+                for features in ReadChunks(input_lyr):
+                    pending.append(
+                        (features, executor.submit(OverlayChunk, ctx, index, features))
+                    )
+                    if len(pending) >= 2 * threads:
+                        features, future = pending.popleft()
+                        WriteChunk(features, future.result())
+                while pending:
+                    features, future = pending.popleft()
+                    WriteChunk(features, future.result())
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    if method_diffs is not None:
+        for idx, geom in enumerate(method_diffs):
+            if callback is not None:
+                callback(progress_counter / progress_max)
+            progress_counter += 1
+            if not geom.IsEmpty():
+                WriteFeature(None, idx, geom)
+
+    if callback is not None:
+        callback(1.0)
+
+    return ogr.OGRERR_NONE
+
+
 ###############################################################################
 
 
@@ -176,6 +618,8 @@ def main(argv=sys.argv):
     geom_type = ogr.wkbUnknown
     srs_name = None
     srs = None
+    use_index = False
+    threads = None
 
     argv = ogr.GeneralCmdLineProcessor(argv)
     if argv is None:
@@ -317,6 +761,22 @@ def main(argv=sys.argv):
         elif arg == "-overwrite":
             overwrite = True
 
+        elif arg == "-index":
+            use_index = True
+
+        elif (arg == "-threads" or arg == "-j") and i + 1 < len(argv):
+            i = i + 1
+            if argv[i].upper() == "ALL_CPUS":
+                threads = gdal.GetNumCPUs()
+            else:
+                try:
+                    threads = int(argv[i])
+                except ValueError:
+                    threads = 0
+                if threads < 1:
+                    print("Invalid value for -threads: %s" % argv[i], file=sys.stderr)
+                    return 1
+
         elif arg == "-q" or arg == "-quiet":
             quiet = True
 
@@ -542,11 +1002,39 @@ def main(argv=sys.argv):
                 if output_lyr is None:
                     return 1
 
-    op = getattr(input_lyr, op_str)
-    if not quiet:
-        ret = op(method_lyr, output_lyr, options=opt, callback=gdal.TermProgress_nocb)
+    if threads is not None and threads > 1:
+        if op_str in INDEXED_OPERATIONS:
+            use_index = True
+        else:
+            print(
+                "Warning: -threads is not supported for %s, and is ignored." % op_str,
+                file=sys.stderr,
+            )
+
+    if use_index and op_str not in INDEXED_OPERATIONS:
+        print(
+            "Warning: -index is not supported for %s, and is ignored." % op_str,
+            file=sys.stderr,
+        )
+        use_index = False
+
+    callback = None if quiet else gdal.TermProgress_nocb
+    if use_index:
+        ret = IndexedLayerAlgebra(
+            op_str,
+            input_lyr,
+            method_lyr,
+            output_lyr,
+            opt,
+            callback=callback,
+            threads=threads,
+        )
     else:
-        ret = op(method_lyr, output_lyr, options=opt)
+        op = getattr(input_lyr, op_str)
+        if not quiet:
+            ret = op(method_lyr, output_lyr, options=opt, callback=callback)
+        else:
+            ret = op(method_lyr, output_lyr, options=opt)
 
     input_ds = None
     method_ds = None
@@ -13,10 +13,15 @@
 # SPDX-License-Identifier: MIT
 ###############################################################################
 
+import collections
+import concurrent.futures
+import contextlib
 import glob
 import os
 import os.path
+import queue
 import sys
+import threading
 from typing import Optional, Sequence
 
 from osgeo import gdal, ogr, osr
@@ -34,11 +39,13 @@ def Usage(isError):
     print("            [-dsco <NAME>=<VALUE>]... [-lco <NAME>=<VALUE>]...", file=f)
     print("            [-s_srs <srs_def>] [-t_srs <srs_def>|-a_srs <srs_def>]", file=f)
     print("            [-progress] [-skipfailures] [--help-general]", file=f)
+    print("            [-bulk] [-threads <n>|ALL_CPUS]", file=f)
     print("", file=f)
     print("Options specific to -single:", file=f)
     print("            [-field_strategy {FirstLayer|Union|Intersection}]", file=f)
     print("            [-src_layer_field_name <name>]", file=f)
     print("            [-src_layer_field_content <layer_name_template>]", file=f)
+    print("            [-arrow]", file=f)
     print("", file=f)
     print(
         "* layer_name_template can contain the following substitutable " "variables:",
@@ -175,6 +182,9 @@ def process(argv, progress=None, progress_arg=None):
     t_srs = None
     dsco = []
     lco = []
+    arrow = False
+    bulk = False
+    threads = None
     # WARNING: if adding a new option, make sure to update _gpkg_ogrmerge()
     # optimized code path, or use the general case.
 
@@ -208,6 +218,22 @@ def process(argv, progress=None, progress_arg=None):
             update = True
         elif arg == "-single":
             single_layer = True
+        elif arg == "-arrow":
+            arrow = True
+        elif arg == "-bulk":
+            bulk = True
+        elif arg == "-threads" and i + 1 < len(argv):
+            i = i + 1
+            if argv[i].upper() == "ALL_CPUS":
+                threads = gdal.GetNumCPUs()
+            else:
+                try:
+                    threads = int(argv[i])
+                except ValueError:
+                    threads = 0
+                if threads < 1:
+                    print("Invalid value for -threads: %s" % argv[i], file=sys.stderr)
+                    return 1
         elif arg == "-a_srs" and i + 1 < len(argv):
             i = i + 1
             a_srs = argv[i]
@@ -298,12 +324,57 @@ def process(argv, progress=None, progress_arg=None):
         lco=lco,
         progress_callback=progress,
         progress_arg=progress_arg,
+        arrow=arrow,
+        threads=threads,
+        bulk=bulk,
     )
 
 
 #############################################################################
 
 
+def _build_layer_name_single_mode(
+    src_layer_field_content,
+    src_ds_idx,
+    src_dsname,
+    src_lyr_idx,
+    src_lyr_name,
+):
+    try:
+        src_lyr_name = src_lyr_name.decode("utf-8")
+    except AttributeError:
+        pass
+
+    layer_name = src_layer_field_content
+    basename = None
+    if os.path.exists(src_dsname):
+        basename = os.path.basename(src_dsname)
+        if "." in basename:
+            basename = ".".join(basename.split(".")[0:-1])
+
+    if basename == src_lyr_name:
+        layer_name = layer_name.replace("{AUTO_NAME}", basename)
+    elif basename is None:
+        layer_name = layer_name.replace(
+            "{AUTO_NAME}", "Dataset%d_%s" % (src_ds_idx, src_lyr_name)
+        )
+    else:
+        layer_name = layer_name.replace("{AUTO_NAME}", basename + "_" + src_lyr_name)
+
+    if basename is not None:
+        layer_name = layer_name.replace("{DS_BASENAME}", basename)
+    else:
+        layer_name = layer_name.replace("{DS_BASENAME}", src_dsname)
+    layer_name = layer_name.replace("{DS_NAME}", "%s" % src_dsname)
+    layer_name = layer_name.replace("{DS_INDEX}", "%d" % src_ds_idx)
+    layer_name = layer_name.replace("{LAYER_NAME}", src_lyr_name)
+    layer_name = layer_name.replace("{LAYER_INDEX}", "%d" % src_lyr_idx)
+    return layer_name
+
+
+#############################################################################
+
+
 def _build_layer_name_non_single_mode(
     layer_name_template,
     src_ds_idx,
@@ -354,6 +425,103 @@ def _build_layer_name_non_single_mode(
 #############################################################################
 
 
+def _map_in_order(func, args_list, threads):
+    """
+    Yield (args, func(*args)) for each args of args_list, in order.
+
+    With threads > 1, func runs in a thread pool, on a bounded number of
+    args ahead of the one being yielded.
+    """
+
+    if threads is None or threads <= 1:
+        for args in args_list:
+            yield args, func(*args)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = collections.deque()
+        try:
+            for args in args_list:
+                pending.append((args, executor.submit(func, *args)))
+                if len(pending) >= 2 * threads:
+                    args, future = pending.popleft()
+                    yield args, future.result()
+            while pending:
+                args, future = pending.popleft()
+                yield args, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _iter_in_order(func, args_list, threads, queue_size=4):
+    """
+    Yield (args, iterator over func(*args)) for each args of args_list, in
+    order, func being a generator function.
+
+    With threads > 1, the generators of up to threads args run concurrently
+    in a thread pool, each one producing at most queue_size items ahead of
+    the consumer, so that memory use stays bounded. Each iterator must be
+    consumed before the next one is requested.
+    """
+
+    if threads is None or threads <= 1:
+        for args in args_list:
+            yield args, func(*args)
+        return
+
+    stop = threading.Event()
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(q, args):
+        try:
+            for item in func(*args):
+                if not put(q, (True, item)):
+                    return
+        except Exception as e:
+            put(q, (False, e))
+        else:
+            put(q, (False, None))
+
+    def consume(q):
+        while True:
+            ok, item = q.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = collections.deque()
+        try:
+            for args in args_list:
+                q = queue.Queue(maxsize=queue_size)
+                pending.append((args, q, executor.submit(produce, q, args)))
+                if len(pending) >= threads:
+                    args, q, _ = pending.popleft()
+                    yield args, consume(q)
+            while pending:
+                args, q, _ = pending.popleft()
+                yield args, consume(q)
+        finally:
+            # Also stops the producer of the last yielded args, if its
+            # iterator was not consumed
+            stop.set()
+            for _, _, future in pending:
+                future.cancel()
+
+
+#############################################################################
+
+
 def _quote_literal(x):
     return x.replace("'", "''")
 
@@ -485,6 +653,157 @@ def _gpkg_get_srs_id(ds, lyr):
     return srs_id
 
 
+#############################################################################
+# Collect the triggers of a layer that we can safely temporary disable,
+# and drop them. Return the SQL statements to re-install them.
+
+
+def _gpkg_drop_triggers(ds, lyr, rtree_prefix):
+    sql = (
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND (name LIKE '%s_%%' OR name LIKE 'trigger_insert_feature_count_%s' OR name LIKE 'trigger_delete_feature_count_%s')"
+        % (
+            _quote_literal(rtree_prefix),
+            _quote_literal(lyr.GetName()),
+            _quote_literal(lyr.GetName()),
+        )
+    )
+    triggers = []
+    sql_lyr = ds.ExecuteSQL(sql)
+    for f in sql_lyr:
+        trigger_name = f["name"]
+        ds.ExecuteSQL('DROP TRIGGER "%s"' % _quote_id(trigger_name))
+        triggers.append(f["sql"])
+    ds.ReleaseResultSet(sql_lyr)
+    return triggers
+
+
+#############################################################################
+
+
+def _gpkg_get_normalized_field_names(ds, lyr):
+    fields = []
+    sql_lyr = ds.ExecuteSQL("PRAGMA table_info('%s')" % _quote_literal(lyr.GetName()))
+    for f in sql_lyr:
+        col_name = f["name"]
+        if col_name == lyr.GetFIDColumn():
+            fields.append("__FID__")
+        elif col_name == lyr.GetGeometryColumn():
+            fields.append("__GEOMETRY_COLUMN__")
+        else:
+            fields.append(col_name)
+    ds.ReleaseResultSet(sql_lyr)
+    return fields
+
+
+#############################################################################
+# Build the list of columns of the source layer to select to insert them
+# into the destination layer
+
+
+def _gpkg_get_select_fields(
+    src_ds, src_lyr, src_srs_id, dst_ds, dst_lyr, dst_srs_id, s_srs, t_srs
+):
+    if (
+        src_srs_id == dst_srs_id
+        and s_srs is None
+        and t_srs is None
+        and _gpkg_get_normalized_field_names(src_ds, src_lyr)
+        == _gpkg_get_normalized_field_names(dst_ds, dst_lyr)
+    ):
+        # If fields in source and target layers are ordered the same, using * is slightly faster
+        # than selecting individual fields
+        return "*"
+
+    fields = '"%s"' % _quote_id(src_lyr.GetFIDColumn())
+    if src_lyr.GetGeomType() != ogr.wkbNone:
+        if src_srs_id == dst_srs_id:
+            fields += ', "%s"' % _quote_id(src_lyr.GetGeometryColumn())
+        elif t_srs:
+            # Reproject
+            if s_srs:
+                s_srs_obj = osr.SpatialReference()
+                s_srs_obj.SetFromUserInput(s_srs)
+                assert s_srs_obj.GetAuthorityName(None) == "EPSG"
+                src_srs_id = int(s_srs_obj.GetAuthorityCode(None))
+                fields += ', ST_Transform(SetSRID("%s", %d), %d)' % (
+                    _quote_id(src_lyr.GetGeometryColumn()),
+                    src_srs_id,
+                    dst_srs_id,
+                )
+            else:
+                fields += ', ST_Transform("%s", %d)' % (
+                    _quote_id(src_lyr.GetGeometryColumn()),
+                    dst_srs_id,
+                )
+        else:
+            # Just remap the geometry SRID to the one of the destination dataset
+            fields += ', SetSRID("%s", %d)' % (
+                _quote_id(src_lyr.GetGeometryColumn()),
+                dst_srs_id,
+            )
+    for field_idx in range(src_lyr.GetLayerDefn().GetFieldCount()):
+        fields += ', "%s"' % _quote_id(
+            src_lyr.GetLayerDefn().GetFieldDefn(field_idx).GetName()
+        )
+    return fields
+
+
+#############################################################################
+# Return the geometry types of the gpkg_geom_* extensions of a layer
+
+
+def _gpkg_get_geometry_extensions(ds, lyr):
+    sql_lyr = ds.ExecuteSQL(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'gpkg_extensions'"
+    )
+    has_gpkg_extensions = sql_lyr.GetFeatureCount() == 1
+    ds.ReleaseResultSet(sql_lyr)
+    geom_types = []
+    if has_gpkg_extensions:
+        sql = (
+            "SELECT extension_name FROM gpkg_extensions WHERE table_name = '%s' AND column_name = '%s' AND extension_name LIKE 'gpkg_geom_%%'"
+            % (
+                _quote_literal(lyr.GetName()),
+                _quote_literal(lyr.GetGeometryColumn()),
+            )
+        )
+        sql_lyr = ds.ExecuteSQL(sql)
+        for f in sql_lyr:
+            geom_types.append(f.GetField(0)[len("gpkg_geom_") :])
+        ds.ReleaseResultSet(sql_lyr)
+    return geom_types
+
+
+#############################################################################
+
+
+def _gpkg_register_geometry_extensions(ds, lyr, geom_types):
+    for geom_type in geom_types:
+        ds.ReleaseResultSet(
+            ds.ExecuteSQL(
+                "SELECT RegisterGeometryExtension('%s', '%s', '%s')"
+                % (
+                    _quote_literal(lyr.GetName()),
+                    _quote_literal(lyr.GetGeometryColumn()),
+                    geom_type,
+                )
+            )
+        )
+
+
+#############################################################################
+
+
+def _gpkg_update_extent(ds, lyr, extent):
+    if extent:
+        minx, maxx, miny, maxy = extent
+        sql = (
+            "UPDATE gpkg_contents SET min_x=%.18g, min_y=%.18g, max_x=%.18g, max_y=%.18g WHERE table_name = '%s'"
+            % (minx, miny, maxx, maxy, _quote_literal(lyr.GetName()))
+        )
+        ds.ExecuteSQL(sql)
+
+
 #############################################################################
 # Optimized implementation of general case for geopackage output, that can be used only:
 # - in non-single mode
@@ -506,6 +825,8 @@ def _gpkg_ogrmerge(
     lco: Optional[Sequence[str]] = None,
     progress_callback: Optional = None,
     progress_arg: Optional = None,
+    bulk: bool = False,
+    threads: Optional[int] = None,
 ):
 
     driver_name = "GPKG"
@@ -513,6 +834,31 @@ def _gpkg_ogrmerge(
     if drv is None:
         print("ERROR: Invalid driver: %s" % driver_name, file=sys.stderr)
         return 1
+
+    if bulk:
+        # The output dataset is a new file: no need to guard it against
+        # power failures while it is being written
+        with gdal.config_options(
+            {"OGR_SQLITE_SYNCHRONOUS": "OFF", "OGR_SQLITE_JOURNAL": "MEMORY"}
+        ):
+            dst_ds = drv.Create(dst_filename, 0, 0, 0, gdal.GDT_Unknown, dsco)
+        if dst_ds is None:
+            return 1
+        return _gpkg_ogrmerge_bulk(
+            dst_ds,
+            src_datasets,
+            layer_name_template,
+            skip_failures,
+            src_geom_types,
+            a_srs,
+            s_srs,
+            t_srs,
+            lco,
+            threads,
+            progress_callback,
+            progress_arg,
+        )
+
     dst_ds = drv.Create(dst_filename, 0, 0, 0, gdal.GDT_Unknown, dsco)
     if dst_ds is None:
         return 1
@@ -613,82 +959,11 @@ def _gpkg_ogrmerge(
                 src_srs_id = -1
                 dst_srs_id = -1
 
-            # Collect triggers that we can safely temporary disable, and drop them
-            sql = (
-                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND (name LIKE '%s_%%' OR name LIKE 'trigger_insert_feature_count_%s' OR name LIKE 'trigger_delete_feature_count_%s')"
-                % (
-                    _quote_literal(rtree_prefix),
-                    _quote_literal(lyr.GetName()),
-                    _quote_literal(lyr.GetName()),
-                )
-            )
-            triggers = []
-            sql_lyr = dst_ds.ExecuteSQL(sql)
-            for f in sql_lyr:
-                trigger_name = f["name"]
-                dst_ds.ExecuteSQL('DROP TRIGGER "%s"' % _quote_id(trigger_name))
-                triggers.append(f["sql"])
-            dst_ds.ReleaseResultSet(sql_lyr)
+            triggers = _gpkg_drop_triggers(dst_ds, lyr, rtree_prefix)
 
-            def get_normalized_field_names(ds, lyr):
-                fields = []
-                sql_lyr = ds.ExecuteSQL(
-                    "PRAGMA table_info('%s')" % _quote_literal(lyr.GetName())
-                )
-                for f in sql_lyr:
-                    col_name = f["name"]
-                    if col_name == lyr.GetFIDColumn():
-                        fields.append("__FID__")
-                    elif col_name == lyr.GetGeometryColumn():
-                        fields.append("__GEOMETRY_COLUMN__")
-                    else:
-                        fields.append(col_name)
-                ds.ReleaseResultSet(sql_lyr)
-                return fields
-
-            # Build list of field names to select
-            if (
-                src_srs_id == dst_srs_id
-                and s_srs is None
-                and t_srs is None
-                and get_normalized_field_names(src_ds, src_lyr)
-                == get_normalized_field_names(dst_ds, lyr)
-            ):
-                # If fields in source and target layers are ordered the same, using * is slightly faster
-                # than selecting individual fields
-                fields = "*"
-            else:
-                fields = '"%s"' % _quote_id(src_lyr.GetFIDColumn())
-                if has_geom:
-                    if src_srs_id == dst_srs_id:
-                        fields += ', "%s"' % _quote_id(src_lyr.GetGeometryColumn())
-                    elif t_srs:
-                        # Reproject
-                        if s_srs:
-                            s_srs_obj = osr.SpatialReference()
-                            s_srs_obj.SetFromUserInput(s_srs)
-                            assert s_srs_obj.GetAuthorityName(None) == "EPSG"
-                            src_srs_id = int(s_srs_obj.GetAuthorityCode(None))
-                            fields += ', ST_Transform(SetSRID("%s", %d), %d)' % (
-                                _quote_id(src_lyr.GetGeometryColumn()),
-                                src_srs_id,
-                                dst_srs_id,
-                            )
-                        else:
-                            fields += ', ST_Transform("%s", %d)' % (
-                                _quote_id(src_lyr.GetGeometryColumn()),
-                                dst_srs_id,
-                            )
-                    else:
-                        # Just remap the geometry SRID to the one of the destination dataset
-                        fields += ', SetSRID("%s", %d)' % (
-                            _quote_id(src_lyr.GetGeometryColumn()),
-                            dst_srs_id,
-                        )
-                for field_idx in range(src_lyr.GetLayerDefn().GetFieldCount()):
-                    fields += ', "%s"' % _quote_id(
-                        src_lyr.GetLayerDefn().GetFieldDefn(field_idx).GetName()
-                    )
+            fields = _gpkg_get_select_fields(
+                src_ds, src_lyr, src_srs_id, dst_ds, lyr, dst_srs_id, s_srs, t_srs
+            )
 
             dst_ds.ExecuteSQL(
                 "ATTACH DATABASE '%s' AS source_db" % _quote_literal(src_dsname)
@@ -767,40 +1042,16 @@ def _gpkg_ogrmerge(
 
             # Manually register gpkg_geom_* extensions, if not already done
             # at layer creation time.
-            sql_lyr = src_ds.ExecuteSQL(
-                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'gpkg_extensions'"
-            )
-            has_gpkg_extensions = sql_lyr.GetFeatureCount() == 1
-            src_ds.ReleaseResultSet(sql_lyr)
-            if has_geom and has_gpkg_extensions:
-                sql = (
-                    "SELECT extension_name FROM gpkg_extensions WHERE table_name = '%s' AND column_name = '%s' AND extension_name LIKE 'gpkg_geom_%%'"
-                    % (
-                        _quote_literal(src_lyr.GetName()),
-                        _quote_literal(src_lyr.GetGeometryColumn()),
-                    )
+            if has_geom:
+                _gpkg_register_geometry_extensions(
+                    dst_ds, lyr, _gpkg_get_geometry_extensions(src_ds, src_lyr)
                 )
-                sql_lyr = src_ds.ExecuteSQL(sql)
-                for f in sql_lyr:
-                    geom_type = f.GetField(0)[len("gpkg_geom_") :]
-                    dst_ds.ReleaseResultSet(
-                        dst_ds.ExecuteSQL(
-                            "SELECT RegisterGeometryExtension('%s', '%s', '%s')"
-                            % (lyr.GetName(), lyr.GetGeometryColumn(), geom_type)
-                        )
-                    )
-                src_ds.ReleaseResultSet(sql_lyr)
 
             # Update extent
             if has_geom:
-                res = src_lyr.GetExtent(force=1, can_return_null=True)
-                if res:
-                    minx, maxx, miny, maxy = res
-                    sql = (
-                        "UPDATE gpkg_contents SET min_x=%.18g, min_y=%.18g, max_x=%.18g, max_y=%.18g WHERE table_name = '%s'"
-                        % (minx, miny, maxx, maxy, _quote_literal(lyr.GetName()))
-                    )
-                    dst_ds.ExecuteSQL(sql)
+                _gpkg_update_extent(
+                    dst_ds, lyr, src_lyr.GetExtent(force=1, can_return_null=True)
+                )
 
             # Re-install triggers
             for sql in triggers:
@@ -833,6 +1084,598 @@ def _gpkg_ogrmerge(
     return 0
 
 
+#############################################################################
+# Bulk variant of _gpkg_ogrmerge(), enabled with -bulk:
+# - the source datasets are opened and inspected in parallel
+# - layers are created without spatial index, and R-trees are built once
+#   their features have been copied
+# - the copy runs with synchronous=OFF, in a transaction per group of
+#   attached source datasets (SQLite cannot detach a database read in a
+#   pending transaction)
+
+# Number of source datasets attached at once to the output dataset
+GPKG_BULK_ATTACHED_SOURCES = 8
+
+
+class _GpkgSourceLayer:
+    """What the copy of a source layer needs, collected by _gpkg_prepare_source()."""
+
+    def __init__(self, src_ds, src_lyr_idx, src_lyr):
+        self.src_lyr_idx = src_lyr_idx
+        self.feature_count = src_lyr.GetFeatureCount(force=0)
+        if src_lyr.GetGeomType() != ogr.wkbNone:
+            self.srs_id = _gpkg_get_srs_id(src_ds, src_lyr)
+            self.extent = src_lyr.GetExtent(force=1, can_return_null=True)
+            self.geometry_extensions = _gpkg_get_geometry_extensions(src_ds, src_lyr)
+        else:
+            self.srs_id = -1
+            self.extent = None
+            self.geometry_extensions = []
+
+
+def _gpkg_prepare_source(src_dsname, src_geom_types):
+    """
+    Open a source GeoPackage, and return it with the list of _GpkgSourceLayer
+    of its layers to copy, or None if it cannot be opened.
+    """
+
+    try:
+        src_ds = ogr.Open(src_dsname)
+    except RuntimeError:
+        src_ds = None
+    if src_ds is None:
+        return None
+    layers = []
+    for src_lyr_idx, src_lyr in enumerate(src_ds):
+        if src_geom_types:
+            gt = ogr.GT_Flatten(src_lyr.GetGeomType())
+            if gt not in src_geom_types:
+                continue
+        layers.append(_GpkgSourceLayer(src_ds, src_lyr_idx, src_lyr))
+    return src_ds, layers
+
+
+def _gpkg_ogrmerge_bulk(
+    dst_ds,
+    src_datasets: Sequence[str],
+    layer_name_template: str,
+    skip_failures: bool,
+    src_geom_types: Sequence[int],
+    a_srs: Optional[str],
+    s_srs: Optional[str],
+    t_srs: Optional[str],
+    lco: Sequence[str],
+    threads: Optional[int],
+    progress_callback: Optional = None,
+    progress_arg: Optional = None,
+):
+
+    create_spatial_index = "SPATIAL_INDEX=NO" not in [x.upper() for x in lco]
+    spatial_indexes = []
+
+    def copy_layer(src_ds_idx, src_dsname, schema_name, src_ds, layer):
+        src_lyr = src_ds.GetLayer(layer.src_lyr_idx)
+
+        has_geom = src_lyr.GetGeomType() != ogr.wkbNone
+        modified_lco = list(lco)
+        if has_geom and not any(
+            opt.upper().startswith("GEOMETRY_NAME=") for opt in lco
+        ):
+            modified_lco = ["GEOMETRY_NAME=" + src_lyr.GetGeometryColumn()] + lco
+        if has_geom and create_spatial_index:
+            modified_lco.append("SPATIAL_INDEX=NO")
+
+        if t_srs and has_geom:
+            srs = osr.SpatialReference()
+            srs.SetFromUserInput(t_srs)
+        elif a_srs and has_geom:
+            srs = osr.SpatialReference()
+            srs.SetFromUserInput(a_srs)
+        else:
+            srs = src_lyr.GetSpatialRef()
+
+        layer_name = _build_layer_name_non_single_mode(
+            layer_name_template,
+            src_ds_idx,
+            src_dsname,
+            layer.src_lyr_idx,
+            src_lyr.GetName(),
+            skip_failures,
+        )
+        if layer_name is None:
+            return False
+
+        lyr = dst_ds.CreateLayer(
+            layer_name,
+            geom_type=src_lyr.GetGeomType(),
+            srs=srs,
+            options=modified_lco,
+        )
+        for field_idx in range(src_lyr.GetLayerDefn().GetFieldCount()):
+            lyr.CreateField(src_lyr.GetLayerDefn().GetFieldDefn(field_idx))
+
+        md = src_lyr.GetMetadata()
+        if md:
+            lyr.SetMetadata(md)
+
+        lyr.SyncToDisk()
+
+        dst_srs_id = _gpkg_get_srs_id(dst_ds, lyr) if has_geom else -1
+        triggers = _gpkg_drop_triggers(dst_ds, lyr, "__invalid__")
+
+        fields = _gpkg_get_select_fields(
+            src_ds, src_lyr, layer.srs_id, dst_ds, lyr, dst_srs_id, s_srs, t_srs
+        )
+        dst_ds.ExecuteSQL(
+            'INSERT INTO "%s" SELECT %s FROM %s."%s"'
+            % (
+                _quote_id(lyr.GetName()),
+                fields,
+                schema_name,
+                _quote_id(src_lyr.GetName()),
+            )
+        )
+
+        # Update gpkg_ogr_contents
+        sql_lyr = dst_ds.ExecuteSQL("SELECT changes()")
+        f = sql_lyr.GetNextFeature()
+        num_rows_inserted = f.GetField(0)
+        f = None
+        dst_ds.ReleaseResultSet(sql_lyr)
+        if layer.feature_count >= 0 and num_rows_inserted != layer.feature_count:
+            print(
+                "Warning: %d rows inserted into %s whereas %d expected"
+                % (num_rows_inserted, lyr.GetName(), layer.feature_count),
+                file=sys.stderr,
+            )
+        dst_ds.ExecuteSQL(
+            "INSERT OR REPLACE INTO gpkg_ogr_contents VALUES('%s',%d)"
+            % (_quote_literal(lyr.GetName()), num_rows_inserted)
+        )
+
+        if has_geom:
+            _gpkg_register_geometry_extensions(dst_ds, lyr, layer.geometry_extensions)
+            _gpkg_update_extent(dst_ds, lyr, layer.extent)
+
+        for sql in triggers:
+            dst_ds.ExecuteSQL(sql)
+
+        if has_geom and create_spatial_index:
+            spatial_indexes.append((lyr.GetName(), lyr.GetGeometryColumn()))
+        return True
+
+    def copy_group(group):
+        for idx, (_, src_dsname, _, _) in enumerate(group):
+            dst_ds.ExecuteSQL(
+                "ATTACH DATABASE '%s' AS source_db_%d"
+                % (_quote_literal(src_dsname), idx)
+            )
+        try:
+            dst_ds.StartTransaction()
+            try:
+                for idx, (src_ds_idx, src_dsname, src_ds, layers) in enumerate(group):
+                    for layer in layers:
+                        if not copy_layer(
+                            src_ds_idx, src_dsname, "source_db_%d" % idx, src_ds, layer
+                        ):
+                            dst_ds.RollbackTransaction()
+                            return False
+            except Exception:
+                dst_ds.RollbackTransaction()
+                raise
+            dst_ds.CommitTransaction()
+        finally:
+            for idx in range(len(group)):
+                dst_ds.ExecuteSQL("DETACH DATABASE source_db_%d" % idx)
+        return True
+
+    # Part of the progress of the copy of the features, the remaining being
+    # for the build of the spatial indexes
+    copy_progress_ratio = 0.9 if create_spatial_index else 1.0
+    if progress_callback:
+        progress_callback(0.0, "", progress_arg)
+
+    group = []
+    for src_ds_idx, ((src_dsname, _), res) in enumerate(
+        _map_in_order(
+            _gpkg_prepare_source,
+            [(src_dsname, src_geom_types) for src_dsname in src_datasets],
+            threads,
+        )
+    ):
+        if res is None:
+            print("ERROR: Cannot open %s" % src_dsname, file=sys.stderr)
+            if skip_failures:
+                continue
+            return 1
+        src_ds, layers = res
+        group.append((src_ds_idx, src_dsname, src_ds, layers))
+        if len(group) == GPKG_BULK_ATTACHED_SOURCES:
+            if not copy_group(group):
+                return 1
+            group = []
+            if progress_callback:
+                progress_callback(
+                    copy_progress_ratio * (src_ds_idx + 1) / len(src_datasets),
+                    "",
+                    progress_arg,
+                )
+    if group and not copy_group(group):
+        return 1
+
+    # Build the R-trees with the bulk loader of CreateSpatialIndex()
+    for idx, (table_name, column_name) in enumerate(spatial_indexes):
+        if progress_callback:
+            progress_callback(
+                copy_progress_ratio
+                + (1 - copy_progress_ratio) * idx / len(spatial_indexes),
+                "",
+                progress_arg,
+            )
+        dst_ds.ReleaseResultSet(
+            dst_ds.ExecuteSQL(
+                "SELECT CreateSpatialIndex('%s', '%s')"
+                % (_quote_literal(table_name), _quote_literal(column_name))
+            )
+        )
+
+    if progress_callback:
+        progress_callback(1.0, "", progress_arg)
+
+    return 0
+
+
+#############################################################################
+# Arrow implementation of the single layer mode, that can be used only:
+# - when pyarrow is available
+# - for a newly created layer, without reprojection
+# - when no source layer has more than one geometry field
+
+# Minimum number of features of the batches written to the output layer
+ARROW_BATCH_SIZE = 65536
+
+ARROW_GEOMETRY_EXTENSIONS = (b"ogc.wkb", b"geoarrow.wkb")
+
+
+def _arrow_is_geometry_field(field):
+    metadata = field.metadata or {}
+    return metadata.get(b"ARROW:extension:name") in ARROW_GEOMETRY_EXTENSIONS
+
+
+def _arrow_promote_type(pa, type1, type2):
+    """Return a type to which values of type1 and type2 can be cast."""
+
+    if type1 == type2:
+        return type1
+    if pa.types.is_null(type1):
+        return type2
+    if pa.types.is_null(type2):
+        return type1
+
+    def is_integer(t):
+        return pa.types.is_integer(t) or pa.types.is_boolean(t)
+
+    def is_number(t):
+        return is_integer(t) or pa.types.is_floating(t)
+
+    if is_integer(type1) and is_integer(type2):
+        if pa.types.is_boolean(type1):
+            return type2
+        if pa.types.is_boolean(type2):
+            return type1
+        if pa.types.is_signed_integer(type1) == pa.types.is_signed_integer(type2):
+            return type1 if type1.bit_width >= type2.bit_width else type2
+        return pa.int64()
+    if is_number(type1) and is_number(type2):
+        return pa.float64()
+
+    if pa.types.is_date(type1) and pa.types.is_timestamp(type2):
+        return type2
+    if pa.types.is_timestamp(type1) and pa.types.is_date(type2):
+        return type1
+    if pa.types.is_timestamp(type1) and pa.types.is_timestamp(type2):
+        units = ("s", "ms", "us", "ns")
+        unit = max(type1.unit, type2.unit, key=units.index)
+        if type1.tz == type2.tz:
+            tz = type1.tz
+        else:
+            tz = "UTC" if type1.tz or type2.tz else None
+        return pa.timestamp(unit, tz=tz)
+
+    if pa.types.is_large_string(type1) or pa.types.is_large_string(type2):
+        return pa.large_string()
+    return pa.string()
+
+
+class _ArrowSourceLayer:
+    """Description of a source layer of the Arrow merge."""
+
+    def __init__(self, src_ds_idx, src_dsname, src_lyr_idx, src_lyr, arrow_type):
+        self.src_ds_idx = src_ds_idx
+        self.src_dsname = src_dsname
+        self.src_lyr_idx = src_lyr_idx
+        self.name = src_lyr.GetName()
+        self.geom_type = src_lyr.GetGeomType()
+        self.srs = src_lyr.GetSpatialRef()
+        self.fields = [arrow_type.field(i) for i in range(arrow_type.num_fields)]
+        self.geom_fields = [f for f in self.fields if _arrow_is_geometry_field(f)]
+
+
+def _arrow_get_source_layers(src_ds_idx, src_dsname, src_geom_types, stream_options):
+    """
+    Return the list of _ArrowSourceLayer of a source dataset, or None if it
+    cannot be opened.
+    """
+
+    try:
+        src_ds = ogr.Open(src_dsname)
+    except RuntimeError:
+        src_ds = None
+    if src_ds is None:
+        return None
+    layers = []
+    for src_lyr_idx, src_lyr in enumerate(src_ds):
+        if src_geom_types:
+            gt = ogr.GT_Flatten(src_lyr.GetGeomType())
+            if gt not in src_geom_types:
+                continue
+        stream = src_lyr.GetArrowStreamAsPyArrow(stream_options)
+        with stream:
+            arrow_type = stream.schema
+        layers.append(
+            _ArrowSourceLayer(src_ds_idx, src_dsname, src_lyr_idx, src_lyr, arrow_type)
+        )
+    return layers
+
+
+def _arrow_read_source_layers(
+    pa,
+    src_dsname,
+    layers,
+    schema,
+    geom_name,
+    src_layer_field_name,
+    src_layer_field_content,
+    stream_options,
+):
+    """
+    Read the source layers of a dataset, and yield their features as
+    pyarrow.RecordBatch of the output schema.
+    """
+
+    src_ds = ogr.Open(src_dsname)
+    for layer in layers:
+        src_lyr = src_ds.GetLayer(layer.src_lyr_idx)
+
+        # Index of the source columns by output column name
+        columns = {}
+        for idx, field in enumerate(layer.fields):
+            if layer.geom_fields and field.name == layer.geom_fields[0].name:
+                columns[geom_name] = idx
+            else:
+                columns.setdefault(field.name.lower(), idx)
+        content = None
+        if src_layer_field_name is not None:
+            content = _build_layer_name_single_mode(
+                src_layer_field_content,
+                layer.src_ds_idx,
+                src_dsname,
+                layer.src_lyr_idx,
+                layer.name,
+            )
+
+        stream = src_lyr.GetArrowStreamAsPyArrow(stream_options)
+        with stream:
+            for array in stream:
+                src_arrays = array.flatten()
+                arrays = []
+                for field in schema:
+                    if field.name == src_layer_field_name:
+                        arrays.append(pa.array([content] * len(array), field.type))
+                        continue
+                    idx = columns.get(
+                        field.name if field.name == geom_name else field.name.lower()
+                    )
+                    if idx is None:
+                        arrays.append(pa.nulls(len(array), field.type))
+                    elif src_arrays[idx].type != field.type:
+                        arrays.append(src_arrays[idx].cast(field.type))
+                    else:
+                        arrays.append(src_arrays[idx])
+                yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _arrow_ogrmerge(
+    dst_ds,
+    src_datasets: Sequence[str],
+    layer_name_template: str,
+    skip_failures: bool,
+    src_geom_types: Sequence[int],
+    field_strategy: Optional[str],
+    src_layer_field_name: Optional[str],
+    src_layer_field_content: str,
+    a_srs: Optional[str],
+    lco: Sequence[str],
+    threads: Optional[int],
+    progress_callback: Optional = None,
+    progress_arg: Optional = None,
+):
+    """
+    Merge the layers of the source datasets into a single layer of dst_ds,
+    reading them with GetArrowStream() and writing them with WriteArrow().
+
+    The fields of the output layer are selected according to field_strategy
+    as in a OGRVRTUnionLayer, and fields of the same name in several source
+    layers get a type to which all their types can be cast.
+
+    With threads > 1, the source datasets are opened and read concurrently,
+    and written in the order of src_datasets. Batches are streamed from the
+    readers to the writer through bounded queues, so that sources are never
+    fully loaded in memory.
+
+    Return None, without writing anything, if the sources are not
+    compatible with this code path.
+    """
+
+    import pyarrow as pa
+
+    stream_options = ["INCLUDE_FID=NO"]
+
+    # Collect the schemas of the source layers
+    src_layers = []
+    for (src_ds_idx, src_dsname, _, _), layers in _map_in_order(
+        _arrow_get_source_layers,
+        [
+            (src_ds_idx, src_dsname, src_geom_types, stream_options)
+            for src_ds_idx, src_dsname in enumerate(src_datasets)
+        ],
+        threads,
+    ):
+        if layers is None:
+            print("ERROR: Cannot open %s" % src_dsname, file=sys.stderr)
+            if skip_failures:
+                continue
+            return 1
+        for layer in layers:
+            if len(layer.geom_fields) > 1:
+                return None
+        src_layers.append((src_dsname, layers))
+
+    all_layers = [layer for _, layers in src_layers for layer in layers]
+    if not all_layers:
+        return 0
+
+    # Build the output schema
+    if field_strategy is None or EQUAL(field_strategy, "Union"):
+        field_layers = all_layers
+    elif EQUAL(field_strategy, "FirstLayer"):
+        field_layers = all_layers[0:1]
+    elif EQUAL(field_strategy, "Intersection"):
+        field_layers = all_layers
+    else:
+        print("ERROR: Invalid value for -field_strategy", file=sys.stderr)
+        return 1
+
+    field_names = {}
+    field_types = {}
+    for layer in field_layers:
+        for field in layer.fields:
+            if field not in layer.geom_fields[0:1]:
+                key = field.name.lower()
+                field_names.setdefault(key, field.name)
+    if field_strategy is not None and EQUAL(field_strategy, "Intersection"):
+        for layer in all_layers:
+            keys = set(field.name.lower() for field in layer.fields)
+            field_names = {k: v for k, v in field_names.items() if k in keys}
+    for layer in all_layers:
+        for field in layer.fields:
+            if field in layer.geom_fields[0:1]:
+                continue
+            key = field.name.lower()
+            if key in field_names:
+                if key in field_types:
+                    field_types[key] = _arrow_promote_type(
+                        pa, field_types[key], field.type
+                    )
+                else:
+                    field_types[key] = field.type
+
+    geom_types = set(layer.geom_type for layer in all_layers)
+    if geom_types != {ogr.wkbNone}:
+        geom_types.discard(ogr.wkbNone)
+    if len(geom_types) == 1:
+        geom_type = geom_types.pop()
+    else:
+        geom_type = ogr.wkbUnknown
+
+    if a_srs is not None:
+        srs = osr.SpatialReference()
+        srs.SetFromUserInput(a_srs)
+    else:
+        srs = next((layer.srs for layer in all_layers if layer.srs is not None), None)
+
+    dst_lyr = dst_ds.CreateLayer(
+        layer_name_template, srs=srs, geom_type=geom_type, options=lco
+    )
+    if dst_lyr is None:
+        return 1
+
+    fields = []
+    if src_layer_field_name is not None:
+        fields.append(pa.field(src_layer_field_name, pa.string()))
+        field_names.pop(src_layer_field_name.lower(), None)
+    for key, name in field_names.items():
+        fields.append(pa.field(name, field_types[key]))
+    write_options = []
+    geom_name = None
+    if geom_type != ogr.wkbNone:
+        geom_name = dst_lyr.GetGeometryColumn() or "wkb_geometry"
+        fields.append(
+            pa.field(
+                geom_name, pa.binary(), metadata={"ARROW:extension:name": "ogc.wkb"}
+            )
+        )
+        write_options.append("GEOMETRY_NAME=" + geom_name)
+    schema = pa.schema(fields)
+
+    # Copy the features
+    pending_batches = []
+    pending_rows = 0
+    create_fields = True
+
+    def flush():
+        nonlocal pending_batches, pending_rows, create_fields
+        table = pa.Table.from_batches(pending_batches, schema=schema)
+        pending_batches = []
+        pending_rows = 0
+        ret = dst_lyr.WriteArrow(
+            table.combine_chunks(),
+            createFieldsFromSchema=create_fields,
+            options=write_options,
+        )
+        create_fields = False
+        if ret != ogr.OGRERR_NONE:
+            raise Exception("Cannot write into layer %s" % layer_name_template)
+
+    if progress_callback is not None:
+        progress_callback(0.0, None, progress_arg)
+
+    dst_lyr.StartTransaction()
+    # closing() stops the readers if writing fails
+    with contextlib.closing(
+        _iter_in_order(
+            _arrow_read_source_layers,
+            [
+                (
+                    pa,
+                    src_dsname,
+                    layers,
+                    schema,
+                    geom_name,
+                    src_layer_field_name,
+                    src_layer_field_content,
+                    stream_options,
+                )
+                for src_dsname, layers in src_layers
+            ],
+            threads,
+        )
+    ) as sources:
+        for idx, (_, batches) in enumerate(sources):
+            for batch in batches:
+                pending_batches.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= ARROW_BATCH_SIZE:
+                    flush()
+            if progress_callback is not None:
+                progress_callback((idx + 1) / len(src_layers), None, progress_arg)
+    if pending_batches or create_fields:
+        flush()
+    dst_lyr.CommitTransaction()
+
+    return 0
+
+
 def ogrmerge(
     src_datasets: Optional[Sequence[str]] = None,
     dst_filename: Optional[PathLikeOrStr] = None,
@@ -855,6 +1698,9 @@ def ogrmerge(
     lco: Optional[Sequence[str]] = None,
     progress_callback: Optional = None,
     progress_arg: Optional = None,
+    arrow: bool = False,
+    threads: Optional[int] = None,
+    bulk: bool = False,
 ):
 
     src_datasets = src_datasets or []
@@ -952,8 +1798,38 @@ def ogrmerge(
                 lco,
                 progress_callback,
                 progress_arg,
+                bulk=bulk,
+                threads=threads,
             )
 
+    if bulk:
+        print(
+            "WARNING: -bulk is only supported when merging GeoPackage files into "
+            "a new GeoPackage, without -single, and is ignored",
+            file=sys.stderr,
+        )
+
+    use_arrow = False
+    if arrow:
+        reason = None
+        if not single_layer:
+            reason = "requires -single"
+        elif update:
+            reason = "is incompatible with -update, -append and -overwrite_layer"
+        elif EQUAL(driver_name, "VRT"):
+            reason = "is incompatible with VRT output"
+        elif s_srs is not None or t_srs is not None:
+            reason = "is incompatible with -s_srs and -t_srs"
+        else:
+            try:
+                import pyarrow  # noqa: F401
+
+                use_arrow = True
+            except ImportError:
+                reason = "requires the pyarrow Python module"
+        if reason is not None:
+            print("WARNING: -arrow %s, and is ignored" % reason, file=sys.stderr)
+
     vrt_filename = None
     if not EQUAL(driver_name, "VRT"):
         dst_ds = get_vector_file_in_update_no_exception(dst_filename)
@@ -985,6 +1861,30 @@ def ogrmerge(
             if dst_ds is None:
                 return 1
 
+        if use_arrow:
+            ret = _arrow_ogrmerge(
+                dst_ds,
+                src_datasets,
+                layer_name_template,
+                skip_failures,
+                src_geom_types,
+                field_strategy,
+                src_layer_field_name,
+                src_layer_field_content,
+                a_srs,
+                lco,
+                threads,
+                progress_callback,
+                progress_arg,
+            )
+            if ret is not None:
+                return ret
+            print(
+                "WARNING: -arrow does not support layers with several geometry "
+                "fields, and is ignored",
+                file=sys.stderr,
+            )
+
         vrt_filename = "/vsimem/_ogrmerge_.vrt"
     else:
         if gdal.VSIStatL(dst_filename) and not overwrite_ds:
@@ -1037,39 +1937,13 @@ def ogrmerge(
                     if field_strategy is not None:
                         writer.write_element_value("FieldStrategy", field_strategy)
 
-                layer_name = src_layer_field_content
-
-                src_lyr_name = src_lyr.GetName()
-                try:
-                    src_lyr_name = src_lyr_name.decode("utf-8")
-                except AttributeError:
-                    pass
-
-                basename = None
-                if os.path.exists(src_dsname):
-                    basename = os.path.basename(src_dsname)
-                    if "." in basename:
-                        basename = ".".join(basename.split(".")[0:-1])
-
-                if basename == src_lyr_name:
-                    layer_name = layer_name.replace("{AUTO_NAME}", basename)
-                elif basename is None:
-                    layer_name = layer_name.replace(
-                        "{AUTO_NAME}", "Dataset%d_%s" % (src_ds_idx, src_lyr_name)
-                    )
-                else:
-                    layer_name = layer_name.replace(
-                        "{AUTO_NAME}", basename + "_" + src_lyr_name
-                    )
-
-                if basename is not None:
-                    layer_name = layer_name.replace("{DS_BASENAME}", basename)
-                else:
-                    layer_name = layer_name.replace("{DS_BASENAME}", src_dsname)
-                layer_name = layer_name.replace("{DS_NAME}", "%s" % src_dsname)
-                layer_name = layer_name.replace("{DS_INDEX}", "%d" % src_ds_idx)
-                layer_name = layer_name.replace("{LAYER_NAME}", src_lyr_name)
-                layer_name = layer_name.replace("{LAYER_INDEX}", "%d" % src_lyr_idx)
+                layer_name = _build_layer_name_single_mode(
+                    src_layer_field_content,
+                    src_ds_idx,
+                    src_dsname,
+                    src_lyr_idx,
+                    src_lyr.GetName(),
+                )
 
                 if t_srs is not None:
                     writer.open_element("OGRVRTWarpedLayer")
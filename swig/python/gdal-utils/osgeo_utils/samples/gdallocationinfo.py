@@ -62,6 +62,15 @@ CoordinateTransformationOrSRS = Optional[
     Union[osr.CoordinateTransformation, LocationInfoSRS, AnySRS]
 ]
 
+# Resampling algorithms of Band.SamplePoints(). Other ones are evaluated with
+# one RasterIO() per point.
+SAMPLE_POINTS_RESAMPLE_ALGS = (
+    gdalconst.GRIORA_NearestNeighbour,
+    gdalconst.GRIORA_Bilinear,
+    gdalconst.GRIORA_Cubic,
+    gdalconst.GRIORA_CubicSpline,
+)
+
 
 def gdallocationinfo(
     filename_or_ds: PathOrDS,
@@ -175,29 +184,40 @@ def gdallocationinfo(
     else:
         lines_q = y * line_fact
 
-    buf_xsize = buf_ysize = 1
-    buf_type, typecode = GDALTypeCodeAndNumericTypeCodeFromDataSet(ds)
-    buf_obj = np.empty([buf_ysize, buf_xsize], dtype=typecode)
-
-    for idx, (pixel, line) in enumerate(zip(pixels_q, lines_q)):
+    if resample_alg in SAMPLE_POINTS_RESAMPLE_ALGS:
+        # Points are sampled by blocks, rather than with one RasterIO per point
         for bnd_idx, band in enumerate(bands):
-            if (
-                BandRasterIONumPy(
-                    band,
-                    0,
-                    pixel - 0.5,
-                    line - 0.5,
-                    1,
-                    1,
-                    buf_obj,
-                    buf_type,
-                    resample_alg,
-                    None,
-                    None,
-                )
-                == 0
+            values = band.SamplePoints(pixels_q, lines_q, resample_alg)
+            if values.dtype != results.dtype and np.issubdtype(
+                results.dtype, np.integer
             ):
-                results[bnd_idx][idx] = buf_obj[0][0]
+                # interpolated values are rounded, as RasterIO() does
+                values = np.nan_to_num(np.round(values))
+            results[bnd_idx] = values
+    else:
+        buf_xsize = buf_ysize = 1
+        buf_type, typecode = GDALTypeCodeAndNumericTypeCodeFromDataSet(ds)
+        buf_obj = np.empty([buf_ysize, buf_xsize], dtype=typecode)
+
+        for idx, (pixel, line) in enumerate(zip(pixels_q, lines_q)):
+            for bnd_idx, band in enumerate(bands):
+                if (
+                    BandRasterIONumPy(
+                        band,
+                        0,
+                        pixel - 0.5,
+                        line - 0.5,
+                        1,
+                        1,
+                        buf_obj,
+                        buf_type,
+                        resample_alg,
+                        None,
+                        None,
+                    )
+                    == 0
+                ):
+                    results[bnd_idx][idx] = buf_obj[0][0]
 
     is_scaled, scales, offsets = get_scales_and_offsets(bands)
     if is_scaled:
@@ -18,6 +18,7 @@ import sys
 import numpy as np
 
 from osgeo import gdal, gdal_array
+from osgeo_utils.auxiliary.block_util import map_blocks
 
 gdal.TermProgress = gdal.TermProgress_nocb
 
@@ -197,24 +198,15 @@ def main(argv=sys.argv):
         print("Cannot load band", iBand, "from the", infile)
         return 2
 
-    numtype = gdal_array.GDALTypeCodeTonpTypeCode(typ)
-    outline = np.empty((1, inband.XSize), numtype)
-
-    prev = inband.ReadAsArray(0, 0, inband.XSize, 1, inband.XSize, 1)[0]
-    outband.WriteArray(outline, 0, 0)
-    gdal.TermProgress(0.0)
-
-    cur = inband.ReadAsArray(0, 1, inband.XSize, 1, inband.XSize, 1)[0]
-    outband.WriteArray(outline, 0, inband.YSize - 1)
-    gdal.TermProgress(1.0 / inband.YSize)
+    numtype = gdal_array.GDALTypeCodeToNumericTypeCode(typ)
 
     dx = 2 * xsize
     dy = 2 * ysize
 
-    for i in range(1, inband.YSize - 1):
-        next_ = inband.ReadAsArray(0, i + 1, inband.XSize, 1, inband.XSize, 1)[0]
-        dzx = (cur[0:-2] - cur[2:]) * elstep
-        dzy = (prev[1:-1] - next_[1:-1]) * elstep
+    def shade(window, elevation):
+        # elevation has a one pixel halo around the window
+        dzx = (elevation[1:-1, :-2] - elevation[1:-1, 2:]) * elstep
+        dzy = (elevation[:-2, 1:-1] - elevation[2:, 1:-1]) * elstep
         nx = -dy * dzx
         ny = dx * dzy
         nz = dx * dy
@@ -222,14 +214,27 @@ def main(argv=sys.argv):
         nlxyz = nx * lx + ny * ly + nz * lz
         cosine = dyn_range * (nlxyz / (lxyz * np.sqrt(nxyz)))
         cosine = np.clip(cosine, 0.0, dyn_range)
-        outline[0, 1:-1] = cosine.astype(numtype)
-        outband.WriteArray(outline, 0, i)
-
-        prev = cur
-        cur = next_
-
-        # Display progress report on terminal
-        gdal.TermProgress(float(i + 1) / (inband.YSize - 1))
+        outblock = cosine.astype(numtype)
+
+        # The edges of the raster are not computed
+        if window.yoff == 0:
+            outblock[0, :] = 0
+        if window.yoff + window.ysize == inband.YSize:
+            outblock[-1, :] = 0
+        if window.xoff == 0:
+            outblock[:, 0] = 0
+        if window.xoff + window.xsize == inband.XSize:
+            outblock[:, -1] = 0
+        return outblock
+
+    map_blocks(
+        shade,
+        inband,
+        outband,
+        halo=1,
+        buf_type=gdal.GDT_Float64,
+        callback=gdal.TermProgress,
+    )
 
     outdataset.SetGeoTransform(geotransform)
     outdataset.SetProjection(projection)
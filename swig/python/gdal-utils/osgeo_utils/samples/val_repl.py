@@ -21,6 +21,7 @@ import sys
 import numpy as np
 
 from osgeo import gdal
+from osgeo_utils.auxiliary.block_util import map_blocks
 
 gdal.TermProgress = gdal.TermProgress_nocb
 
@@ -114,10 +115,11 @@ def main(argv=sys.argv):
         inband = indataset.GetRasterBand(iBand)
         outband = outdataset.GetRasterBand(iBand)
 
-        for i in range(inband.YSize - 1, -1, -1):
-            scanline = inband.ReadAsArray(0, i, inband.XSize, 1, inband.XSize, 1)
-            scanline = np.choose(np.equal(scanline, inNoData), (scanline, outNoData))
-            outband.WriteArray(scanline, 0, i)
+        map_blocks(
+            lambda window, data: np.where(data == inNoData, outNoData, data),
+            inband,
+            outband,
+        )
     return 0
 
 